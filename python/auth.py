@@ -1,10 +1,12 @@
 """
 Authentication Module
-Modul untuk hashing password dengan MD5 dan autentikasi user
+Modul untuk hashing password (scrypt/argon2id/bcrypt, MD5 lama) dan autentikasi user
 """
 
 import re
-from utils.md5_hash import hash_password_md5, verify_password_md5
+from utils.md5_hash import hash_password_md5
+from user_directory import UserDirectory
+from utils.password_hashing import HashingBusyError, PasswordHashing
 
 
 def validate_email(email):
@@ -59,21 +61,51 @@ def validate_password_strength(password):
     }
 
 
+BUSY_RESPONSE = {
+    'success': False,
+    'error_type': 'SERVER_BUSY',
+    'message': 'Server sedang sibuk, coba lagi sebentar'
+}
+
+
 class AuthService:
     """Service untuk mengelola autentikasi user."""
 
-    def __init__(self, db_connection):
+    def __init__(self, db_connection, password_hashing=None, token_service=None, user_directory=None):
         """
         Inisialisasi AuthService.
         
         Args:
             db_connection: Database connection object dari connection.py
+            password_hashing: Instance PasswordHashing (default: scrypt, worker = jumlah CPU)
+            token_service: Instance SessionTokenService untuk token login (optional)
+            user_directory: Instance UserDirectory bersama (default: dibuat sendiri)
         """
         self.db = db_connection
+        self.password_hashing = password_hashing or PasswordHashing()
+        self.token_service = token_service
+        self.users = user_directory or UserDirectory(db_connection)
+
+    def get_hashing_stats(self):
+        """Metrik worker pool hashing password (queue depth, latency)."""
+        return self.password_hashing.get_stats()
+
+    def close(self):
+        """Hentikan worker pool hashing password."""
+        self.password_hashing.close()
+
+    def _upgrade_password_hash(self, user_id, old_hash, new_hash):
+        """
+        Simpan hash baru setelah login berhasil (rehash MD5/parameter lama).
+        Hanya update jika hash belum diubah request lain.
+        """
+        query = "UPDATE users SET password_hash = %s WHERE id = %s AND password_hash = %s"
+        if self.db.execute_query(query, (new_hash, user_id, old_hash)):
+            print(f"✓ Password hash user {user_id} di-upgrade ke {self.password_hashing.hasher.name}")
 
     def register_user(self, email, password, username=None):
         """
-        Register user baru dengan MD5 password hashing.
+        Register user baru (password di-hash dengan scheme yang dikonfigurasi).
         
         Args:
             email: Email user
@@ -102,18 +134,18 @@ class AuthService:
         if not username:
             username = email.split('@')[0]
 
-        # Cek apakah email sudah terdaftar
-        check_query = "SELECT id FROM users WHERE email = %s"
-        existing = self.db.execute_read_one(check_query, (email,))
-
-        if existing:
+        # Cek apakah email sudah terdaftar (cache UserDirectory)
+        if self.users.get_by_email(email):
             return {
                 'success': False,
                 'message': 'Email sudah terdaftar'
             }
 
-        # Hash password dengan MD5
-        hashed_password = hash_password_md5(password)
+        # Hash password (scrypt/argon2id/bcrypt)
+        try:
+            hashed_password = self.password_hashing.hash(password)
+        except HashingBusyError:
+            return dict(BUSY_RESPONSE)
 
         # Insert user baru
         insert_query = """
@@ -124,6 +156,7 @@ class AuthService:
         success = self.db.execute_query(insert_query, (username, email, hashed_password))
 
         if success:
+            self.users.invalidate(email=email)
             return {
                 'success': True,
                 'message': 'Registrasi berhasil',
@@ -137,7 +170,8 @@ class AuthService:
 
     def login_user(self, email, password):
         """
-        Login user dengan verifikasi MD5 password.
+        Login user. Hash MD5 lama / parameter lama di-upgrade otomatis saat login berhasil.
+        Jika token_service diset, response berisi token sesi (token, token_type, expires_at).
         
         Args:
             email: Email user
@@ -146,7 +180,8 @@ class AuthService:
         Returns:
             Dictionary dengan status, message, dan data user (jika berhasil)
         """
-        # Cari user berdasarkan email
+        # Cari user berdasarkan email, langsung dari database (bukan UserDirectory):
+        # cache per worker bisa basi setelah change_password di worker lain
         query = "SELECT id, username, email, password_hash FROM users WHERE email = %s"
         result = self.db.execute_read_dict(query, (email,))
 
@@ -158,9 +193,16 @@ class AuthService:
 
         user = result[0]
 
-        # Verifikasi password dengan MD5
-        if verify_password_md5(password, user.get('password_hash')):
-            return {
+        # Verifikasi password (format hash dideteksi otomatis)
+        try:
+            matched, new_hash = self.password_hashing.verify(password, user.get('password_hash'))
+        except HashingBusyError:
+            return dict(BUSY_RESPONSE)
+        
+        if matched:
+            if new_hash:
+                self._upgrade_password_hash(user['id'], user['password_hash'], new_hash)
+            response = {
                 'success': True,
                 'message': 'Login berhasil',
                 'user': {
@@ -169,6 +211,12 @@ class AuthService:
                     'email': user['email']
                 }
             }
+            if self.token_service:
+                # Token sesi untuk header Authorization: Bearer <token>
+                response.update(self.token_service.issue(
+                    user['id'], username=user['username'], email=user['email']
+                ))
+            return response
         else:
             return {
                 'success': False,
@@ -195,7 +243,7 @@ class AuthService:
                 'message': password_check['message']
             }
 
-        # Ambil data user
+        # Ambil hash password terbaru langsung dari database (tidak lewat cache)
         query = "SELECT password_hash FROM users WHERE id = %s"
         result = self.db.execute_read_dict(query, (user_id,))
 
@@ -207,21 +255,26 @@ class AuthService:
 
         user = result[0]
 
-        # Verifikasi password lama
-        if not verify_password_md5(old_password, user.get('password_hash')):
-            return {
-                'success': False,
-                'message': 'Password lama salah'
-            }
+        # Verifikasi password lama, lalu hash password baru
+        try:
+            matched, _ = self.password_hashing.verify(old_password, user.get('password_hash'))
+            if not matched:
+                return {
+                    'success': False,
+                    'message': 'Password lama salah'
+                }
 
-        # Hash password baru
-        new_hashed = hash_password_md5(new_password)
+            new_hashed = self.password_hashing.hash(new_password)
+        except HashingBusyError:
+            return dict(BUSY_RESPONSE)
 
         # Update password
         update_query = "UPDATE users SET password_hash = %s WHERE id = %s"
         success = self.db.execute_query(update_query, (new_hashed, user_id))
 
         if success:
+            # Perubahan data user: buang profil lama di semua cache
+            self.users.invalidate(user_id=user_id)
             return {
                 'success': True,
                 'message': 'Password berhasil diubah'
@@ -236,7 +289,7 @@ class AuthService:
 # Testing
 if __name__ == "__main__":
     print("=== Test Authentication Module ===\n")
-    print("Import MD5 functions from utils/md5_hash.py")
+    print("Password hashing dari utils/password_hashing.py")
     
     # Test validasi
     print("\n1. Email Validation:")
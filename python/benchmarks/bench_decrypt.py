@@ -0,0 +1,87 @@
+"""
+Benchmark: engine decrypt_many (serial vs thread vs process)
+
+Mengukur MessageService.decrypt_many untuk N pesan DES pendek (envelope
+binary) dengan setiap DECRYPT_MODE. Pool dibuat sekali dan dipanaskan
+sebelum diukur, jadi angka process belum termasuk biaya spawn worker.
+
+Pesan chat pendek murah di-decrypt, sehingga biaya pickle dan kirim antar
+process sering lebih besar dari decrypt-nya. Jalankan benchmark ini di
+mesin production sebelum memakai DECRYPT_MODE=process; ingat juga bahwa
+setiap worker gunicorn (serve.py) membuat pool process sendiri.
+
+Usage (dari folder python/):
+    python benchmarks/bench_decrypt.py
+    python benchmarks/bench_decrypt.py --sizes 500 5000 --length 2000
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_service import MessageService, pack_envelope
+from utils.des_encryption import DESEncryption
+
+KEY = "msg12345"
+MODES = ['serial', 'thread', 'process']
+
+
+def build_rows(size, length, des):
+    """Buat N pesan terenkripsi dengan panjang plaintext +- length karakter."""
+    rng = random.Random(42)
+    rows = []
+    for message_id in range(1, size + 1):
+        text = ''.join(rng.choices(string.ascii_lowercase + ' ', k=rng.randint(length // 2, length)))
+        iv, ciphertext = des.encrypt_bytes(text)
+        rows.append({'id': message_id, 'message_text': pack_envelope(iv, ciphertext)})
+    return rows
+
+
+def run(service, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        batch = [dict(row) for row in rows]
+        start = time.perf_counter()
+        service.decrypt_many(batch)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 5000])
+    parser.add_argument('--length', type=int, default=200, help='Panjang maksimal plaintext per pesan')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    des = DESEncryption(KEY)
+    services = {
+        mode: MessageService(None, encryption_key=KEY, decrypt_mode=mode,
+                             decrypt_workers=args.workers, decrypt_threshold=0)
+        for mode in MODES
+    }
+    
+    print(f"{'messages':>8} | " + " | ".join(f"{mode + ' (ms)':>13}" for mode in MODES))
+    print("-" * (11 + 16 * len(MODES)))
+    try:
+        for size in args.sizes:
+            rows = build_rows(size, args.length, des)
+            times = []
+            for mode in MODES:
+                services[mode].decrypt_many([dict(row) for row in rows[:64]])  # pemanasan pool
+                times.append(run(services[mode], rows, args.repeat))
+            print(f"{size:>8} | " + " | ".join(f"{t * 1000:>13.1f}" for t in times))
+    finally:
+        for service in services.values():
+            service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: biaya KDF (scrypt/PBKDF2) vs hit rate cache derived key
+
+Bagian 1 mengukur biaya satu derive untuk beberapa parameter KDF.
+Bagian 2 mensimulasikan dekripsi N file dengan satu password di mana
+sebagian file berbagi salt (misal dienkripsi dalam satu batch oleh satu
+instance AESChunkedEncryption), sehingga derive berikutnya kena cache.
+Waktu yang diukur hanya biaya derive key, bukan dekripsi AES-nya.
+
+Usage (dari folder python/):
+    python benchmarks/bench_kdf.py
+    python benchmarks/bench_kdf.py --files 100 --hit-rates 0 0.5 0.9 0.99
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.key_derivation import KeyDerivation
+
+PASSWORD = "benchmark-password"
+KDF_VARIANTS = [
+    ('scrypt N=2^14', {'algorithm': 'scrypt', 'scrypt_n': 2 ** 14}),
+    ('scrypt N=2^15', {'algorithm': 'scrypt', 'scrypt_n': 2 ** 15}),
+    ('pbkdf2 300k', {'algorithm': 'pbkdf2', 'pbkdf2_iterations': 300_000}),
+    ('pbkdf2 600k', {'algorithm': 'pbkdf2', 'pbkdf2_iterations': 600_000}),
+]
+
+
+def build_salts(files, hit_rate, rng):
+    """List salt per file: file pertama tiap batch memakai salt baru, sisanya mengulang."""
+    salts = []
+    for _ in range(files):
+        if salts and rng.random() < hit_rate:
+            salts.append(rng.choice(salts))
+        else:
+            salts.append(os.urandom(KeyDerivation.SALT_SIZE))
+    return salts
+
+
+def run_workload(options, salts, cache_size):
+    kdf = KeyDerivation(cache_size=cache_size, **options)
+    start = time.perf_counter()
+    for salt in salts:
+        kdf.derive(PASSWORD, salt)
+    return time.perf_counter() - start, kdf.get_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--hit-rates', type=float, nargs='+', default=[0.0, 0.5, 0.9, 0.99])
+    parser.add_argument('--variant', default='scrypt N=2^15', choices=[name for name, _ in KDF_VARIANTS])
+    args = parser.parse_args()
+    
+    print(f"{'kdf':>15} | {'derive (ms)':>11}")
+    print("-" * 30)
+    for name, options in KDF_VARIANTS:
+        kdf = KeyDerivation(cache_size=0, **options)
+        start = time.perf_counter()
+        kdf.derive(PASSWORD, os.urandom(KeyDerivation.SALT_SIZE))
+        print(f"{name:>15} | {(time.perf_counter() - start) * 1000:>11.1f}")
+    
+    options = dict(KDF_VARIANTS)[args.variant]
+    rng = random.Random(42)
+    
+    print(f"\n{args.variant}, {args.files} file")
+    print(f"{'hit rate':>8} | {'derives':>7} | {'no cache (ms)':>13} | {'cache (ms)':>10} | {'speedup':>7}")
+    print("-" * 59)
+    for hit_rate in args.hit_rates:
+        salts = build_salts(args.files, hit_rate, rng)
+        uncached_time, _ = run_workload(options, salts, cache_size=0)
+        cached_time, stats = run_workload(options, salts, cache_size=128)
+        print(f"{stats['cache']['hit_rate']:>8.2f} | {stats['derive_count']:>7} | "
+              f"{uncached_time * 1000:>13.1f} | {cached_time * 1000:>10.1f} | "
+              f"{uncached_time / cached_time:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
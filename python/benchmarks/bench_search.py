@@ -0,0 +1,133 @@
+"""
+Benchmark: search scan + decrypt vs blind search index
+
+Mengukur biaya sisi aplikasi untuk satu query search pada mailbox berisi
+N pesan per user:
+  - scan   : decrypt semua pesan (DES) lalu substring match (perilaku lama)
+  - index  : hitung token HMAC keyword, lookup inverted index, decrypt kandidat saja
+
+Selain kata utuh yang langka, keyword di tengah kata (MID_WORD_KEYWORDS)
+juga diukur; hasil index dan scan harus sama persis.
+
+Inverted index disimulasikan dengan dictionary in-memory (token -> set message_id)
+sebagai pengganti tabel message_search_tokens, sehingga angka ini tidak
+termasuk round trip MySQL. Round trip scan (mengirim N baris) juga tidak
+dihitung, jadi selisih sebenarnya di production lebih besar.
+
+Usage (dari folder python/):
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --sizes 10000 100000 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex
+from utils.des_encryption import DESEncryption
+
+USER_ID = 1
+VOCABULARY = [
+    'halo', 'apa', 'kabar', 'besok', 'rapat', 'laporan', 'dokumen', 'jadwal',
+    'proyek', 'kirim', 'tolong', 'cek', 'email', 'file', 'terima', 'kasih',
+    'minggu', 'depan', 'kantor', 'presentasi', 'anggaran', 'revisi', 'final',
+    'client', 'invoice', 'kontrak', 'server', 'deploy', 'bug', 'fitur'
+]
+# Kata langka: muncul di ~0.1% pesan
+RARE_KEYWORD = 'audit'
+# Keyword di tengah kata: index n-gram harus memberi hasil yang sama dengan scan
+MID_WORD_KEYWORDS = ['udit', 'apor']
+
+
+def build_mailbox(size, des, index):
+    """Buat N pesan terenkripsi + inverted index in-memory."""
+    rng = random.Random(42)
+    rows = []
+    inverted = {}
+    
+    for message_id in range(1, size + 1):
+        words = rng.choices(VOCABULARY, k=rng.randint(5, 20))
+        if rng.random() < 0.001:
+            words.insert(rng.randrange(len(words)), RARE_KEYWORD)
+        plaintext = ' '.join(words)
+        
+        encrypted = des.encrypt(plaintext)
+        rows.append({
+            'id': message_id,
+            'message_text': json.dumps({'ciphertext': encrypted['ciphertext'], 'iv': encrypted['iv']})
+        })
+        
+        for term in index.tokenize(plaintext):
+            inverted.setdefault(index._token(USER_ID, term), set()).add(message_id)
+    
+    return rows, inverted
+
+
+def decrypt(des, encrypted_data):
+    data = json.loads(encrypted_data)
+    return des.decrypt(data['ciphertext'], data['iv'])
+
+
+def search_scan(rows, des, keyword):
+    keyword_lower = keyword.lower()
+    return [row['id'] for row in rows if keyword_lower in decrypt(des, row['message_text']).lower()]
+
+
+def search_index(rows_by_id, inverted, index, des, keyword):
+    tokens = [index._token(USER_ID, term) for term in index.query_terms(keyword)]
+    candidate_ids = set.intersection(*(inverted.get(token, set()) for token in tokens))
+    
+    keyword_lower = keyword.lower()
+    return [
+        message_id for message_id in sorted(candidate_ids, reverse=True)
+        if keyword_lower in decrypt(des, rows_by_id[message_id]['message_text']).lower()
+    ]
+
+
+def timed(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    des = DESEncryption("msg12345")
+    index = SearchIndex(None, "bench-search-key")
+    
+    print(f"{'messages':>10} | {'keyword':>7} | {'matches':>7} | {'scan (ms)':>10} | "
+          f"{'index (ms)':>10} | {'speedup':>8}")
+    print("-" * 68)
+    
+    for size in args.sizes:
+        rows, inverted = build_mailbox(size, des, index)
+        rows_by_id = {row['id']: row for row in rows}
+        
+        for keyword in [RARE_KEYWORD, *MID_WORD_KEYWORDS]:
+            scan_time, scan_result = timed(lambda: search_scan(rows, des, keyword), args.repeat)
+            index_time, index_result = timed(
+                lambda: search_index(rows_by_id, inverted, index, des, keyword), args.repeat
+            )
+            
+            assert sorted(scan_result) == sorted(index_result), f"Hasil scan dan index berbeda ({keyword})!"
+            
+            print(f"{size:>10} | {keyword:>7} | {len(index_result):>7} | {scan_time * 1000:>10.2f} | "
+                  f"{index_time * 1000:>10.3f} | {scan_time / index_time:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
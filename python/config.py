@@ -3,6 +3,8 @@ Configuration Module
 Modul untuk membaca environment variables dari file .env
 """
 
+import hashlib
+import hmac
 import os
 from pathlib import Path
 
@@ -116,22 +118,297 @@ class Config:
     def db_port(self):
         return self.get_int('DB_PORT', 3306)
     
+    # Database Pool Configuration
+    @property
+    def db_pool_enabled(self):
+        return self.get_bool('DB_POOL_ENABLED', True)
+    
+    @property
+    def db_pool_min_size(self):
+        return self.get_int('DB_POOL_MIN_SIZE', 1)
+    
+    @property
+    def db_pool_max_size(self):
+        return self.get_int('DB_POOL_MAX_SIZE', 10)
+    
+    @property
+    def db_pool_timeout(self):
+        return self.get_int('DB_POOL_TIMEOUT', 30)
+    
+    @property
+    def db_pool_idle_timeout(self):
+        return self.get_int('DB_POOL_IDLE_TIMEOUT', 300)
+    
+    @property
+    def db_pool_ping_interval(self):
+        return self.get_int('DB_POOL_PING_INTERVAL', 30)
+    
+    @property
+    def db_batch_size(self):
+        """Jumlah baris per statement INSERT multi-row di execute_many (default: 500)."""
+        return self.get_int('DB_BATCH_SIZE', 500)
+    
     # Flask Configuration
     @property
     def flask_host(self):
-        return '0.0.0.0'
+        return self.get('FLASK_HOST', '0.0.0.0')
     
     @property
     def flask_port(self):
-        return 5000
+        return self.get_int('FLASK_PORT', 5000)
     
     @property
     def flask_debug(self):
-        return True
+        return self.get_bool('FLASK_DEBUG', False)
+    
+    # Production Server Configuration (serve.py)
+    @property
+    def server_workers(self):
+        """Jumlah proses worker (default: 2 x CPU + 1)."""
+        return self.get_int('SERVER_WORKERS', (os.cpu_count() or 1) * 2 + 1)
+    
+    @property
+    def server_threads(self):
+        """Thread per worker (pool DB maksimal sebaiknya >= nilai ini)."""
+        return self.get_int('SERVER_THREADS', 4)
+    
+    @property
+    def server_keepalive(self):
+        return self.get_int('SERVER_KEEPALIVE', 5)
+    
+    @property
+    def server_timeout(self):
+        return self.get_int('SERVER_TIMEOUT', 60)
+    
+    @property
+    def server_graceful_timeout(self):
+        return self.get_int('SERVER_GRACEFUL_TIMEOUT', 30)
+    
+    DEFAULT_SECRET_KEY = 'dev-secret-key-change-this'
     
     @property
     def secret_key(self):
-        return self.get('SECRET_KEY', 'dev-secret-key-change-this')
+        return self.get('SECRET_KEY', self.DEFAULT_SECRET_KEY)
+    
+    @property
+    def secret_key_configured(self):
+        """False jika SECRET_KEY kosong atau masih nilai default (publik)."""
+        return bool(self.get('SECRET_KEY')) and self.secret_key != self.DEFAULT_SECRET_KEY
+    
+    def derive_subkey(self, label):
+        """
+        Subkey 32 bytes untuk satu keperluan: HMAC-SHA256(SECRET_KEY, label).
+        Setiap pemakaian HMAC/enkripsi memakai label sendiri agar SECRET_KEY
+        mentah tidak dipakai ulang di beberapa tempat.
+        """
+        return hmac.new(self.secret_key.encode('utf-8'), label, hashlib.sha256).digest()
+    
+    # Messaging Configuration
+    @property
+    def search_index_enabled(self):
+        return self.get_bool('SEARCH_INDEX_ENABLED', True)
+    
+    @property
+    def search_index_key(self):
+        """
+        Key HMAC blind search index (None jika index dimatikan).
+        Jika SEARCH_INDEX_KEY kosong, key diturunkan dari SECRET_KEY.
+        """
+        if not self.search_index_enabled:
+            return None
+        return self.get('SEARCH_INDEX_KEY') or self.derive_subkey(b'kripto-search-index')
+    
+    @property
+    def decrypt_mode(self):
+        """
+        Engine decrypt pesan massal: serial (default), thread atau process.
+        process hanya dipakai jika di-set eksplisit dan terbukti lebih cepat
+        di benchmarks/bench_decrypt.py (setiap worker gunicorn membuat pool sendiri).
+        """
+        mode = self.get('DECRYPT_MODE', 'serial').lower()
+        return mode if mode in ('serial', 'thread', 'process') else 'serial'
+    
+    @property
+    def decrypt_workers(self):
+        return self.get_int('DECRYPT_WORKERS', os.cpu_count() or 1)
+    
+    @property
+    def decrypt_threshold(self):
+        return self.get_int('DECRYPT_THRESHOLD', 256)
+    
+    @property
+    def decrypt_chunk_size(self):
+        return self.get_int('DECRYPT_CHUNK_SIZE', 128)
+    
+    @property
+    def plaintext_cache_size(self):
+        """Jumlah pesan plaintext di cache (0 = mati, default mati)."""
+        return self.get_int('PLAINTEXT_CACHE_SIZE', 0)
+    
+    @property
+    def plaintext_cache_ttl(self):
+        return self.get_int('PLAINTEXT_CACHE_TTL', 300)
+    
+    @property
+    def broadcast_max_recipients(self):
+        """Jumlah penerima maksimal per broadcast (default: 1000)."""
+        return self.get_int('BROADCAST_MAX_RECIPIENTS', 1000)
+    
+    # Attachment Store (blob content-addressed)
+    @property
+    def attachment_store_dir(self):
+        """Folder root blob attachment (default: uploads/attachment_blobs)."""
+        return self.get('ATTACHMENT_STORE_DIR', 'uploads/attachment_blobs')
+    
+    @property
+    def attachment_store_shard_depth(self):
+        return self.get_int('ATTACHMENT_STORE_SHARD_DEPTH', 2)
+    
+    @property
+    def attachment_encryption_enabled(self):
+        """Enkripsi at-rest blob attachment baru (default: True)."""
+        return self.get_bool('ATTACHMENT_ENCRYPTION_ENABLED', True)
+    
+    @property
+    def attachment_encryption_key(self):
+        """
+        Key AES-256 enkripsi attachment (bytes), None jika enkripsi dimatikan
+        atau ATTACHMENT_ENCRYPTION_KEY belum di-set dengan benar.
+        
+        Sengaja tidak diturunkan dari SECRET_KEY: SECRET_KEY dirotasi untuk
+        mencabut semua sesi, dan itu tidak boleh membuat blob lama tidak
+        bisa didekripsi.
+        """
+        if not self.attachment_encryption_configured:
+            return None
+        return bytes.fromhex(self.get('ATTACHMENT_ENCRYPTION_KEY'))
+    
+    @property
+    def attachment_encryption_configured(self):
+        """True jika enkripsi aktif dan ATTACHMENT_ENCRYPTION_KEY berisi 64 karakter hex."""
+        if not self.attachment_encryption_enabled:
+            return False
+        key_hex = self.get('ATTACHMENT_ENCRYPTION_KEY') or ''
+        try:
+            return len(bytes.fromhex(key_hex)) == 32
+        except ValueError:
+            return False
+    
+    # User Directory (cache lookup user)
+    @property
+    def user_cache_size(self):
+        """Jumlah user di cache email -> id / id -> profil (default: 4096)."""
+        return self.get_int('USER_CACHE_SIZE', 4096)
+    
+    @property
+    def user_cache_ttl(self):
+        """
+        Umur entry cache user dalam detik (default: 300).
+        Invalidasi hanya sampai ke worker di proses yang sama: worker gunicorn
+        lain bisa melihat profil lama (username/email) sampai TTL habis.
+        Password hash tidak pernah di-cache (login selalu query database).
+        """
+        return self.get_int('USER_CACHE_TTL', 300)
+    
+    # Password Hashing (AuthService)
+    @property
+    def password_hash_scheme(self):
+        """Scheme hash password baru: scrypt, argon2id atau bcrypt."""
+        scheme = self.get('PASSWORD_HASH_SCHEME', 'scrypt').lower()
+        return scheme if scheme in ('scrypt', 'argon2id', 'bcrypt') else 'scrypt'
+    
+    @property
+    def password_scrypt_n(self):
+        return self.get_int('PASSWORD_SCRYPT_N', 2 ** 15)
+    
+    @property
+    def password_scrypt_r(self):
+        return self.get_int('PASSWORD_SCRYPT_R', 8)
+    
+    @property
+    def password_scrypt_p(self):
+        return self.get_int('PASSWORD_SCRYPT_P', 1)
+    
+    @property
+    def password_argon2_time_cost(self):
+        return self.get_int('PASSWORD_ARGON2_TIME_COST', 3)
+    
+    @property
+    def password_argon2_memory_cost(self):
+        """Memory argon2id dalam KiB (default: 64 MiB)."""
+        return self.get_int('PASSWORD_ARGON2_MEMORY_COST', 65536)
+    
+    @property
+    def password_argon2_parallelism(self):
+        return self.get_int('PASSWORD_ARGON2_PARALLELISM', 1)
+    
+    @property
+    def password_bcrypt_rounds(self):
+        return self.get_int('PASSWORD_BCRYPT_ROUNDS', 12)
+    
+    @property
+    def password_hash_workers(self):
+        """Jumlah thread hashing per worker proses (default: jumlah CPU)."""
+        return self.get_int('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+    
+    @property
+    def password_hash_max_queue(self):
+        return self.get_int('PASSWORD_HASH_MAX_QUEUE', 64)
+    
+    # Session Token
+    @property
+    def auth_token_ttl(self):
+        """Umur token login dalam detik (default: 24 jam)."""
+        return self.get_int('AUTH_TOKEN_TTL', 86400)
+    
+    @property
+    def auth_revocation_refresh(self):
+        return self.get_int('AUTH_REVOCATION_REFRESH', 30)
+    
+    @property
+    def auth_allow_legacy_user_id(self):
+        """
+        Izinkan user_id/sender_id dari request jika tanpa token (client lama).
+        Default mati: aktifkan sementara hanya selama migrasi client ke token.
+        """
+        return self.get_bool('AUTH_ALLOW_LEGACY_USER_ID', False)
+    
+    # Key Derivation (password file encryption)
+    @property
+    def kdf_algorithm(self):
+        """KDF untuk password file encryption: scrypt atau pbkdf2."""
+        algorithm = self.get('KDF_ALGORITHM', 'scrypt').lower()
+        return algorithm if algorithm in ('scrypt', 'pbkdf2') else 'scrypt'
+    
+    @property
+    def kdf_scrypt_n(self):
+        return self.get_int('KDF_SCRYPT_N', 2 ** 15)
+    
+    @property
+    def kdf_scrypt_r(self):
+        return self.get_int('KDF_SCRYPT_R', 8)
+    
+    @property
+    def kdf_scrypt_p(self):
+        return self.get_int('KDF_SCRYPT_P', 1)
+    
+    @property
+    def kdf_pbkdf2_iterations(self):
+        return self.get_int('KDF_PBKDF2_ITERATIONS', 600_000)
+    
+    @property
+    def kdf_max_cost_factor(self):
+        """Parameter KDF dari header file maksimal sekian kali konfigurasi (default: 4)."""
+        return self.get_int('KDF_MAX_COST_FACTOR', 4)
+    
+    @property
+    def kdf_cache_size(self):
+        """Jumlah key hasil KDF di cache (0 = mati)."""
+        return self.get_int('KDF_CACHE_SIZE', 128)
+    
+    @property
+    def kdf_cache_ttl(self):
+        return self.get_int('KDF_CACHE_TTL', 300)
     
     def get_db_config(self):
         """Dapatkan konfigurasi database sebagai dictionary."""
@@ -143,6 +420,93 @@ class Config:
             'port': self.db_port
         }
     
+    def get_db_pool_config(self):
+        """Dapatkan opsi connection pool (dan batch write) sebagai dictionary."""
+        return {
+            'pooled': self.db_pool_enabled,
+            'pool_min_size': self.db_pool_min_size,
+            'pool_max_size': self.db_pool_max_size,
+            'pool_timeout': self.db_pool_timeout,
+            'pool_idle_timeout': self.db_pool_idle_timeout,
+            'pool_ping_interval': self.db_pool_ping_interval,
+            'batch_size': self.db_batch_size
+        }
+    
+    def get_message_service_config(self):
+        """Dapatkan opsi MessageService (search index + decrypt engine)."""
+        return {
+            'search_index_key': self.search_index_key,
+            'decrypt_mode': self.decrypt_mode,
+            'decrypt_workers': self.decrypt_workers,
+            'decrypt_threshold': self.decrypt_threshold,
+            'decrypt_chunk_size': self.decrypt_chunk_size,
+            'plaintext_cache_size': self.plaintext_cache_size,
+            'plaintext_cache_ttl': self.plaintext_cache_ttl,
+            'broadcast_max_recipients': self.broadcast_max_recipients
+        }
+    
+    def get_attachment_store_config(self):
+        """Dapatkan opsi AttachmentStore sebagai dictionary."""
+        return {
+            'root': self.attachment_store_dir,
+            'shard_depth': self.attachment_store_shard_depth,
+            'encryption_key': self.attachment_encryption_key
+        }
+    
+    def get_user_directory_config(self):
+        """Dapatkan opsi UserDirectory sebagai dictionary."""
+        return {
+            'cache_size': self.user_cache_size,
+            'cache_ttl': self.user_cache_ttl
+        }
+    
+    def get_password_hashing_config(self):
+        """Dapatkan opsi create_password_hashing() (utils.password_hashing)."""
+        return {
+            'scheme': self.password_hash_scheme,
+            'workers': self.password_hash_workers,
+            'max_queue': self.password_hash_max_queue,
+            'scrypt_n': self.password_scrypt_n,
+            'scrypt_r': self.password_scrypt_r,
+            'scrypt_p': self.password_scrypt_p,
+            'argon2_time_cost': self.password_argon2_time_cost,
+            'argon2_memory_cost': self.password_argon2_memory_cost,
+            'argon2_parallelism': self.password_argon2_parallelism,
+            'bcrypt_rounds': self.password_bcrypt_rounds
+        }
+    
+    def get_session_token_config(self):
+        """Dapatkan opsi SessionTokenService sebagai dictionary."""
+        return {
+            'secret_key': self.derive_subkey(b'kripto-session-token'),
+            'ttl': self.auth_token_ttl,
+            'refresh_interval': self.auth_revocation_refresh
+        }
+    
+    def get_kdf_config(self):
+        """Dapatkan opsi KeyDerivation (utils.key_derivation) sebagai dictionary."""
+        return {
+            'algorithm': self.kdf_algorithm,
+            'scrypt_n': self.kdf_scrypt_n,
+            'scrypt_r': self.kdf_scrypt_r,
+            'scrypt_p': self.kdf_scrypt_p,
+            'pbkdf2_iterations': self.kdf_pbkdf2_iterations,
+            'cache_size': self.kdf_cache_size,
+            'cache_ttl': self.kdf_cache_ttl,
+            'max_cost_factor': self.kdf_max_cost_factor
+        }
+    
+    def get_server_config(self):
+        """Dapatkan opsi pre-fork server (gunicorn) sebagai dictionary."""
+        return {
+            'bind': f"{self.flask_host}:{self.flask_port}",
+            'workers': self.server_workers,
+            'threads': self.server_threads,
+            'keepalive': self.server_keepalive,
+            'timeout': self.server_timeout,
+            'graceful_timeout': self.server_graceful_timeout
+        }
+    
     def display_config(self):
         """Tampilkan konfigurasi untuk debugging."""
         print("\n" + "="*50)
@@ -151,8 +515,24 @@ class Config:
         print(f"Database Host  : {self.db_host}:{self.db_port}")
         print(f"Database User  : {self.db_user}")
         print(f"Database Name  : {self.db_database}")
+        print(f"Database Pool  : {'on' if self.db_pool_enabled else 'off'} "
+              f"(min={self.db_pool_min_size}, max={self.db_pool_max_size})")
+        print(f"Decrypt Engine : {self.decrypt_mode} (workers={self.decrypt_workers}, "
+              f"threshold={self.decrypt_threshold})")
+        print(f"Plaintext Cache: {self.plaintext_cache_size or 'off'}")
+        print(f"User Cache     : {self.user_cache_size} (ttl={self.user_cache_ttl}s)")
+        print(f"Attachments    : {self.attachment_store_dir} "
+              f"(encryption={'on' if self.attachment_encryption_enabled else 'off'})")
+        if self.attachment_encryption_enabled and not self.attachment_encryption_configured:
+            print("⚠️ ATTACHMENT_ENCRYPTION_KEY belum di-set: server tidak akan dijalankan")
+        print(f"File KDF       : {self.kdf_algorithm} (cache={self.kdf_cache_size or 'off'})")
+        print(f"Password Hash  : {self.password_hash_scheme} (workers={self.password_hash_workers})")
+        print(f"Legacy user_id : {'on' if self.auth_allow_legacy_user_id else 'off'}")
+        if self.auth_allow_legacy_user_id:
+            print("⚠️ AUTH_ALLOW_LEGACY_USER_ID aktif: request tanpa token bisa memakai user_id siapa saja")
         print(f"Flask Host     : {self.flask_host}:{self.flask_port}")
         print(f"Flask Debug    : {self.flask_debug}")
+        print(f"Server Workers : {self.server_workers} x {self.server_threads} thread")
         print("="*50 + "\n")
 
 
@@ -166,3 +546,4 @@ if __name__ == "__main__":
     
     print("Database Config:")
     print(cfg.get_db_config())
+    print(cfg.get_db_pool_config())
@@ -3,14 +3,267 @@ Database Connection Module
 Modul untuk mengelola koneksi database MySQL
 """
 
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.errors import PoolError
+
+
+class PoolTimeoutError(PoolError):
+    """Dilempar jika tidak ada koneksi yang bisa dipinjam sebelum timeout."""
+
+
+class ConnectionPool:
+    """
+    Pool koneksi MySQL yang thread-safe.
+    
+    Setiap request meminjam (checkout) satu koneksi dan mengembalikannya
+    (checkin) setelah selesai, sehingga thread yang berbeda tidak pernah
+    berbagi socket yang sama.
+    """
+    
+    def __init__(self, connect_func, min_size=1, max_size=10, timeout=30,
+                 idle_timeout=300, ping_interval=30):
+        """
+        Inisialisasi pool dan buka koneksi minimum.
+        
+        Args:
+            connect_func: Fungsi tanpa argumen yang membuat koneksi baru
+            min_size: Jumlah koneksi minimum yang selalu dipertahankan
+            max_size: Jumlah koneksi maksimum (idle + dipinjam)
+            timeout: Detik maksimal menunggu koneksi kosong saat pool penuh
+            idle_timeout: Koneksi idle lebih lama dari ini akan ditutup
+                          (selama jumlah koneksi masih di atas min_size)
+            ping_interval: Koneksi yang idle lebih lama dari ini di-ping dulu
+                           sebelum dipinjamkan (0 = selalu ping)
+        """
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Ukuran pool tidak valid (0 <= min_size <= max_size, max_size >= 1)")
+        
+        self._connect_func = connect_func
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, waktu terakhir dipakai)
+        self._size = 0        # total koneksi: idle + sedang dipinjam
+        self._closed = False
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'discarded': 0,
+            'evicted': 0
+        }
+        
+        for _ in range(min_size):
+            connection = self._create()
+            with self._cond:
+                self._size += 1
+                self._idle.append((connection, time.monotonic()))
+    
+    def _create(self):
+        """Buat koneksi baru lewat connect_func."""
+        connection = self._connect_func()
+        with self._cond:
+            self._stats['created'] += 1
+        return connection
+    
+    def _is_healthy(self, connection, idle_since):
+        """Health-check koneksi sebelum dipinjamkan."""
+        if time.monotonic() - idle_since < self.ping_interval:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+    
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+    
+    def _evict_idle_locked(self):
+        """Keluarkan koneksi idle yang kedaluwarsa. Harus dipanggil dengan lock."""
+        evicted = []
+        now = time.monotonic()
+        # Koneksi paling lama idle ada di kiri deque
+        while self._idle and self._size > self.min_size:
+            connection, last_used = self._idle[0]
+            if now - last_used < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._stats['evicted'] += 1
+            evicted.append(connection)
+        return evicted
+    
+    def acquire(self):
+        """
+        Pinjam satu koneksi dari pool.
+        
+        Returns:
+            Koneksi MySQL yang sehat
+        
+        Raises:
+            PoolTimeoutError: Jika pool penuh sampai timeout habis
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        connection = None
+        idle_since = None
+        evicted = []
+        
+        try:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("Connection pool sudah ditutup")
+                    evicted.extend(self._evict_idle_locked())
+                    if self._idle:
+                        # LIFO: pakai koneksi yang paling baru dipakai (paling "hangat")
+                        connection, idle_since = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        # Reservasi slot, koneksi dibuat di luar lock
+                        self._size += 1
+                        break
+                    
+                    waited = True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Tidak ada koneksi tersedia setelah {self.timeout} detik "
+                            f"(max_size={self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+        finally:
+            for old in evicted:
+                self._close_quietly(old)
+        
+        if connection is not None and not self._is_healthy(connection, idle_since):
+            self._close_quietly(connection)
+            with self._cond:
+                self._stats['discarded'] += 1
+            connection = None
+        
+        if connection is None:
+            try:
+                connection = self._create()
+            except Exception:
+                # Lepas slot yang sudah direservasi
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+        
+        wait_time = time.monotonic() - start
+        with self._cond:
+            self._stats['checkouts'] += 1
+            if waited:
+                self._stats['waits'] += 1
+            self._stats['wait_time_total'] += wait_time
+            self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait_time)
+        
+        return connection
+    
+    def release(self, connection):
+        """
+        Kembalikan koneksi ke pool.
+        
+        Args:
+            connection: Koneksi yang sebelumnya didapat dari acquire()
+        """
+        try:
+            # Jangan wariskan transaksi yang masih terbuka ke peminjam berikutnya
+            if connection.in_transaction:
+                connection.rollback()
+        except Error:
+            self._discard(connection)
+            return
+        
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                closing = True
+            else:
+                self._idle.append((connection, time.monotonic()))
+                closing = False
+            evicted = self._evict_idle_locked()
+            self._cond.notify()
+        
+        if closing:
+            self._close_quietly(connection)
+        for old in evicted:
+            self._close_quietly(old)
+    
+    def _discard(self, connection):
+        """Buang koneksi rusak dan bebaskan slotnya."""
+        self._close_quietly(connection)
+        with self._cond:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._cond.notify()
+    
+    def close(self):
+        """Tutup semua koneksi idle dan tolak peminjaman baru."""
+        with self._cond:
+            self._closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for connection in idle:
+            self._close_quietly(connection)
+    
+    def get_stats(self):
+        """
+        Statistik pool (ukuran + metrik waktu tunggu).
+        
+        Returns:
+            Dictionary dengan ukuran pool dan metrik checkout/wait
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            size = self._size
+            idle = len(self._idle)
+        
+        checkouts = stats.pop('checkouts')
+        wait_total = stats.pop('wait_time_total')
+        wait_max = stats.pop('wait_time_max')
+        return {
+            'size': size,
+            'idle': idle,
+            'in_use': size - idle,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'checkouts': checkouts,
+            'avg_wait_ms': round(wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+            'max_wait_ms': round(wait_max * 1000, 3),
+            **stats
+        }
 
 
 class DatabaseConnection:
     """Class untuk mengelola koneksi database MySQL."""
     
-    def __init__(self, host="localhost", user="root", password="", database="test", port=3306):
+    def __init__(self, host="localhost", user="root", password="", database="test", port=3306,
+                 pooled=False, pool_min_size=1, pool_max_size=10, pool_timeout=30,
+                 pool_idle_timeout=300, pool_ping_interval=30, batch_size=500):
         """
         Inisialisasi koneksi database.
         
@@ -20,6 +273,13 @@ class DatabaseConnection:
             password: Password database (default: '')
             database: Nama database (default: test)
             port: Port database (default: 3306)
+            pooled: Gunakan connection pool (aman untuk multi-thread) (default: False)
+            pool_min_size: Jumlah koneksi minimum di pool (default: 1)
+            pool_max_size: Jumlah koneksi maksimum di pool (default: 10)
+            pool_timeout: Detik menunggu koneksi kosong saat pool penuh (default: 30)
+            pool_idle_timeout: Detik sebelum koneksi idle ditutup (default: 300)
+            pool_ping_interval: Koneksi idle lebih lama dari ini di-ping sebelum dipakai (default: 30)
+            batch_size: Jumlah baris per statement di execute_many (default: 500)
         """
         self.host = host
         self.user = user
@@ -27,9 +287,47 @@ class DatabaseConnection:
         self.database = database
         self.port = port
         self.connection = None
+        self.batch_size = max(1, batch_size)
+        
+        self.pooled = pooled
+        self.pool = None
+        # Koneksi yang sedang dipakai transaction() oleh thread ini
+        self._local = threading.local()
+        self._pool_options = {
+            'min_size': pool_min_size,
+            'max_size': pool_max_size,
+            'timeout': pool_timeout,
+            'idle_timeout': pool_idle_timeout,
+            'ping_interval': pool_ping_interval
+        }
+    
+    def _new_connection(self):
+        """Buka koneksi MySQL baru (dipakai oleh pool)."""
+        connection = mysql.connector.connect(
+            host=self.host,
+            user=self.user,
+            password=self.password,
+            database=self.database,
+            port=self.port
+        )
+        # Autocommit agar SELECT tidak menahan snapshot transaksi lama
+        # ketika koneksi dipakai ulang oleh request lain
+        connection.autocommit = True
+        return connection
     
     def connect(self):
-        """Membuat koneksi ke database MySQL."""
+        """Membuat koneksi ke database MySQL (atau pool jika mode pooled)."""
+        if self.pooled:
+            try:
+                if self.pool is None:
+                    self.pool = ConnectionPool(self._new_connection, **self._pool_options)
+                print(f"✓ Connection pool ke MySQL database '{self.database}' siap "
+                      f"(min={self.pool.min_size}, max={self.pool.max_size})")
+                return self.pool
+            except Error as e:
+                print(f"✗ Error membuat connection pool: {e}")
+                return None
+        
         try:
             self.connection = mysql.connector.connect(
                 host=self.host,
@@ -47,16 +345,97 @@ class DatabaseConnection:
     
     def disconnect(self):
         """Menutup koneksi database."""
+        if self.pool:
+            self.pool.close()
+            self.pool = None
+            print("✓ Connection pool ditutup")
         if self.connection and self.connection.is_connected():
             self.connection.close()
             print("✓ Koneksi database ditutup")
     
     def get_connection(self):
-        """Mendapatkan koneksi database."""
+        """Mendapatkan koneksi database (mode non-pooled)."""
         if not self.connection or not self.connection.is_connected():
             return self.connect()
         return self.connection
     
+    def get_pool_stats(self):
+        """
+        Statistik connection pool.
+        
+        Returns:
+            Dictionary statistik pool, atau None jika tidak memakai pool
+        """
+        if not self.pool:
+            return None
+        return self.pool.get_stats()
+    
+    def in_transaction(self):
+        """Cek apakah thread ini sedang berada di dalam transaction()."""
+        return getattr(self._local, 'connection', None) is not None
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager transaksi: semua execute_* di dalam blok memakai
+        koneksi yang sama dan di-commit sekali di akhir.
+        
+        Di dalam transaksi, error query tidak ditelan (tidak return False/None)
+        tetapi diteruskan, sehingga seluruh transaksi di-rollback.
+        Transaksi bersarang ikut ke transaksi terluar.
+        
+        Example:
+            >>> with db.transaction():
+            ...     db.execute_query("INSERT ...", params)
+            ...     db.execute_query("UPDATE ...", params)
+        """
+        if self.in_transaction():
+            yield self
+            return
+        
+        with self._checkout() as connection:
+            # Tutup snapshot baca yang mungkin masih terbuka (mode non-pooled)
+            if connection.in_transaction:
+                connection.commit()
+            connection.start_transaction()
+            self._local.connection = connection
+            try:
+                yield self
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                self._local.connection = None
+    
+    @contextmanager
+    def _checkout(self):
+        """
+        Pinjam koneksi untuk satu operasi.
+        
+        Di dalam transaction(): pakai koneksi transaksi.
+        Mode pooled: checkout dari pool lalu checkin setelah selesai.
+        Mode biasa: pakai satu koneksi bersama (perilaku lama).
+        """
+        if self.in_transaction():
+            yield self._local.connection
+            return
+        
+        if not self.pooled:
+            yield self.get_connection()
+            return
+        
+        if self.pool is None:
+            self.connect()
+            if self.pool is None:
+                raise PoolError("Connection pool belum tersedia")
+        
+        connection = self.pool.acquire()
+        try:
+            yield connection
+        finally:
+            self.pool.release(connection)
+    
     def execute_query(self, query, params=None):
         """
         Menjalankan query (INSERT, UPDATE, DELETE).
@@ -68,28 +447,139 @@ class DatabaseConnection:
         Returns:
             True jika berhasil, False jika gagal
         """
-        cursor = None
         try:
-            connection = self.get_connection()
-            cursor = connection.cursor()
-            
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            
-            connection.commit()
-            print("✓ Query berhasil dijalankan")
-            return True
-            
+            with self._checkout() as connection:
+                cursor = None
+                try:
+                    cursor = connection.cursor()
+                    
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+                    
+                    if not self.in_transaction():
+                        connection.commit()
+                    print("✓ Query berhasil dijalankan")
+                    return True
+                
+                except Error:
+                    if connection and not self.in_transaction():
+                        connection.rollback()
+                    raise
+                finally:
+                    if cursor:
+                        cursor.close()
+        
         except Error as e:
             print(f"✗ Error execute query: {e}")
-            if self.connection:
-                self.connection.rollback()
+            if self.in_transaction():
+                raise
             return False
-        finally:
-            if cursor:
-                cursor.close()
+    
+    def execute_insert(self, query, params=None):
+        """
+        Menjalankan INSERT dan mengembalikan ID auto-increment dari cursor yang sama.
+        
+        Pengganti pola INSERT + "SELECT LAST_INSERT_ID()": tidak ada round trip
+        tambahan, dan ID pasti berasal dari koneksi yang menjalankan INSERT
+        (aman di mode pooled).
+        
+        Args:
+            query: SQL INSERT string
+            params: Parameter untuk query (opsional)
+        
+        Returns:
+            ID baris baru (int), atau None jika gagal
+        """
+        try:
+            with self._checkout() as connection:
+                cursor = None
+                try:
+                    cursor = connection.cursor()
+                    
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+                    
+                    if not self.in_transaction():
+                        connection.commit()
+                    return cursor.lastrowid
+                
+                except Error:
+                    if connection and not self.in_transaction():
+                        connection.rollback()
+                    raise
+                finally:
+                    if cursor:
+                        cursor.close()
+        
+        except Error as e:
+            print(f"✗ Error execute insert: {e}")
+            if self.in_transaction():
+                raise
+            return None
+    
+    def execute_many(self, query, rows, batch_size=None):
+        """
+        Menjalankan satu query untuk banyak baris dengan satu commit.
+        
+        Baris dikirim per batch lewat cursor.executemany(); untuk INSERT ... VALUES
+        mysql-connector menggabungkan satu batch menjadi satu statement multi-row.
+        Semua batch di-commit sekali di akhir (atau ikut transaction() yang aktif),
+        jadi jika satu batch gagal tidak ada baris yang tersimpan.
+        
+        Args:
+            query: SQL query string dengan placeholder satu baris
+            rows: List tuple parameter, satu per baris
+            batch_size: Jumlah baris per statement (default: self.batch_size)
+        
+        Returns:
+            Jumlah baris yang diproses, atau None jika gagal
+        
+        Example:
+            >>> db.execute_many("INSERT INTO t (a, b) VALUES (%s, %s)", [(1, 2), (3, 4)])
+            2
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        batch_size = max(1, batch_size or self.batch_size)
+        
+        try:
+            with self._checkout() as connection:
+                cursor = None
+                # Di luar transaction(): satu transaksi sendiri agar commit sekali
+                own_transaction = not self.in_transaction()
+                try:
+                    if own_transaction:
+                        if connection.in_transaction:
+                            connection.commit()
+                        connection.start_transaction()
+                    
+                    cursor = connection.cursor()
+                    for start in range(0, len(rows), batch_size):
+                        cursor.executemany(query, rows[start:start + batch_size])
+                    
+                    if own_transaction:
+                        connection.commit()
+                    print(f"✓ {len(rows)} baris berhasil dijalankan")
+                    return len(rows)
+                
+                except Error:
+                    if own_transaction:
+                        connection.rollback()
+                    raise
+                finally:
+                    if cursor:
+                        cursor.close()
+        
+        except Error as e:
+            print(f"✗ Error execute many: {e}")
+            if self.in_transaction():
+                raise
+            return None
     
     def execute_read_query(self, query, params=None):
         """
@@ -102,25 +592,25 @@ class DatabaseConnection:
         Returns:
             List of tuples atau None jika error
         """
-        cursor = None
         try:
-            connection = self.get_connection()
-            cursor = connection.cursor()
-            
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            
-            result = cursor.fetchall()
-            return result
-            
+            with self._checkout() as connection:
+                cursor = connection.cursor()
+                try:
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+                    
+                    result = cursor.fetchall()
+                    return result
+                finally:
+                    cursor.close()
+        
         except Error as e:
             print(f"✗ Error read query: {e}")
+            if self.in_transaction():
+                raise
             return None
-        finally:
-            if cursor:
-                cursor.close()
     
     def execute_read_one(self, query, params=None):
         """
@@ -133,25 +623,26 @@ class DatabaseConnection:
         Returns:
             Single tuple atau None
         """
-        cursor = None
         try:
-            connection = self.get_connection()
-            cursor = connection.cursor()
-            
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            
-            result = cursor.fetchone()
-            return result
-            
+            with self._checkout() as connection:
+                # Buffered agar sisa baris tidak tertinggal di koneksi yang dikembalikan ke pool
+                cursor = connection.cursor(buffered=True)
+                try:
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+                    
+                    result = cursor.fetchone()
+                    return result
+                finally:
+                    cursor.close()
+        
         except Error as e:
             print(f"✗ Error read one: {e}")
+            if self.in_transaction():
+                raise
             return None
-        finally:
-            if cursor:
-                cursor.close()
     
     def execute_read_dict(self, query, params=None):
         """
@@ -164,36 +655,41 @@ class DatabaseConnection:
         Returns:
             List of dictionaries
         """
-        cursor = None
         try:
-            connection = self.get_connection()
-            cursor = connection.cursor(dictionary=True)
-            
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            
-            result = cursor.fetchall()
-            return result
-            
+            with self._checkout() as connection:
+                cursor = connection.cursor(dictionary=True)
+                try:
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+                    
+                    result = cursor.fetchall()
+                    return result
+                finally:
+                    cursor.close()
+        
         except Error as e:
             print(f"✗ Error read dict: {e}")
+            if self.in_transaction():
+                raise
             return None
-        finally:
-            if cursor:
-                cursor.close()
 
 
 # Helper function untuk koneksi cepat
-def get_db_connection(host="localhost", user="root", password="", database="test", port=3306):
+def get_db_connection(host="localhost", user="root", password="", database="test", port=3306,
+                      **pool_options):
     """
     Helper function untuk mendapatkan koneksi database.
     
+    Args:
+        pool_options: Opsi pool (pooled, pool_min_size, pool_max_size, ...)
+                      yang diteruskan ke DatabaseConnection
+    
     Returns:
         DatabaseConnection object
     """
-    db = DatabaseConnection(host, user, password, database, port)
+    db = DatabaseConnection(host, user, password, database, port, **pool_options)
     db.connect()
     return db
 
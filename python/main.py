@@ -3,19 +3,27 @@ Login & Register API
 Flask API untuk autentikasi user dengan MD5 password hashing + Stateless Steganography
 """
 
-from flask import Flask, request, jsonify, send_file
+from flask import Blueprint, Flask, Request, Response, current_app, request, jsonify, stream_with_context
 from connection import get_db_connection
 from config import config
 from auth import AuthService, hash_password_md5, validate_email
 from message_service import MessageService
+from attachment_store import AttachmentStore, UploadTooLargeError
+from session_tokens import InvalidTokenError, SessionTokenService
+from user_directory import UserDirectory
+from utils.key_derivation import configure_key_derivation, get_key_derivation
+from utils.password_hashing import create_password_hashing
 import traceback
+import io
+import mimetypes
 import os
+from functools import wraps
+from werkzeug.datastructures import ContentRange
+from werkzeug.local import LocalProxy
 from werkzeug.utils import secure_filename
-from datetime import datetime
-import uuid
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = config.secret_key
+# Semua route didaftarkan ke blueprint, app dibuat oleh create_app()
+api = Blueprint('api', __name__)
 
 # File Upload Configuration
 UPLOAD_FOLDER = 'uploads/message_attachments'
@@ -28,24 +36,205 @@ ALLOWED_EXTENSIONS = {
     'xlsx', 'xls', 'csv'  # Spreadsheets
 }
 
-# Create upload folder if not exists
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-# Inisialisasi database connection
-db = get_db_connection(**config.get_db_config())
 
-# Inisialisasi Auth Service
-auth_service = AuthService(db)
+# Endpoint yang file upload-nya langsung di-stream ke AttachmentStore
+STAGED_UPLOAD_ENDPOINTS = {'api.send_message', 'api.send_broadcast'}
+
+
+class KriptoRequest(Request):
+    """
+    Request dengan pipeline upload streaming untuk attachment.
+    
+    Di endpoint STAGED_UPLOAD_ENDPOINTS, parser multipart menulis setiap file
+    langsung ke StagingFile di folder temp blob store: satu pass yang
+    sekaligus menghitung SHA-256 dan menghentikan upload begitu melebihi
+    MAX_FILE_SIZE (UploadTooLargeError -> 413). File temp yang tidak jadi
+    dipakai dihapus di akhir request.
+    """
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint not in STAGED_UPLOAD_ENDPOINTS or not filename or not allowed_file(filename):
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        
+        staging = message_service.attachment_store.open_staging(max_size=MAX_FILE_SIZE)
+        if not hasattr(self, 'staging_files'):
+            self.staging_files = []
+        self.staging_files.append(staging)
+        return staging
+
+
+# Service milik app yang sedang aktif (setiap worker punya instance sendiri)
+db = LocalProxy(lambda: current_app.extensions['kripto']['db'])
+auth_service = LocalProxy(lambda: current_app.extensions['kripto']['auth_service'])
+message_service = LocalProxy(lambda: current_app.extensions['kripto']['message_service'])
+token_service = LocalProxy(lambda: current_app.extensions['kripto']['token_service'])
+user_directory = LocalProxy(lambda: current_app.extensions['kripto']['user_directory'])
+
+
+def create_app(cfg=None):
+    """
+    App factory: buat Flask app beserta DB pool dan service-nya sendiri.
+    
+    Dipanggil sekali per proses worker (setelah fork), sehingga setiap
+    worker punya connection pool dan service masing-masing.
+    
+    Args:
+        cfg: Objek Config (default: config dari .env)
+    
+    Returns:
+        Flask app
+    
+    Raises:
+        RuntimeError: Jika SECRET_KEY belum di-set atau masih default, atau
+            enkripsi attachment aktif tanpa ATTACHMENT_ENCRYPTION_KEY
+    """
+    cfg = cfg or config
+    
+    # Token sesi ditandatangani dengan subkey SECRET_KEY: nilai default yang
+    # publik berarti siapa pun bisa membuat token untuk user mana pun
+    if not cfg.secret_key_configured:
+        raise RuntimeError("SECRET_KEY belum di-set (atau masih default) di .env; server tidak dijalankan")
+    
+    # Key enkripsi attachment harus eksplisit (bukan turunan SECRET_KEY)
+    if cfg.attachment_encryption_enabled and not cfg.attachment_encryption_configured:
+        raise RuntimeError("ATTACHMENT_ENCRYPTION_KEY (64 karakter hex) wajib di-set jika "
+                           "ATTACHMENT_ENCRYPTION_ENABLED=true; server tidak dijalankan")
+    
+    app = Flask(__name__)
+    app.request_class = KriptoRequest
+    app.config['SECRET_KEY'] = cfg.secret_key
+    
+    # Create upload folder if not exists
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    
+    # KDF untuk password file encryption (cache key per proses)
+    configure_key_derivation(**cfg.get_kdf_config())
+    
+    # Inisialisasi database connection (connection pool, satu koneksi per request)
+    database = get_db_connection(**cfg.get_db_config(), **cfg.get_db_pool_config())
+    
+    tokens = SessionTokenService(database, **cfg.get_session_token_config())
+    # Cache lookup user dipakai bersama AuthService, MessageService dan /api/users/<id>
+    users = UserDirectory(database, **cfg.get_user_directory_config())
+    
+    app.extensions['kripto'] = {
+        'db': database,
+        'token_service': tokens,
+        'user_directory': users,
+        'auth_service': AuthService(
+            database, create_password_hashing(**cfg.get_password_hashing_config()), tokens, users
+        ),
+        'message_service': MessageService(
+            database, **cfg.get_message_service_config(), user_directory=users,
+            attachment_store=AttachmentStore(database, **cfg.get_attachment_store_config())
+        ),
+        'allow_legacy_user_id': cfg.auth_allow_legacy_user_id
+    }
+    if cfg.auth_allow_legacy_user_id:
+        print("⚠️ AUTH_ALLOW_LEGACY_USER_ID aktif: route messaging menerima user_id tanpa token")
+    
+    app.register_blueprint(api)
+    return app
+
+
+def shutdown_app(app):
+    """
+    Lepas resource milik app (pool decrypt + DB pool).
+    Dipanggil saat worker berhenti (graceful shutdown).
+    
+    Args:
+        app: Flask app dari create_app()
+    """
+    services = app.extensions.get('kripto')
+    if not services:
+        return
+    services['message_service'].close()
+    services['auth_service'].close()
+    services['user_directory'].close()
+    services['db'].disconnect()
+
+
+@api.teardown_request
+def _discard_staging_files(exc=None):
+    """Hapus file temp upload yang tidak dipindah ke blob store (request gagal/ditolak)."""
+    for staging in getattr(request, 'staging_files', []):
+        staging.discard()
+
 
-# Inisialisasi Message Service
-message_service = MessageService(db)
+@api.errorhandler(UploadTooLargeError)
+def _upload_too_large(e):
+    return jsonify({
+        'success': False,
+        'error_type': 'FILE_TOO_LARGE',
+        'message': f'{e} (maksimal {MAX_FILE_SIZE // (1024 * 1024)}MB per file)'
+    }), 413
+
+
+def _get_request_user_id():
+    """user_id/sender_id yang dikirim client (query, JSON body atau form), None jika tidak ada."""
+    value = request.args.get('user_id')
+    if value is None:
+        data = request.get_json(silent=True) if request.is_json else request.form
+        if data:
+            value = data.get('user_id') or data.get('sender_id')
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def require_auth(view):
+    """
+    Decorator autentikasi untuk route messaging.
+    
+    Token dari header "Authorization: Bearer <token>" diverifikasi tanpa query
+    database, lalu ID user diberikan ke handler sebagai argumen current_user_id.
+    Tanpa token, user_id/sender_id dari request masih diterima selama
+    AUTH_ALLOW_LEGACY_USER_ID aktif (client lama).
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        claimed_id = _get_request_user_id()
+        auth_header = request.headers.get('Authorization', '')
+        
+        if auth_header.startswith('Bearer '):
+            try:
+                claims = token_service.verify(auth_header[7:].strip())
+            except InvalidTokenError as e:
+                return jsonify({
+                    'success': False,
+                    'error_type': 'INVALID_TOKEN',
+                    'message': str(e)
+                }), 401
+            
+            if claimed_id is not None and claimed_id != claims['uid']:
+                return jsonify({
+                    'success': False,
+                    'error_type': 'FORBIDDEN',
+                    'message': 'user_id tidak sesuai dengan token'
+                }), 403
+            kwargs['current_user_id'] = claims['uid']
+        
+        elif current_app.extensions['kripto']['allow_legacy_user_id'] and claimed_id is not None:
+            kwargs['current_user_id'] = claimed_id
+        
+        else:
+            return jsonify({
+                'success': False,
+                'error_type': 'UNAUTHORIZED',
+                'message': 'Login diperlukan (header Authorization: Bearer <token>)'
+            }), 401
+        
+        return view(*args, **kwargs)
+    
+    return wrapper
 
 
-@app.route('/')
+@api.route('/')
 def index():
     """Homepage API"""
     return jsonify({
@@ -57,6 +246,7 @@ def index():
             'users': '/api/users',
             'user_by_id': '/api/users/<id>',
             'login': '/api/login',
+            'logout': '/api/logout',  # POST - Cabut token (Authorization: Bearer <token>)
             'register': '/api/register',
             'change_password': '/api/change-password',
             'test_db': '/api/test-db',
@@ -67,11 +257,14 @@ def index():
             # File Encryption Stateless API (No Database!)
             'file_encrypt': '/api/file/encrypt',  # Upload file + password → return encrypted file
             'file_decrypt': '/api/file/decrypt',  # Upload encrypted file + password → return original file
+            'file_encrypt_stream': '/api/file/encrypt/stream',  # Multipart/octet-stream → stream file .enc
+            'file_decrypt_stream': '/api/file/decrypt/stream',  # Multipart/octet-stream → stream file asli
             # Super Encrypt Stateless API (No Database!)
             'super_encrypt': '/api/super-encrypt',  # Encrypt text: Caesar → Vigenere → DES
             'super_decrypt': '/api/super-decrypt',  # Decrypt text: DES → Vigenere → Caesar
             # Messaging API
             'send_message': '/api/messages/send',  # POST - Kirim pesan (text + optional files)
+            'broadcast': '/api/messages/broadcast',  # POST - Kirim pesan ke banyak penerima
             'inbox': '/api/messages/inbox',  # GET - Pesan masuk
             'sent_messages': '/api/messages/sent',  # GET - Pesan terkirim
             'message_detail': '/api/messages/<id>',  # GET - Detail pesan
@@ -85,7 +278,7 @@ def index():
     })
 
 
-@app.route('/tes/<koneksi>')
+@api.route('/tes/<koneksi>')
 def test_endpoint(koneksi):
     """Test endpoint"""
     return jsonify({
@@ -97,7 +290,7 @@ def test_endpoint(koneksi):
 # ==================== STEGANOGRAPHY STATELESS API ====================
 # No Database! No File Storage! Pure Processing Only!
 
-@app.route('/api/stego/encode', methods=['POST'])
+@api.route('/api/stego/encode', methods=['POST'])
 def stego_encode_stateless():
     """
     🎯 STATELESS ENCODE - Encode message ke gambar tanpa save ke database/server
@@ -193,7 +386,7 @@ def stego_encode_stateless():
         }), 500
 
 
-@app.route('/api/stego/decode', methods=['POST'])
+@api.route('/api/stego/decode', methods=['POST'])
 def stego_decode_stateless():
     """
     🔓 STATELESS DECODE - Decode message dari gambar tanpa save ke database
@@ -288,7 +481,7 @@ def stego_decode_stateless():
         }), 500
 
 
-@app.route('/api/users', methods=['GET'])
+@api.route('/api/users', methods=['GET'])
 def get_users():
     """Get semua users dari database"""
     try:
@@ -316,17 +509,16 @@ def get_users():
         }), 500
 
 
-@app.route('/api/users/<int:user_id>', methods=['GET'])
+@api.route('/api/users/<int:user_id>', methods=['GET'])
 def get_user_by_id(user_id):
     """Get user berdasarkan ID"""
     try:
-        query = "SELECT id, username, email, created_at FROM users WHERE id = %s"
-        result = db.execute_read_dict(query, (user_id,))
+        user = user_directory.get_by_id(user_id)
         
-        if result:
+        if user:
             return jsonify({
                 'success': True,
-                'user': result[0]
+                'user': user
             })
         else:
             return jsonify({
@@ -341,9 +533,9 @@ def get_user_by_id(user_id):
         }), 500
 
 
-@app.route('/api/register', methods=['POST'])
+@api.route('/api/register', methods=['POST'])
 def register():
-    """Register user baru dengan MD5 password hashing"""
+    """Register user baru (password hash scrypt/argon2id/bcrypt)"""
     try:
         data = request.get_json()
         
@@ -361,6 +553,9 @@ def register():
         # Gunakan AuthService untuk register
         result = auth_service.register_user(email, password, username)
         
+        if result.get('error_type') == 'SERVER_BUSY':
+            return jsonify(result), 503
+        
         if result['success']:
             return jsonify(result), 201
         else:
@@ -373,9 +568,9 @@ def register():
         }), 500
 
 
-@app.route('/api/login', methods=['POST'])
+@api.route('/api/login', methods=['POST'])
 def login():
-    """Login user dengan MD5 password verification"""
+    """Login user (hash MD5 lama di-upgrade otomatis)"""
     try:
         data = request.get_json()
         
@@ -392,6 +587,9 @@ def login():
         # Gunakan AuthService untuk login
         result = auth_service.login_user(email, password)
         
+        if result.get('error_type') == 'SERVER_BUSY':
+            return jsonify(result), 503
+        
         if result['success']:
             return jsonify(result), 200
         else:
@@ -406,7 +604,39 @@ def login():
         }), 500
 
 
-@app.route('/api/test-db', methods=['GET'])
+@api.route('/api/logout', methods=['POST'])
+def logout():
+    """Logout: cabut token sesi dari header Authorization"""
+    try:
+        auth_header = request.headers.get('Authorization', '')
+        if not auth_header.startswith('Bearer '):
+            return jsonify({
+                'success': False,
+                'message': 'Header Authorization: Bearer <token> harus diisi'
+            }), 400
+        
+        try:
+            token_service.revoke(auth_header[7:].strip())
+        except InvalidTokenError as e:
+            return jsonify({
+                'success': False,
+                'error_type': 'INVALID_TOKEN',
+                'message': str(e)
+            }), 401
+        
+        return jsonify({
+            'success': True,
+            'message': 'Logout berhasil'
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error: {str(e)}'
+        }), 500
+
+
+@api.route('/api/test-db', methods=['GET'])
 def test_database():
     """Test koneksi database"""
     try:
@@ -415,7 +645,13 @@ def test_database():
             return jsonify({
                 'success': True,
                 'message': 'Koneksi database berhasil',
-                'database': config.db_database
+                'database': db.database,
+                'pool': db.get_pool_stats(),
+                'plaintext_cache': message_service.get_plaintext_cache_stats(),
+                'file_kdf': get_key_derivation().get_stats(),
+                'password_hashing': auth_service.get_hashing_stats(),
+                'session_tokens': token_service.get_stats(),
+                'user_directory': user_directory.get_stats()
             })
         else:
             return jsonify({
@@ -429,7 +665,7 @@ def test_database():
         }), 500
 
 
-@app.route('/api/change-password', methods=['POST'])
+@api.route('/api/change-password', methods=['POST'])
 def change_password():
     """Change password user"""
     try:
@@ -449,6 +685,9 @@ def change_password():
         # Gunakan AuthService untuk change password
         result = auth_service.change_password(user_id, old_password, new_password)
         
+        if result.get('error_type') == 'SERVER_BUSY':
+            return jsonify(result), 503
+        
         if result['success']:
             return jsonify(result), 200
         else:
@@ -461,7 +700,7 @@ def change_password():
         }), 500
 
 
-@app.route('/api/hash-password', methods=['POST'])
+@api.route('/api/hash-password', methods=['POST'])
 def hash_password_endpoint():
     """Endpoint untuk hash password (untuk testing/migration)"""
     try:
@@ -491,8 +730,55 @@ def hash_password_endpoint():
 
 # ==================== MESSAGING API ====================
 
-@app.route('/api/messages/send', methods=['POST'])
-def send_message():
+def _save_attachment_file(file):
+    """
+    Validasi file upload dan ambil hasil staging AttachmentStore (hash + ukuran).
+    File baru dipindah ke blob store (os.replace) saat pesan disimpan.
+    
+    Returns:
+        Dictionary attachment (filename, file_type, file_size, sha256, temp_path),
+        atau None jika file dilewati (kosong, ekstensi tidak valid)
+    
+    Raises:
+        UploadTooLargeError: Jika file melebihi MAX_FILE_SIZE
+    """
+    if not file or not file.filename:
+        return None
+    
+    # Check file extension
+    if not allowed_file(file.filename):
+        return None
+    
+    # Sudah di-stream ke StagingFile oleh KriptoRequest (satu pass, hash + batas ukuran)
+    staged = message_service.attachment_store.stage(file.stream, max_size=MAX_FILE_SIZE)
+    
+    original_filename = secure_filename(file.filename)
+    
+    # Determine file type
+    ext = file.filename.rsplit('.', 1)[1].lower()
+    if ext in {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}:
+        file_type = 'image'
+    elif ext in {'pdf', 'doc', 'docx', 'txt', 'rtf'}:
+        file_type = 'document'
+    elif ext in {'zip', 'rar', '7z'}:
+        file_type = 'archive'
+    elif ext in {'mp3', 'mp4', 'avi', 'mov'}:
+        file_type = 'media'
+    elif ext in {'xlsx', 'xls', 'csv'}:
+        file_type = 'spreadsheet'
+    else:
+        file_type = 'other'
+    
+    return {
+        'filename': original_filename,
+        'file_type': file_type,
+        **staged
+    }
+
+
+@api.route('/api/messages/send', methods=['POST'])
+@require_auth
+def send_message(current_user_id):
     """
     📨 Kirim pesan ke user lain (dengan optional file attachment)
     
@@ -533,90 +819,139 @@ def send_message():
             files_list = request.files.getlist('files') if 'files' in request.files else []
         
         # Validasi input
-        if not data or not data.get('sender_id') or not data.get('receiver_email') or not data.get('message_text'):
+        if not data or not data.get('receiver_email') or not data.get('message_text'):
             return jsonify({
                 'success': False,
-                'message': 'sender_id, receiver_email, dan message_text harus diisi'
+                'message': 'receiver_email dan message_text harus diisi'
             }), 400
         
-        sender_id = int(data['sender_id'])
+        sender_id = current_user_id
         receiver_email = data['receiver_email']
         message_text = data['message_text']
         
-        # Kirim pesan (tanpa attachment dulu)
-        result = message_service.send_message(sender_id, receiver_email, message_text)
+        # Simpan file upload (if any) ke disk dulu, metadata ditulis bersama pesan
+        attachments = []
+        for file in files_list:
+            attachment = _save_attachment_file(file)
+            if attachment:
+                attachments.append(attachment)
+        
+        # Pesan + semua attachment dalam satu transaksi
+        result = message_service.send_message(sender_id, receiver_email, message_text, attachments)
         
         if not result['success']:
+            # Transaksi batal: buang file yang sudah terlanjur disimpan
+            for attachment in attachments:
+                message_service.attachment_store.discard(attachment)
             return jsonify(result), 400
         
-        message_id = result['data']['message_id']
-        attachments = []
-        
-        # Process file uploads (if any)
-        if files_list:
-            for file in files_list:
-                if file and file.filename:
-                    # Check file extension
-                    if not allowed_file(file.filename):
-                        continue
-                    
-                    # Check file size
-                    file.seek(0, os.SEEK_END)
-                    file_size = file.tell()
-                    file.seek(0)
-                    
-                    if file_size > MAX_FILE_SIZE:
-                        continue
-                    
-                    # Generate unique filename
-                    original_filename = secure_filename(file.filename)
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    unique_id = str(uuid.uuid4())[:8]
-                    filename = f"{timestamp}_{unique_id}_{original_filename}"
-                    
-                    # Save file
-                    file_path = os.path.join(UPLOAD_FOLDER, filename)
-                    file.save(file_path)
-                    
-                    # Determine file type
-                    ext = original_filename.rsplit('.', 1)[1].lower()
-                    if ext in {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}:
-                        file_type = 'image'
-                    elif ext in {'pdf', 'doc', 'docx', 'txt', 'rtf'}:
-                        file_type = 'document'
-                    elif ext in {'zip', 'rar', '7z'}:
-                        file_type = 'archive'
-                    elif ext in {'mp3', 'mp4', 'avi', 'mov'}:
-                        file_type = 'media'
-                    elif ext in {'xlsx', 'xls', 'csv'}:
-                        file_type = 'spreadsheet'
-                    else:
-                        file_type = 'other'
-                    
-                    # Save to database
-                    attachment_id = message_service.add_attachment(
-                        message_id=message_id,
-                        filename=original_filename,
-                        file_path=file_path,
-                        file_type=file_type,
-                        file_size=file_size
-                    )
-                    
-                    attachments.append({
-                        'id': attachment_id,
-                        'filename': original_filename,
-                        'file_type': file_type,
-                        'file_size': file_size,
-                        'download_url': f'/api/messages/attachments/{attachment_id}'
-                    })
-        
         # Update response with attachments
         if attachments:
             result['message'] = f"Pesan berhasil dikirim dengan {len(attachments)} attachment"
-            result['data']['attachments'] = attachments
+            result['data']['attachments'] = [
+                {
+                    'id': attachment['id'],
+                    'filename': attachment['filename'],
+                    'file_type': attachment['file_type'],
+                    'file_size': attachment['file_size'],
+                    'download_url': f"/api/messages/attachments/{attachment['id']}"
+                }
+                for attachment in result['data']['attachments']
+            ]
+        
+        return jsonify(result), 201
+    
+    except UploadTooLargeError:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'message': f'Error: {str(e)}'
+        }), 500
+
+
+@api.route('/api/messages/broadcast', methods=['POST'])
+@require_auth
+def send_broadcast(current_user_id):
+    """
+    📢 Kirim pesan yang sama ke banyak penerima (enkripsi dan upload sekali)
+    
+    Mode 1 - Text Only (JSON):
+    {
+        "receiver_emails": ["a@example.com", "b@example.com"],
+        "message_text": "Pengumuman!"
+    }
+    
+    Mode 2 - Text + Files (Form-Data):
+    - receiver_emails: a@example.com,b@example.com (atau field berulang)
+    - message_text: Pengumuman dengan lampiran
+    - files: [file1.pdf] (optional, disimpan sekali untuk semua penerima)
+    
+    Response:
+    {
+        "success": true,
+        "message": "Pesan terkirim ke 1 dari 2 penerima",
+        "data": {
+            "broadcast_id": "...",
+            "sent": 1,
+            "failed": 1,
+            "results": [
+                {"email": "a@example.com", "success": true, "message_id": 124, ...},
+                {"email": "b@example.com", "success": false, "message": "Penerima tidak ditemukan"}
+            ]
+        }
+    }
+    """
+    try:
+        if request.is_json:
+            data = request.get_json()
+            receiver_emails = data.get('receiver_emails') if data else None
+            files_list = []
+        else:
+            data = request.form
+            receiver_emails = [
+                email
+                for value in data.getlist('receiver_emails')
+                for email in value.split(',')
+            ]
+            files_list = request.files.getlist('files') if 'files' in request.files else []
+        
+        # Validasi input
+        if not data or not isinstance(receiver_emails, list) or not receiver_emails \
+                or not data.get('message_text'):
+            return jsonify({
+                'success': False,
+                'message': 'receiver_emails (list) dan message_text harus diisi'
+            }), 400
+        
+        # File disimpan sekali, dirujuk oleh semua pesan broadcast
+        attachments = []
+        for file in files_list:
+            attachment = _save_attachment_file(file)
+            if attachment:
+                attachments.append(attachment)
+        
+        result = message_service.send_broadcast(
+            current_user_id, receiver_emails, data['message_text'], attachments
+        )
+        
+        if not result['success']:
+            for attachment in attachments:
+                message_service.attachment_store.discard(attachment)
+            return jsonify(result), 400
+        
+        for entry in result['data']['results']:
+            if 'attachment_ids' in entry:
+                entry['download_urls'] = [
+                    f'/api/messages/attachments/{attachment_id}'
+                    for attachment_id in entry['attachment_ids']
+                ]
         
         return jsonify(result), 201
     
+    except UploadTooLargeError:
+        raise
     except Exception as e:
         traceback.print_exc()
         return jsonify({
@@ -625,17 +960,19 @@ def send_message():
         }), 500
 
 
-@app.route('/api/messages/inbox', methods=['GET'])
-def get_inbox():
+@api.route('/api/messages/inbox', methods=['GET'])
+@require_auth
+def get_inbox(current_user_id):
     """
     📬 Ambil pesan masuk (inbox)
     
     Query Parameters:
-    - user_id: ID user (required)
+    - user_id: ID user (hanya client lama tanpa token)
     - limit: Jumlah pesan (default: 50)
     - offset: Offset untuk pagination (default: 0)
+    - cursor: Cursor halaman berikutnya (opsional, dari next_cursor; menggantikan offset)
     
-    Example: /api/messages/inbox?user_id=1&limit=20&offset=0
+    Example: /api/messages/inbox?user_id=1&limit=20&cursor=WyIyMDI1LTExLTAxVDEwOjMwOjAwIiwxMjNd
     
     Response:
     {
@@ -644,23 +981,22 @@ def get_inbox():
             "messages": [...],
             "total": 100,
             "limit": 20,
-            "offset": 0
+            "offset": 0,
+            "next_cursor": "WyIyMDI1..."  // null jika sudah halaman terakhir
         }
     }
     """
     try:
-        user_id = request.args.get('user_id')
         limit = request.args.get('limit', 50, type=int)
         offset = request.args.get('offset', 0, type=int)
+        cursor = request.args.get('cursor')
         
-        if not user_id:
-            return jsonify({
-                'success': False,
-                'message': 'user_id harus diisi'
-            }), 400
+        result = message_service.get_inbox(current_user_id, limit, offset, cursor)
         
-        result = message_service.get_inbox(int(user_id), limit, offset)
-        return jsonify(result), 200
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
     
     except Exception as e:
         traceback.print_exc()
@@ -670,17 +1006,19 @@ def get_inbox():
         }), 500
 
 
-@app.route('/api/messages/sent', methods=['GET'])
-def get_sent_messages():
+@api.route('/api/messages/sent', methods=['GET'])
+@require_auth
+def get_sent_messages(current_user_id):
     """
     📤 Ambil pesan terkirim (sent messages)
     
     Query Parameters:
-    - user_id: ID user (required)
+    - user_id: ID user (hanya client lama tanpa token)
     - limit: Jumlah pesan (default: 50)
     - offset: Offset untuk pagination (default: 0)
+    - cursor: Cursor halaman berikutnya (opsional, dari next_cursor; menggantikan offset)
     
-    Example: /api/messages/sent?user_id=1&limit=20&offset=0
+    Example: /api/messages/sent?user_id=1&limit=20&cursor=WyIyMDI1LTExLTAxVDEwOjMwOjAwIiwxMjNd
     
     Response:
     {
@@ -689,23 +1027,22 @@ def get_sent_messages():
             "messages": [...],
             "total": 50,
             "limit": 20,
-            "offset": 0
+            "offset": 0,
+            "next_cursor": "WyIyMDI1..."  // null jika sudah halaman terakhir
         }
     }
     """
     try:
-        user_id = request.args.get('user_id')
         limit = request.args.get('limit', 50, type=int)
         offset = request.args.get('offset', 0, type=int)
+        cursor = request.args.get('cursor')
         
-        if not user_id:
-            return jsonify({
-                'success': False,
-                'message': 'user_id harus diisi'
-            }), 400
+        result = message_service.get_sent_messages(current_user_id, limit, offset, cursor)
         
-        result = message_service.get_sent_messages(int(user_id), limit, offset)
-        return jsonify(result), 200
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
     
     except Exception as e:
         traceback.print_exc()
@@ -715,13 +1052,14 @@ def get_sent_messages():
         }), 500
 
 
-@app.route('/api/messages/<int:message_id>', methods=['GET'])
-def get_message_detail(message_id):
+@api.route('/api/messages/<int:message_id>', methods=['GET'])
+@require_auth
+def get_message_detail(message_id, current_user_id):
     """
     📄 Ambil detail pesan
     
     Query Parameters:
-    - user_id: ID user yang mengakses (required)
+    - user_id: ID user yang mengakses (hanya client lama tanpa token)
     
     Example: /api/messages/123?user_id=1
     
@@ -740,15 +1078,7 @@ def get_message_detail(message_id):
     }
     """
     try:
-        user_id = request.args.get('user_id')
-        
-        if not user_id:
-            return jsonify({
-                'success': False,
-                'message': 'user_id harus diisi'
-            }), 400
-        
-        result = message_service.get_message_detail(message_id, int(user_id))
+        result = message_service.get_message_detail(message_id, current_user_id)
         
         if result['success']:
             return jsonify(result), 200
@@ -763,8 +1093,9 @@ def get_message_detail(message_id):
         }), 500
 
 
-@app.route('/api/messages/<int:message_id>', methods=['DELETE'])
-def delete_message(message_id):
+@api.route('/api/messages/<int:message_id>', methods=['DELETE'])
+@require_auth
+def delete_message(message_id, current_user_id):
     """
     🗑️ Hapus pesan
     
@@ -780,16 +1111,7 @@ def delete_message(message_id):
     }
     """
     try:
-        data = request.get_json()
-        
-        if not data or not data.get('user_id'):
-            return jsonify({
-                'success': False,
-                'message': 'user_id harus diisi'
-            }), 400
-        
-        user_id = data['user_id']
-        result = message_service.delete_message(message_id, user_id)
+        result = message_service.delete_message(message_id, current_user_id)
         
         if result['success']:
             return jsonify(result), 200
@@ -804,14 +1126,16 @@ def delete_message(message_id):
         }), 500
 
 
-@app.route('/api/messages/conversation/<int:other_user_id>', methods=['GET'])
-def get_conversation(other_user_id):
+@api.route('/api/messages/conversation/<int:other_user_id>', methods=['GET'])
+@require_auth
+def get_conversation(other_user_id, current_user_id):
     """
     💬 Ambil percakapan dengan user tertentu
     
     Query Parameters:
-    - user_id: ID user yang mengakses (required)
+    - user_id: ID user yang mengakses (hanya client lama tanpa token)
     - limit: Jumlah pesan (default: 50)
+    - cursor: Cursor halaman berikutnya (opsional, dari next_cursor)
     
     Example: /api/messages/conversation/2?user_id=1&limit=50
     
@@ -825,24 +1149,21 @@ def get_conversation(other_user_id):
                 "email": "jane@example.com"
             },
             "messages": [...],
-            "total": 25
+            "total": 25,
+            "next_cursor": "WyIyMDI1..."  // null jika sudah halaman terakhir
         }
     }
     """
     try:
-        user_id = request.args.get('user_id')
         limit = request.args.get('limit', 50, type=int)
+        cursor = request.args.get('cursor')
         
-        if not user_id:
-            return jsonify({
-                'success': False,
-                'message': 'user_id harus diisi'
-            }), 400
-        
-        result = message_service.get_conversation(int(user_id), other_user_id, limit)
+        result = message_service.get_conversation(current_user_id, other_user_id, limit, cursor)
         
         if result['success']:
             return jsonify(result), 200
+        elif result.get('error_type') == 'INVALID_CURSOR':
+            return jsonify(result), 400
         else:
             return jsonify(result), 404
     
@@ -854,13 +1175,14 @@ def get_conversation(other_user_id):
         }), 500
 
 
-@app.route('/api/messages/search', methods=['GET'])
-def search_messages():
+@api.route('/api/messages/search', methods=['GET'])
+@require_auth
+def search_messages(current_user_id):
     """
     🔍 Cari pesan berdasarkan keyword
     
     Query Parameters:
-    - user_id: ID user (required)
+    - user_id: ID user (hanya client lama tanpa token)
     - keyword: Kata kunci pencarian (required)
     - limit: Jumlah hasil (default: 50)
     
@@ -877,17 +1199,16 @@ def search_messages():
     }
     """
     try:
-        user_id = request.args.get('user_id')
         keyword = request.args.get('keyword')
         limit = request.args.get('limit', 50, type=int)
         
-        if not user_id or not keyword:
+        if not keyword:
             return jsonify({
                 'success': False,
-                'message': 'user_id dan keyword harus diisi'
+                'message': 'keyword harus diisi'
             }), 400
         
-        result = message_service.search_messages(int(user_id), keyword, limit)
+        result = message_service.search_messages(current_user_id, keyword, limit)
         return jsonify(result), 200
     
     except Exception as e:
@@ -898,18 +1219,24 @@ def search_messages():
         }), 500
 
 
-@app.route('/api/messages/attachments/<int:attachment_id>', methods=['GET'])
-def download_attachment(attachment_id):
+@api.route('/api/messages/attachments/<int:attachment_id>', methods=['GET'])
+@require_auth
+def download_attachment(attachment_id, current_user_id):
     """
     📎 Download file attachment dari pesan
     
     Query Parameters:
-    - user_id: ID user yang download (required)
+    - user_id: ID user yang download (hanya client lama tanpa token)
+    
+    Headers (optional):
+    - If-None-Match: ETag dari download sebelumnya -> 304 jika file sama
+    - Range: bytes=<start>-<end> -> 206 Partial Content (resume download)
+    - If-Range: ETag; Range hanya dipakai jika file belum berubah
     
     Example: /api/messages/attachments/1?user_id=2
     
     Response:
-    - File binary (download)
+    - File binary (download), dengan ETag dan Accept-Ranges: bytes
     
     Error Response:
     {
@@ -918,16 +1245,8 @@ def download_attachment(attachment_id):
     }
     """
     try:
-        user_id = request.args.get('user_id')
-        
-        if not user_id:
-            return jsonify({
-                'success': False,
-                'message': 'user_id harus diisi'
-            }), 400
-        
-        # Get attachment info dengan validasi akses
-        attachment = message_service.get_attachment(attachment_id, int(user_id))
+        # Metadata + validasi akses + status blob dalam satu query (PK lookup)
+        attachment = message_service.get_attachment(attachment_id, current_user_id)
         
         if not attachment:
             return jsonify({
@@ -935,22 +1254,13 @@ def download_attachment(attachment_id):
                 'message': 'Attachment tidak ditemukan atau Anda tidak memiliki akses'
             }), 404
         
-        file_path = attachment['file_path']
-        filename = attachment['filename']
-        
-        # Check if file exists
-        if not os.path.exists(file_path):
-            return jsonify({
-                'success': False,
-                'message': 'File tidak ditemukan di server'
-            }), 404
-        
-        # Send file
-        return send_file(
-            file_path,
-            as_attachment=True,
-            download_name=filename
-        )
+        return _attachment_response(attachment)
+    
+    except FileNotFoundError:
+        return jsonify({
+            'success': False,
+            'message': 'File tidak ditemukan di server'
+        }), 404
     
     except Exception as e:
         traceback.print_exc()
@@ -960,9 +1270,93 @@ def download_attachment(attachment_id):
         }), 500
 
 
+def _attachment_response(attachment):
+    """
+    Response download attachment dengan conditional GET dan Range.
+    
+    ETag (strong) diambil dari hash konten blob_sha256, jadi If-None-Match
+    dibalas 304 tanpa membuka file. File dibaca per chunk selagi dikirim;
+    untuk blob terenkripsi hanya chunk AES yang mencakup Range yang
+    didekripsi. Attachment lama tanpa blob_sha256 tetap mendukung Range,
+    tetapi tanpa ETag.
+    
+    Raises:
+        FileNotFoundError: Jika file blob tidak ada di disk
+    """
+    etag = attachment.get('blob_sha256')
+    if etag and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    
+    store = message_service.attachment_store
+    encrypted = bool(attachment.get('encrypted'))
+    filename = attachment['filename']
+    f = open(attachment['file_path'], 'rb')
+    try:
+        size = store.get_content_size(f, encrypted)
+        start, end, status = 0, size, 200
+        byte_range = _single_byte_range(request.range) if _if_range_matches(etag) else None
+        if byte_range is not None:
+            content_range = byte_range.range_for_length(size)
+            if content_range is None:
+                # Hanya satu range bytes yang mulai di/atas ukuran file
+                f.close()
+                return Response(status=416, headers={'Content-Range': f'bytes */{size}'})
+            (start, end), status = content_range, 206
+        
+        response = Response(
+            stream_with_context(store.iter_content(f, encrypted, start, end)),
+            status=status,
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+            direct_passthrough=True
+        )
+    except Exception:
+        f.close()
+        raise
+    
+    response.call_on_close(f.close)
+    response.content_length = end - start
+    response.accept_ranges = 'bytes'
+    response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    if status == 206:
+        response.content_range = ContentRange('bytes', start, end, size)
+    if etag:
+        response.set_etag(etag)
+    # Konten user: jangan disimpan shared cache, selalu revalidasi (ETag -> 304)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _single_byte_range(range_header):
+    """
+    Range yang dilayani dengan 206: hanya satu range dengan unit bytes.
+    Multi-range dan unit lain diabaikan (dikirim penuh, 200), bukan 416.
+    """
+    if range_header is None or range_header.units != 'bytes' or len(range_header.ranges) != 1:
+        return None
+    return range_header
+
+
+def _if_range_matches(etag):
+    """
+    If-Range: Range hanya dipakai jika ETag sama (tanggal tidak didukung -> kirim penuh).
+    Perbandingan harus strong (RFC 9110 §13.1.5): ETag weak (W/"...") tidak pernah cocok.
+    """
+    if_range = request.if_range
+    if if_range.etag is None and if_range.date is None:
+        return True
+    if request.headers.get('If-Range', '').strip().startswith('W/'):
+        return False
+    return bool(etag) and if_range.etag == etag
+
+
 # ==================== FILE ENCRYPTION API (STATELESS) ====================
 
-@app.route('/api/file/encrypt', methods=['POST'])
+@api.route('/api/file/encrypt', methods=['POST'])
 def file_encrypt_stateless():
     """
     🔐 STATELESS FILE ENCRYPT - Encrypt file tanpa save ke database/server
@@ -983,8 +1377,8 @@ def file_encrypt_stateless():
         "data": {
             "encrypted_file": "base64_encrypted_data",
             "original_size": 12345,
-            "encrypted_size": 12368,
-            "algorithm": "AES-256-CBC",
+            "encrypted_size": 12398,
+            "algorithm": "AES-256-GCM-CHUNKED",
             "filename": "dokumen.pdf.enc"
         }
     }
@@ -1012,25 +1406,18 @@ def file_encrypt_stateless():
         print(f"🔐 Encrypting file with password...")
         
         # Import AES encryption
-        from utils.aes_file_encryption import AESFileEncryption
+        from utils.aes_file_encryption import AESChunkedEncryption
         import base64
         
         # Decode base64 to bytes
         file_bytes = base64.b64decode(file_base64)
         original_size = len(file_bytes)
         
-        # Create AES cipher
-        aes = AESFileEncryption(password)
+        # Create AES cipher (key dari password via KDF + salt di header)
+        aes = AESChunkedEncryption(password)
         
-        # Encrypt (manual encryption tanpa file)
-        from Crypto.Cipher import AES
-        from Crypto.Util.Padding import pad
-        
-        cipher = AES.new(aes.key, AES.MODE_CBC)
-        ciphertext = cipher.encrypt(pad(file_bytes, AES.block_size))
-        
-        # Combine IV + ciphertext
-        encrypted_bytes = cipher.iv + ciphertext
+        # Encrypt (header + chunk AES-GCM)
+        encrypted_bytes = b''.join(aes.iter_encrypt([file_bytes]))
         
         # Encode to base64
         encrypted_base64 = base64.b64encode(encrypted_bytes).decode('utf-8')
@@ -1045,7 +1432,7 @@ def file_encrypt_stateless():
                 'encrypted_file': encrypted_base64,
                 'original_size': original_size,
                 'encrypted_size': len(encrypted_bytes),
-                'algorithm': 'AES-256-CBC',
+                'algorithm': aes.algorithm,
                 'filename': filename + '.enc',
                 'note': 'Download file dengan decode base64 dan simpan dengan extension .enc'
             }
@@ -1060,7 +1447,7 @@ def file_encrypt_stateless():
         }), 500
 
 
-@app.route('/api/file/decrypt', methods=['POST'])
+@api.route('/api/file/decrypt', methods=['POST'])
 def file_decrypt_stateless():
     """
     🔓 STATELESS FILE DECRYPT - Decrypt file tanpa save ke database
@@ -1081,7 +1468,7 @@ def file_decrypt_stateless():
         "data": {
             "decrypted_file": "base64_original_data",
             "decrypted_size": 12345,
-            "algorithm": "AES-256-CBC",
+            "algorithm": "AES-256-GCM-CHUNKED",
             "filename": "dokumen.pdf"
         }
     }
@@ -1109,24 +1496,17 @@ def file_decrypt_stateless():
         print(f"🔓 Decrypting file with password...")
         
         # Import AES encryption
-        from utils.aes_file_encryption import AESFileEncryption
+        from utils.aes_file_encryption import open_file_encryption
         import base64
-        from Crypto.Cipher import AES
-        from Crypto.Util.Padding import unpad
         
         # Decode base64 to bytes
         encrypted_bytes = base64.b64decode(file_base64)
         
-        # Extract IV (first 16 bytes) and ciphertext
-        iv = encrypted_bytes[:16]
-        ciphertext = encrypted_bytes[16:]
-        
-        # Create AES cipher
-        aes = AESFileEncryption(password)
-        cipher = AES.new(aes.key, AES.MODE_CBC, iv)
+        # Pilih format dari header: AES-GCM chunked (baru) atau IV + AES-CBC (lama)
+        aes = open_file_encryption(password, encrypted_bytes)
         
         # Decrypt
-        decrypted_bytes = unpad(cipher.decrypt(ciphertext), AES.block_size)
+        decrypted_bytes = b''.join(aes.iter_decrypt([encrypted_bytes]))
         
         # Encode to base64
         decrypted_base64 = base64.b64encode(decrypted_bytes).decode('utf-8')
@@ -1143,7 +1523,7 @@ def file_decrypt_stateless():
             'data': {
                 'decrypted_file': decrypted_base64,
                 'decrypted_size': len(decrypted_bytes),
-                'algorithm': 'AES-256-CBC',
+                'algorithm': aes.algorithm,
                 'filename': original_filename,
                 'note': 'Download file dengan decode base64'
             }
@@ -1167,9 +1547,169 @@ def file_decrypt_stateless():
         }), 500
 
 
+def _get_stream_upload():
+    """
+    Ambil input untuk endpoint file streaming.
+    
+    Mendukung multipart/form-data (field 'file' + 'password') atau body
+    mentah application/octet-stream (password di header X-File-Password,
+    nama file di header X-Filename atau query ?filename=).
+    
+    Returns:
+        Tuple (stream, filename, password)
+    """
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        password = request.headers.get('X-File-Password') or request.form.get('password')
+        if not upload:
+            return None, None, password
+        
+        # Lepas stream dari FileStorage: Flask menutup file upload saat request
+        # context selesai, padahal response streaming masih membacanya.
+        # Stream ditutup oleh _octet_stream_response setelah response selesai.
+        stream = upload.stream
+        upload.stream = io.BytesIO()
+        return stream, upload.filename, password
+    
+    filename = request.headers.get('X-Filename') or request.args.get('filename')
+    return request.stream, filename, request.headers.get('X-File-Password')
+
+
+def _octet_stream_response(chunks, filename, stream=None):
+    """
+    Response application/octet-stream dari generator bytes.
+    
+    Chunk pertama diambil sebelum response dikirim, sehingga error di awal
+    (header tidak valid, chunk pertama gagal verifikasi) masih bisa dibalas
+    sebagai JSON 400.
+    
+    Args:
+        chunks: Iterable bytes isi response
+        filename: Nama file untuk Content-Disposition
+        stream: Stream input yang ditutup setelah response selesai (optional)
+    """
+    chunks = iter(chunks)
+    first = next(chunks, b'')
+    
+    def generate():
+        yield first
+        yield from chunks
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='application/octet-stream',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+    if stream is not None and stream is not request.stream:
+        response.call_on_close(stream.close)
+    return response
+
+
+@api.route('/api/file/encrypt/stream', methods=['POST'])
+def file_encrypt_stream():
+    """
+    🔐 STREAMING FILE ENCRYPT - Versi binary dari /api/file/encrypt
+    
+    Request:
+        multipart/form-data: file=<file>, password=<password>
+        atau body application/octet-stream + header X-File-Password (+ X-Filename)
+        Query ?format=cbc untuk format AES-CBC lama (default: AES-GCM chunked,
+        sama dengan /api/file/encrypt)
+    
+    Response:
+        application/octet-stream (file .enc), dikirim bertahap per chunk
+    """
+    try:
+        stream, filename, password = _get_stream_upload()
+        
+        if stream is None or not password:
+            return jsonify({
+                'success': False,
+                'message': 'file dan password harus diisi'
+            }), 400
+        
+        from utils.aes_file_encryption import AESChunkedEncryption, AESFileEncryption, read_chunks
+        
+        if request.args.get('format') == 'cbc':
+            aes = AESFileEncryption(password)
+        else:
+            aes = AESChunkedEncryption(password)
+        
+        output_name = secure_filename(filename or 'file') + '.enc'
+        print(f"🔐 Streaming encrypt ({aes.algorithm}) → {output_name}")
+        
+        return _octet_stream_response(aes.iter_encrypt(read_chunks(stream)), output_name, stream)
+    
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error_type': 'ENCRYPTION_ERROR',
+            'message': f'Error saat enkripsi: {str(e)}'
+        }), 500
+
+
+@api.route('/api/file/decrypt/stream', methods=['POST'])
+def file_decrypt_stream():
+    """
+    🔓 STREAMING FILE DECRYPT - Versi binary dari /api/file/decrypt
+    
+    Request:
+        multipart/form-data: file=<file .enc>, password=<password>
+        atau body application/octet-stream + header X-File-Password (+ X-Filename)
+        Format (AES-CBC atau AES-GCM chunked) dideteksi otomatis.
+    
+    Response:
+        application/octet-stream (file asli), dikirim bertahap per chunk
+    
+    Note:
+        Format AES-CBC tidak punya autentikasi, jadi password salah baru
+        ketahuan di block terakhir; response akan terputus di tengah.
+        Format chunked gagal sejak chunk pertama (JSON 400).
+    """
+    try:
+        stream, filename, password = _get_stream_upload()
+        
+        if stream is None or not password:
+            return jsonify({
+                'success': False,
+                'message': 'file dan password harus diisi'
+            }), 400
+        
+        from utils.aes_file_encryption import AESChunkedEncryption, open_file_encryption, read_chunks
+        from itertools import chain
+        
+        # Header menentukan format file
+        head = stream.read(AESChunkedEncryption.HEADER_SIZE)
+        aes = open_file_encryption(password, head)
+        
+        filename = filename or 'file.enc'
+        output_name = secure_filename(filename[:-4] if filename.endswith('.enc') else filename) or 'file'
+        print(f"🔓 Streaming decrypt ({aes.algorithm}) → {output_name}")
+        
+        return _octet_stream_response(aes.iter_decrypt(chain([head], read_chunks(stream))), output_name, stream)
+    
+    except ValueError as e:
+        # Wrong password or corrupted data
+        return jsonify({
+            'success': False,
+            'error_type': 'WRONG_PASSWORD',
+            'message': 'Password salah atau file rusak',
+            'details': str(e)
+        }), 400
+    
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error_type': 'DECRYPTION_ERROR',
+            'message': f'Error saat dekripsi: {str(e)}'
+        }), 500
+
+
 # ==================== SUPER ENCRYPT (STATELESS) ====================
 
-@app.route('/api/super-encrypt', methods=['POST'])
+@api.route('/api/super-encrypt', methods=['POST'])
 def super_encrypt_text():
     """
     Super Encrypt - Triple layer encryption (Caesar → Vigenere → DES)
@@ -1245,7 +1785,7 @@ def super_encrypt_text():
         }), 500
 
 
-@app.route('/api/super-decrypt', methods=['POST'])
+@api.route('/api/super-decrypt', methods=['POST'])
 def super_decrypt_text():
     """
     Super Decrypt - Reverse triple layer decryption (DES → Vigenere → Caesar)
@@ -1355,8 +1895,10 @@ if __name__ == '__main__':
     print("   - Stateless Super Encrypt (Caesar+Vigenere+DES)")
     print("   - Messaging System (Email-like)")
     config.display_config()
+    print("Development server. Untuk production: python serve.py")
     print("="*50 + "\n")
     
+    app = create_app()
     app.run(
         host=config.flask_host,
         port=config.flask_port,
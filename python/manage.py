@@ -0,0 +1,205 @@
+"""
+Management Commands
+Perintah maintenance untuk database Kripto App (dijalankan dari folder python/)
+
+Usage:
+    python manage.py rebuild-message-stats [--batch-size 1000]
+    python manage.py backfill-search-index [--batch-size 500]
+    python manage.py migrate-message-format [--batch-size 500] [--pause 0.1]
+    python manage.py calibrate-password-hash [--scheme scrypt] [--target-ms 250]
+    python manage.py purge-revoked-tokens
+    python manage.py migrate-attachments [--batch-size 200]
+    python manage.py encrypt-attachments [--batch-size 200]
+"""
+
+import argparse
+import sys
+
+from attachment_store import AttachmentStore
+from config import config
+from connection import get_db_connection
+from message_service import MessageService
+from session_tokens import SessionTokenService
+from utils.password_hashing import calibrate
+
+
+def _get_db():
+    """Buat koneksi database dari konfigurasi .env (tanpa pool)."""
+    db = get_db_connection(**config.get_db_config(), batch_size=config.db_batch_size)
+    if not db.connection:
+        print("✗ Tidak bisa terhubung ke database")
+        sys.exit(1)
+    return db
+
+
+def _require_attachment_key():
+    """Hentikan command jika enkripsi attachment aktif tanpa ATTACHMENT_ENCRYPTION_KEY."""
+    if config.attachment_encryption_enabled and not config.attachment_encryption_configured:
+        print("✗ ATTACHMENT_ENCRYPTION_KEY (64 karakter hex) wajib di-set jika "
+              "ATTACHMENT_ENCRYPTION_ENABLED=true")
+        sys.exit(1)
+
+
+def _get_message_service(db):
+    """Buat MessageService dengan konfigurasi yang sama seperti main.py."""
+    return MessageService(db, **config.get_message_service_config())
+
+
+def rebuild_message_stats(args):
+    """Hitung ulang tabel user_message_stats dari tabel messages."""
+    db = _get_db()
+    try:
+        message_service = _get_message_service(db)
+        processed = message_service.rebuild_message_stats(batch_size=args.batch_size)
+        print(f"✅ Rekonsiliasi selesai: {processed} user")
+    finally:
+        db.disconnect()
+
+
+def backfill_search_index(args):
+    """Isi blind search index untuk pesan yang sudah ada."""
+    if not config.search_index_key:
+        print("✗ Search index dimatikan (SEARCH_INDEX_ENABLED=false)")
+        sys.exit(1)
+    
+    db = _get_db()
+    message_service = _get_message_service(db)
+    try:
+        processed = message_service.backfill_search_index(batch_size=args.batch_size)
+        print(f"✅ Backfill selesai: {processed} pesan")
+    finally:
+        message_service.close()
+        db.disconnect()
+
+
+def migrate_message_format(args):
+    """Konversi pesan JSON lama ke envelope binary (online, per batch)."""
+    db = _get_db()
+    try:
+        message_service = _get_message_service(db)
+        result = message_service.migrate_message_format(batch_size=args.batch_size, pause=args.pause)
+        print(f"✅ Migrasi selesai: {result['converted']} dikonversi, {result['skipped']} dilewati")
+    finally:
+        db.disconnect()
+
+
+def calibrate_password_hash(args):
+    """Pilih parameter cost hashing password untuk target latency di host ini."""
+    try:
+        result = calibrate(args.scheme, target_ms=args.target_ms)
+    except ImportError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    
+    for step in result['measurements']:
+        print(f"   {step['params']}: {step['ms']} ms")
+    
+    print(f"✅ Parameter untuk ~{args.target_ms} ms ({args.scheme}), tambahkan ke .env:")
+    print(f"PASSWORD_HASH_SCHEME={args.scheme}")
+    for key, value in result['params'].items():
+        print(f"PASSWORD_{key.upper()}={value}")
+
+
+def purge_revoked_tokens(args):
+    """Hapus token dicabut yang sudah kedaluwarsa dari tabel revoked_tokens."""
+    db = _get_db()
+    try:
+        token_service = SessionTokenService(db, **config.get_session_token_config())
+        if not token_service.purge_expired():
+            print("✗ Gagal menghapus token kedaluwarsa")
+            sys.exit(1)
+        print("✅ Token dicabut yang sudah kedaluwarsa dihapus")
+    finally:
+        db.disconnect()
+
+
+def migrate_attachments(args):
+    """Pindahkan file attachment lama ke blob store content-addressed (dedup)."""
+    _require_attachment_key()
+    db = _get_db()
+    try:
+        store = AttachmentStore(db, **config.get_attachment_store_config())
+        result = store.migrate_legacy_files(batch_size=args.batch_size)
+        print(f"✅ Migrasi attachment selesai: {result['migrated']} dimigrasi, "
+              f"{result['deduplicated']} duplikat digabung, {result['missing']} file hilang")
+    finally:
+        db.disconnect()
+
+
+def encrypt_attachments(args):
+    """Enkripsi blob attachment lama yang masih plaintext (enkripsi at-rest)."""
+    if not config.attachment_encryption_enabled:
+        print("✗ ATTACHMENT_ENCRYPTION_ENABLED=false, tidak ada yang dienkripsi")
+        sys.exit(1)
+    _require_attachment_key()
+    db = _get_db()
+    try:
+        store = AttachmentStore(db, **config.get_attachment_store_config())
+        result = store.encrypt_plaintext_blobs(batch_size=args.batch_size)
+        print(f"✅ Enkripsi attachment selesai: {result['encrypted']} dienkripsi, "
+              f"{result['deduplicated']} duplikat digabung, {result['missing']} file hilang")
+    finally:
+        db.disconnect()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kripto App management commands")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    stats_parser = subparsers.add_parser(
+        'rebuild-message-stats',
+        help='Hitung ulang counter inbox/sent di user_message_stats (hentikan penulisan pesan dulu)'
+    )
+    stats_parser.add_argument('--batch-size', type=int, default=1000)
+    stats_parser.set_defaults(func=rebuild_message_stats)
+    
+    search_parser = subparsers.add_parser(
+        'backfill-search-index',
+        help='Bangun blind search index untuk pesan lama'
+    )
+    search_parser.add_argument('--batch-size', type=int, default=500)
+    search_parser.set_defaults(func=backfill_search_index)
+    
+    format_parser = subparsers.add_parser(
+        'migrate-message-format',
+        help='Konversi pesan JSON/base64 lama ke envelope binary'
+    )
+    format_parser.add_argument('--batch-size', type=int, default=500)
+    format_parser.add_argument('--pause', type=float, default=0.0,
+                               help='Jeda antar batch (detik)')
+    format_parser.set_defaults(func=migrate_message_format)
+    
+    calibrate_parser = subparsers.add_parser(
+        'calibrate-password-hash',
+        help='Ukur cost hashing password dan sarankan parameter untuk target latency'
+    )
+    calibrate_parser.add_argument('--scheme', choices=['scrypt', 'argon2id', 'bcrypt'], default='scrypt')
+    calibrate_parser.add_argument('--target-ms', type=float, default=250)
+    calibrate_parser.set_defaults(func=calibrate_password_hash)
+    
+    purge_parser = subparsers.add_parser(
+        'purge-revoked-tokens',
+        help='Hapus token sesi dicabut yang sudah kedaluwarsa'
+    )
+    purge_parser.set_defaults(func=purge_revoked_tokens)
+    
+    attachments_parser = subparsers.add_parser(
+        'migrate-attachments',
+        help='Pindahkan file attachment lama ke blob store (dedup per hash)'
+    )
+    attachments_parser.add_argument('--batch-size', type=int, default=200)
+    attachments_parser.set_defaults(func=migrate_attachments)
+    
+    encrypt_parser = subparsers.add_parser(
+        'encrypt-attachments',
+        help='Enkripsi blob attachment lama yang masih plaintext'
+    )
+    encrypt_parser.add_argument('--batch-size', type=int, default=200)
+    encrypt_parser.set_defaults(func=encrypt_attachments)
+    
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
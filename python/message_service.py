@@ -4,36 +4,227 @@ Modul untuk mengelola fitur pengiriman pesan antar user (seperti email internal)
 Dengan enkripsi DES untuk keamanan pesan
 """
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from itertools import repeat
 from utils.des_encryption import DESEncryption
+from utils.ttl_cache import TTLCache
+from attachment_store import AttachmentStore
+from search_index import SearchIndex
+from user_directory import UserDirectory
+import base64
+import hashlib
 import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+
+
+# Format envelope binary pesan: [version 1 byte][IV 8 byte][raw ciphertext]
+ENVELOPE_VERSION = 0x01
+ENVELOPE_IV_SIZE = 8
+
+
+def pack_envelope(iv, ciphertext):
+    """
+    Bungkus IV + ciphertext DES menjadi envelope binary versi 1.
+    
+    Args:
+        iv: IV DES (8 bytes)
+        ciphertext: Raw ciphertext (bytes)
+    
+    Returns:
+        Bytes envelope untuk kolom messages.message_ciphertext
+    """
+    return bytes([ENVELOPE_VERSION]) + iv + ciphertext
+
+
+def unpack_envelope(envelope):
+    """
+    Pisahkan envelope binary menjadi (iv, ciphertext).
+    
+    Raises:
+        ValueError: Jika versi envelope tidak dikenal
+    """
+    if not envelope or envelope[0] != ENVELOPE_VERSION:
+        raise ValueError("Versi envelope pesan tidak dikenal")
+    iv = envelope[1:1 + ENVELOPE_IV_SIZE]
+    ciphertext = envelope[1 + ENVELOPE_IV_SIZE:]
+    return iv, ciphertext
+
+
+def json_to_envelope(encrypted_data):
+    """
+    Konversi format lama (JSON ciphertext/iv base64) ke envelope binary
+    tanpa decrypt.
+    
+    Args:
+        encrypted_data: JSON string {"ciphertext": b64, "iv": b64}
+    
+    Returns:
+        Bytes envelope
+    """
+    data = json.loads(encrypted_data)
+    return pack_envelope(base64.b64decode(data['iv']), base64.b64decode(data['ciphertext']))
+
+
+def _decrypt_with(des, encrypted_data):
+    """
+    Decrypt satu pesan dari database dengan instance DES yang diberikan.
+    
+    Mendukung dua format:
+    - Envelope binary (bytes diawali version byte) dari kolom message_ciphertext
+    - JSON string {"ciphertext": b64, "iv": b64} format lama di kolom message_text
+    
+    Args:
+        des: Instance DESEncryption
+        encrypted_data: Envelope binary atau JSON string
+    
+    Returns:
+        Plaintext message (string), atau data apa adanya jika gagal decrypt
+    """
+    try:
+        if isinstance(encrypted_data, (bytes, bytearray)):
+            if encrypted_data[:1] == bytes([ENVELOPE_VERSION]):
+                iv, ciphertext = unpack_envelope(encrypted_data)
+                return des.decrypt_bytes(ciphertext, iv)
+            # Kolom hasil COALESCE bertipe binary: data JSON lama ikut jadi bytes
+            encrypted_data = bytes(encrypted_data).decode('utf-8')
+        
+        # Parse JSON
+        data = json.loads(encrypted_data)
+        ciphertext = data['ciphertext']
+        iv = data['iv']
+        
+        # Decrypt dengan DES
+        plaintext = des.decrypt(ciphertext, iv)
+        return plaintext
+    except Exception as e:
+        # Jika gagal decrypt (misal: data lama yang belum terenkripsi)
+        print(f"⚠️ Decrypt error: {e}")
+        if isinstance(encrypted_data, (bytes, bytearray)):
+            return bytes(encrypted_data).decode('utf-8', errors='replace')
+        return encrypted_data  # Return as-is
+
+
+def _decrypt_chunk(key, payloads):
+    """
+    Decrypt satu chunk pesan (dijalankan di worker thread/process).
+    Level modul agar bisa di-pickle oleh ProcessPoolExecutor.
+    """
+    des = DESEncryption(key)
+    return [_decrypt_with(des, payload) for payload in payloads]
+
+
+def encode_cursor(created_at, message_id):
+    """
+    Buat cursor pagination (opaque) dari posisi (created_at, id) sebuah pesan.
+    
+    Args:
+        created_at: Waktu pesan dibuat (datetime)
+        message_id: ID pesan
+    
+    Returns:
+        String cursor (base64 url-safe)
+    """
+    payload = json.dumps([created_at.isoformat(), message_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Kembalikan posisi (created_at, id) dari cursor pagination.
+    
+    Args:
+        cursor: String cursor dari encode_cursor()
+    
+    Returns:
+        Tuple (created_at: datetime, message_id: int)
+    
+    Raises:
+        ValueError: Jika cursor tidak valid
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, message_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(message_id)
+    except Exception:
+        raise ValueError("Cursor tidak valid")
 
 
 class MessageService:
     """Service untuk mengelola pengiriman dan penerimaan pesan dengan DES encryption."""
 
-    def __init__(self, db_connection, encryption_key="msg12345"):
+    # Batas jumlah pesan per halaman inbox/sent/conversation
+    MAX_PAGE_SIZE = 200
+
+    def __init__(self, db_connection, encryption_key="msg12345", search_index_key=None,
+                 decrypt_mode="serial", decrypt_workers=None, decrypt_threshold=256,
+                 decrypt_chunk_size=128, plaintext_cache_size=0, plaintext_cache_ttl=300,
+                 user_directory=None, broadcast_max_recipients=1000, attachment_store=None):
         """
         Inisialisasi MessageService.
         
         Args:
             db_connection: Database connection object dari connection.py
             encryption_key: Key untuk DES encryption (8 karakter, default: "msg12345")
+            search_index_key: Key HMAC untuk blind search index (opsional).
+                              Jika None, search memakai scan + decrypt (lambat).
+            decrypt_mode: Engine decrypt_many: 'serial', 'thread' atau 'process'
+                          (default: 'serial')
+            decrypt_workers: Jumlah worker pool (default: jumlah CPU)
+            decrypt_threshold: Di bawah jumlah pesan ini decrypt tetap serial (default: 256)
+            decrypt_chunk_size: Jumlah pesan per task worker (default: 128)
+            plaintext_cache_size: Jumlah pesan hasil decrypt yang di-cache di memory.
+                                  0 = cache mati (default: 0, tidak ada plaintext di memory)
+            plaintext_cache_ttl: Umur entry cache plaintext dalam detik (default: 300)
+            user_directory: Instance UserDirectory bersama untuk lookup user
+                            (default: dibuat sendiri)
+            broadcast_max_recipients: Jumlah penerima maksimal per send_broadcast (default: 1000)
+            attachment_store: Instance AttachmentStore untuk file attachment
+                              (default: dibuat sendiri di uploads/attachment_blobs)
         """
         self.db = db_connection
+        self.users = user_directory or UserDirectory(db_connection)
+        self.broadcast_max_recipients = broadcast_max_recipients
+        self.attachment_store = attachment_store or AttachmentStore(db_connection)
         self.des = DESEncryption(encryption_key)
+        self.search_index = SearchIndex(db_connection, search_index_key) if search_index_key else None
+        
+        if decrypt_mode not in ('serial', 'thread', 'process'):
+            raise ValueError("decrypt_mode harus 'serial', 'thread' atau 'process'")
+        self.decrypt_workers = decrypt_workers or os.cpu_count() or 1
+        # Pool tidak berguna dengan satu worker
+        self.decrypt_mode = decrypt_mode if self.decrypt_workers > 1 else 'serial'
+        self.decrypt_threshold = decrypt_threshold
+        self.decrypt_chunk_size = max(1, decrypt_chunk_size)
+        self._decrypt_executor = None
+        self._executor_lock = threading.Lock()
+        
+        # Cache LRU plaintext: message_id -> (digest ciphertext, plaintext)
+        self.plaintext_cache = (
+            TTLCache(plaintext_cache_size, plaintext_cache_ttl) if plaintext_cache_size > 0 else None
+        )
 
-    def send_message(self, sender_id, receiver_email, message_text):
+    def send_message(self, sender_id, receiver_email, message_text, attachments=None):
         """
         Kirim pesan dari sender ke receiver dengan enkripsi DES.
         
+        Pesan, counter dan semua baris attachment disimpan dalam satu transaksi
+        (satu commit). Jika salah satu gagal, tidak ada yang tersimpan.
+        
         Args:
             sender_id: ID user pengirim
             receiver_email: Email user penerima
             message_text: Isi pesan plaintext (akan dienkripsi dengan DES)
+            attachments: List dictionary attachment (filename, file_type + hasil
+                         AttachmentStore.stage(): sha256, file_size, temp_path), opsional
         
         Returns:
-            Dictionary dengan status dan message
+            Dictionary dengan status dan message. Jika ada attachment,
+            data['attachments'] berisi attachment beserta ID-nya.
         """
         # Validasi pesan tidak boleh kosong
         if not message_text or message_text.strip() == "":
@@ -42,9 +233,8 @@ class MessageService:
                 'message': 'Pesan tidak boleh kosong'
             }
 
-        # Cari receiver berdasarkan email
-        receiver_query = "SELECT id, username FROM users WHERE email = %s"
-        receiver = self.db.execute_read_dict(receiver_query, (receiver_email,))
+        # Cari receiver berdasarkan email (cache UserDirectory)
+        receiver = self.users.get_by_email(receiver_email)
 
         if not receiver:
             return {
@@ -52,8 +242,8 @@ class MessageService:
                 'message': 'Penerima tidak ditemukan'
             }
 
-        receiver_id = receiver[0]['id']
-        receiver_username = receiver[0]['username']
+        receiver_id = receiver['id']
+        receiver_username = receiver['username']
 
         # Cek sender tidak mengirim ke diri sendiri
         if sender_id == receiver_id:
@@ -63,29 +253,39 @@ class MessageService:
             }
 
         # 🔐 ENKRIPSI PESAN DENGAN DES
-        encrypted_result = self.des.encrypt(message_text)
+        iv, ciphertext = self.des.encrypt_bytes(message_text)
         
-        # Simpan ciphertext dan IV sebagai JSON
-        encrypted_data = json.dumps({
-            'ciphertext': encrypted_result['ciphertext'],
-            'iv': encrypted_result['iv']
-        })
+        # Simpan sebagai envelope binary: version byte + IV + raw ciphertext
+        encrypted_data = pack_envelope(iv, ciphertext)
 
         # Insert pesan terenkripsi ke database
         insert_query = """
-        INSERT INTO messages (sender_id, receiver_id, message_text) 
+        INSERT INTO messages (sender_id, receiver_id, message_ciphertext) 
         VALUES (%s, %s, %s)
         """
 
-        success = self.db.execute_query(insert_query, (sender_id, receiver_id, encrypted_data))
+        # Insert pesan + counter + attachment dalam satu transaksi
+        saved_attachments = []
+        try:
+            with self.db.transaction():
+                self._seed_message_stats([sender_id, receiver_id])
+                # ID pesan langsung dari cursor INSERT (tanpa SELECT LAST_INSERT_ID())
+                message_id = self.db.execute_insert(insert_query, (sender_id, receiver_id, encrypted_data))
 
-        if success:
-            # Ambil ID pesan yang baru dibuat
-            message_id_query = "SELECT LAST_INSERT_ID() as message_id"
-            result = self.db.execute_read_dict(message_id_query)
-            message_id = result[0]['message_id'] if result else None
+                self._update_message_stats(sender_id, receiver_id, 1)
 
-            return {
+                if attachments:
+                    saved_attachments = self.add_attachments(message_id, attachments)
+                
+                if self.search_index and message_id:
+                    self.search_index.index_message(message_id, sender_id, receiver_id, message_text)
+            success = True
+        except Exception as e:
+            print(f"✗ Error send message: {e}")
+            success = False
+        
+        if success:
+            result = {
                 'success': True,
                 'message': f'Pesan berhasil dikirim ke {receiver_username} (encrypted with DES)',
                 'data': {
@@ -95,23 +295,219 @@ class MessageService:
                     'encrypted': True
                 }
             }
+            if saved_attachments:
+                result['data']['attachments'] = saved_attachments
+            return result
         else:
             return {
                 'success': False,
                 'message': 'Gagal mengirim pesan'
             }
 
-    def get_inbox(self, user_id, limit=50, offset=0):
+    def send_broadcast(self, sender_id, receiver_emails, message_text, attachments=None):
+        """
+        Kirim pesan yang sama ke banyak penerima sekaligus.
+        
+        Semua penerima di-resolve dengan satu lookup (UserDirectory), pesan
+        dienkripsi sekali (semua penerima memakai key DES service yang sama),
+        lalu baris pesan, counter dan attachment disimpan dengan INSERT
+        multi-row dalam satu transaksi. File attachment disimpan sekali dan
+        dipakai bersama oleh semua pesan broadcast.
+        
+        Args:
+            sender_id: ID user pengirim
+            receiver_emails: List email penerima
+            message_text: Isi pesan plaintext
+            attachments: List dictionary attachment (filename, file_type + hasil
+                         AttachmentStore.stage(): sha256, file_size, temp_path), opsional
+        
+        Returns:
+            Dictionary dengan status, broadcast_id dan hasil per penerima
+            (data['results']). success False jika tidak ada pesan yang terkirim.
+        """
+        if not message_text or message_text.strip() == "":
+            return {
+                'success': False,
+                'message': 'Pesan tidak boleh kosong'
+            }
+        
+        # Email unik (case-insensitive), urutan dipertahankan
+        emails = {}
+        for email in receiver_emails or []:
+            if isinstance(email, str) and email.strip():
+                emails.setdefault(email.strip().lower(), email.strip())
+        emails = list(emails.values())
+        
+        if not emails:
+            return {
+                'success': False,
+                'message': 'Daftar penerima kosong'
+            }
+        
+        if len(emails) > self.broadcast_max_recipients:
+            return {
+                'success': False,
+                'error_type': 'TOO_MANY_RECIPIENTS',
+                'message': f'Maksimal {self.broadcast_max_recipients} penerima per broadcast'
+            }
+        
+        # Cari semua penerima sekaligus (cache + satu query IN)
+        profiles = self.users.get_many_by_email(emails)
+        
+        results = []
+        recipients = []
+        for email in emails:
+            profile = profiles.get(email.lower())
+            if not profile:
+                results.append({'email': email, 'success': False, 'message': 'Penerima tidak ditemukan'})
+            elif profile['id'] == sender_id:
+                results.append({
+                    'email': email,
+                    'success': False,
+                    'message': 'Tidak bisa mengirim pesan ke diri sendiri'
+                })
+            else:
+                entry = {
+                    'email': email,
+                    'success': True,
+                    'receiver_id': profile['id'],
+                    'receiver_username': profile['username']
+                }
+                results.append(entry)
+                recipients.append(entry)
+        
+        if not recipients:
+            return {
+                'success': False,
+                'message': 'Tidak ada penerima yang valid',
+                'data': {'results': results}
+            }
+        
+        # 🔐 ENKRIPSI SEKALI untuk semua penerima
+        iv, ciphertext = self.des.encrypt_bytes(message_text)
+        encrypted_data = pack_envelope(iv, ciphertext)
+        broadcast_id = uuid.uuid4().hex
+        
+        insert_query = """
+        INSERT INTO messages (sender_id, receiver_id, message_ciphertext, broadcast_id)
+        VALUES (%s, %s, %s, %s)
+        """
+        rows = [(sender_id, r['receiver_id'], encrypted_data, broadcast_id) for r in recipients]
+        
+        try:
+            with self.db.transaction():
+                self._seed_message_stats([sender_id, *(r['receiver_id'] for r in recipients)])
+                self.db.execute_many(insert_query, rows)
+                
+                # ID pesan per penerima dengan satu query (broadcast_id ber-index)
+                id_query = "SELECT id, receiver_id FROM messages WHERE broadcast_id = %s"
+                ids = {
+                    row['receiver_id']: row['id']
+                    for row in self.db.execute_read_dict(id_query, (broadcast_id,)) or []
+                }
+                for entry in recipients:
+                    entry['message_id'] = ids.get(entry['receiver_id'])
+                
+                self._update_broadcast_stats(sender_id, [r['receiver_id'] for r in recipients])
+                
+                if attachments:
+                    saved = self._insert_attachments([r['message_id'] for r in recipients], attachments)
+                    for entry in recipients:
+                        entry['attachment_ids'] = [a['id'] for a in saved[entry['message_id']]]
+                
+                if self.search_index:
+                    self.search_index.index_messages(
+                        [(r['message_id'], sender_id, r['receiver_id']) for r in recipients],
+                        message_text
+                    )
+        except Exception as e:
+            print(f"✗ Error send broadcast: {e}")
+            return {
+                'success': False,
+                'message': 'Gagal mengirim broadcast'
+            }
+        
+        return {
+            'success': True,
+            'message': f'Pesan terkirim ke {len(recipients)} dari {len(emails)} penerima',
+            'data': {
+                'broadcast_id': broadcast_id,
+                'sent': len(recipients),
+                'failed': len(emails) - len(recipients),
+                'sent_at': datetime.now().isoformat(),
+                'encrypted': True,
+                'results': results
+            }
+        }
+
+    def _page_bounds(self, limit, offset):
+        """Batasi limit ke 1..MAX_PAGE_SIZE dan offset minimal 0 (input dari query string)."""
+        return min(max(limit, 1), self.MAX_PAGE_SIZE), max(offset or 0, 0)
+
+    def _keyset_page(self, base_query, params, limit, offset, cursor, descending=True):
+        """
+        Jalankan query list pesan dengan keyset pagination pada (created_at, id).
+        
+        Jika cursor diberikan, halaman dimulai tepat setelah posisi cursor
+        (tanpa OFFSET, sehingga biaya tidak bertambah untuk halaman dalam).
+        Tanpa cursor, OFFSET lama tetap didukung.
+        
+        Args:
+            base_query: Query SELECT ... WHERE ... tanpa ORDER BY/LIMIT
+            params: Parameter untuk base_query
+            limit: Jumlah pesan per halaman (dibatasi 1..MAX_PAGE_SIZE)
+            offset: Offset (hanya dipakai jika cursor kosong)
+            cursor: Cursor dari halaman sebelumnya (opsional)
+            descending: Urutan terbaru dulu (True) atau terlama dulu (False)
+        
+        Returns:
+            Tuple (messages, next_cursor)
+        
+        Raises:
+            ValueError: Jika cursor tidak valid
+        """
+        query = base_query
+        params = list(params)
+        limit, offset = self._page_bounds(limit, offset)
+        
+        if cursor:
+            created_at, message_id = decode_cursor(cursor)
+            op = '<' if descending else '>'
+            query += f" AND (m.created_at {op} %s OR (m.created_at = %s AND m.id {op} %s))"
+            params.extend([created_at, created_at, message_id])
+        
+        direction = 'DESC' if descending else 'ASC'
+        query += f" ORDER BY m.created_at {direction}, m.id {direction} LIMIT %s"
+        # Ambil satu baris ekstra untuk tahu apakah masih ada halaman berikutnya
+        params.append(limit + 1)
+        
+        if not cursor and offset:
+            query += " OFFSET %s"
+            params.append(offset)
+        
+        messages = self.db.execute_read_dict(query, tuple(params)) or []
+        
+        next_cursor = None
+        if len(messages) > limit:
+            messages = messages[:limit]
+            if messages:
+                last = messages[-1]
+                next_cursor = encode_cursor(last['created_at'], last['id'])
+        
+        return messages, next_cursor
+
+    def get_inbox(self, user_id, limit=50, offset=0, cursor=None):
         """
         Ambil daftar pesan yang diterima user dan decrypt dengan DES.
         
         Args:
             user_id: ID user penerima
             limit: Jumlah maksimal pesan yang ditampilkan (default: 50)
-            offset: Offset untuk pagination (default: 0)
+            offset: Offset untuk pagination (default: 0, diabaikan jika ada cursor)
+            cursor: Cursor halaman berikutnya dari response sebelumnya (opsional)
         
         Returns:
-            Dictionary dengan status dan list pesan (decrypted)
+            Dictionary dengan status, list pesan (decrypted) dan next_cursor
         """
         query = """
         SELECT 
@@ -119,41 +515,32 @@ class MessageService:
             m.sender_id,
             u.username as sender_username,
             u.email as sender_email,
-            m.message_text,
+            COALESCE(m.message_ciphertext, m.message_text) AS message_text,
             m.created_at
         FROM messages m
         JOIN users u ON m.sender_id = u.id
         WHERE m.receiver_id = %s
-        ORDER BY m.created_at DESC
-        LIMIT %s OFFSET %s
         """
 
-        messages = self.db.execute_read_dict(query, (user_id, limit, offset))
+        limit, offset = self._page_bounds(limit, offset)
+        try:
+            messages, next_cursor = self._keyset_page(query, (user_id,), limit, offset, cursor)
+        except ValueError as e:
+            return {
+                'success': False,
+                'error_type': 'INVALID_CURSOR',
+                'message': str(e)
+            }
 
-        # 🔓 DEKRIPSI SETIAP PESAN + AMBIL ATTACHMENTS
+        # 🔓 DEKRIPSI SETIAP PESAN
         if messages:
-            for msg in messages:
-                msg['message_text'] = self._decrypt_message(msg['message_text'])
-                
-                # Get attachments untuk message ini
-                att_query = """
-                SELECT id, filename, file_type, file_size
-                FROM message_attachments
-                WHERE message_id = %s
-                """
-                attachments = self.db.execute_read_dict(att_query, (msg['id'],))
-                
-                if attachments:
-                    for att in attachments:
-                        att['download_url'] = f"/api/messages/attachments/{att['id']}"
-                    msg['attachments'] = attachments
-                else:
-                    msg['attachments'] = []
-
-        # Hitung total pesan
-        count_query = "SELECT COUNT(*) as total FROM messages WHERE receiver_id = %s"
-        count_result = self.db.execute_read_dict(count_query, (user_id,))
-        total = count_result[0]['total'] if count_result else 0
+            self.decrypt_many(messages)
+            
+            # Ambil attachments untuk semua pesan di halaman ini (satu query)
+            self._attach_attachments(messages)
+        
+        # Total pesan dari counter (O(1), tanpa COUNT(*))
+        total = self._get_message_count(user_id, 'inbox_count')
 
         return {
             'success': True,
@@ -161,21 +548,23 @@ class MessageService:
                 'messages': messages if messages else [],
                 'total': total,
                 'limit': limit,
-                'offset': offset
+                'offset': offset,
+                'next_cursor': next_cursor
             }
         }
 
-    def get_sent_messages(self, user_id, limit=50, offset=0):
+    def get_sent_messages(self, user_id, limit=50, offset=0, cursor=None):
         """
         Ambil daftar pesan yang dikirim user dan decrypt dengan DES.
         
         Args:
             user_id: ID user pengirim
             limit: Jumlah maksimal pesan yang ditampilkan (default: 50)
-            offset: Offset untuk pagination (default: 0)
+            offset: Offset untuk pagination (default: 0, diabaikan jika ada cursor)
+            cursor: Cursor halaman berikutnya dari response sebelumnya (opsional)
         
         Returns:
-            Dictionary dengan status dan list pesan (decrypted)
+            Dictionary dengan status, list pesan (decrypted) dan next_cursor
         """
         query = """
         SELECT 
@@ -183,26 +572,29 @@ class MessageService:
             m.receiver_id,
             u.username as receiver_username,
             u.email as receiver_email,
-            m.message_text,
+            COALESCE(m.message_ciphertext, m.message_text) AS message_text,
             m.created_at
         FROM messages m
         JOIN users u ON m.receiver_id = u.id
         WHERE m.sender_id = %s
-        ORDER BY m.created_at DESC
-        LIMIT %s OFFSET %s
         """
 
-        messages = self.db.execute_read_dict(query, (user_id, limit, offset))
+        limit, offset = self._page_bounds(limit, offset)
+        try:
+            messages, next_cursor = self._keyset_page(query, (user_id,), limit, offset, cursor)
+        except ValueError as e:
+            return {
+                'success': False,
+                'error_type': 'INVALID_CURSOR',
+                'message': str(e)
+            }
 
         # 🔓 DEKRIPSI SETIAP PESAN
         if messages:
-            for msg in messages:
-                msg['message_text'] = self._decrypt_message(msg['message_text'])
+            self.decrypt_many(messages)
 
-        # Hitung total pesan
-        count_query = "SELECT COUNT(*) as total FROM messages WHERE sender_id = %s"
-        count_result = self.db.execute_read_dict(count_query, (user_id,))
-        total = count_result[0]['total'] if count_result else 0
+        # Total pesan dari counter (O(1), tanpa COUNT(*))
+        total = self._get_message_count(user_id, 'sent_count')
 
         return {
             'success': True,
@@ -210,7 +602,8 @@ class MessageService:
                 'messages': messages if messages else [],
                 'total': total,
                 'limit': limit,
-                'offset': offset
+                'offset': offset,
+                'next_cursor': next_cursor
             }
         }
 
@@ -235,7 +628,7 @@ class MessageService:
             m.receiver_id,
             receiver.username as receiver_username,
             receiver.email as receiver_email,
-            m.message_text,
+            COALESCE(m.message_ciphertext, m.message_text) AS message_text,
             m.created_at
         FROM messages m
         JOIN users sender ON m.sender_id = sender.id
@@ -253,22 +646,8 @@ class MessageService:
 
         # 🔓 DEKRIPSI PESAN + AMBIL ATTACHMENTS
         message_data = result[0]
-        message_data['message_text'] = self._decrypt_message(message_data['message_text'])
-        
-        # Get attachments
-        att_query = """
-        SELECT id, filename, file_type, file_size
-        FROM message_attachments
-        WHERE message_id = %s
-        """
-        attachments = self.db.execute_read_dict(att_query, (message_id,))
-        
-        if attachments:
-            for att in attachments:
-                att['download_url'] = f"/api/messages/attachments/{att['id']}"
-            message_data['attachments'] = attachments
-        else:
-            message_data['attachments'] = []
+        self.decrypt_many([message_data])
+        self._attach_attachments([message_data])
 
         return {
             'success': True,
@@ -300,12 +679,39 @@ class MessageService:
                 'message': 'Pesan tidak ditemukan atau Anda tidak memiliki akses'
             }
 
-        # Hapus attachments terlebih dahulu (files + DB)
-        self.delete_attachments(message_id)
+        # Hapus attachment, pesan dan update counter dalam satu transaksi;
+        # file attachment baru dihapus setelah commit
+        attachments = []
+        try:
+            with self.db.transaction():
+                # Lock baris agar delete bersamaan tidak mengurangi counter dua kali
+                lock_query = "SELECT sender_id, receiver_id FROM messages WHERE id = %s FOR UPDATE"
+                locked = self.db.execute_read_dict(lock_query, (message_id,))
+                
+                if locked:
+                    self._seed_message_stats([locked[0]['sender_id'], locked[0]['receiver_id']])
+                    attachments = self._delete_attachment_rows(message_id)
+                    
+                    delete_query = "DELETE FROM messages WHERE id = %s"
+                    self.db.execute_query(delete_query, (message_id,))
+                    self._update_message_stats(locked[0]['sender_id'], locked[0]['receiver_id'], -1)
+                    
+                    if self.search_index:
+                        self.search_index.remove_message(message_id)
+            
+            if self.plaintext_cache is not None:
+                self.plaintext_cache.delete(message_id)
+            success = True
+        except Exception as e:
+            print(f"✗ Error delete message: {e}")
+            success = False
 
-        # Hapus pesan
-        delete_query = "DELETE FROM messages WHERE id = %s"
-        success = self.db.execute_query(delete_query, (message_id,))
+        if success and attachments:
+            try:
+                self._remove_attachment_files(attachments)
+            except Exception as e:
+                # Pesan sudah terhapus; blob ref_count 0 tertinggal di disk (data tetap konsisten)
+                print(f"⚠️ Error cleanup attachment: {e}")
 
         if success:
             return {
@@ -318,7 +724,7 @@ class MessageService:
                 'message': 'Gagal menghapus pesan'
             }
 
-    def get_conversation(self, user_id, other_user_id, limit=50):
+    def get_conversation(self, user_id, other_user_id, limit=50, cursor=None):
         """
         Ambil percakapan antara dua user dan decrypt dengan DES.
         
@@ -326,9 +732,10 @@ class MessageService:
             user_id: ID user yang mengakses
             other_user_id: ID user lawan bicara
             limit: Jumlah maksimal pesan (default: 50)
+            cursor: Cursor halaman berikutnya dari response sebelumnya (opsional)
         
         Returns:
-            Dictionary dengan status dan list pesan (decrypted)
+            Dictionary dengan status, list pesan (decrypted) dan next_cursor
         """
         query = """
         SELECT 
@@ -336,7 +743,7 @@ class MessageService:
             m.sender_id,
             m.receiver_id,
             sender.username as sender_username,
-            m.message_text,
+            COALESCE(m.message_ciphertext, m.message_text) AS message_text,
             m.created_at,
             CASE 
                 WHEN m.sender_id = %s THEN 'sent'
@@ -345,25 +752,30 @@ class MessageService:
         FROM messages m
         JOIN users sender ON m.sender_id = sender.id
         WHERE 
-            (m.sender_id = %s AND m.receiver_id = %s) OR 
-            (m.sender_id = %s AND m.receiver_id = %s)
-        ORDER BY m.created_at ASC
-        LIMIT %s
+            ((m.sender_id = %s AND m.receiver_id = %s) OR 
+             (m.sender_id = %s AND m.receiver_id = %s))
         """
 
-        messages = self.db.execute_read_dict(
-            query, 
-            (user_id, user_id, other_user_id, other_user_id, user_id, limit)
-        )
+        try:
+            messages, next_cursor = self._keyset_page(
+                query,
+                (user_id, user_id, other_user_id, other_user_id, user_id),
+                limit, 0, cursor,
+                descending=False
+            )
+        except ValueError as e:
+            return {
+                'success': False,
+                'error_type': 'INVALID_CURSOR',
+                'message': str(e)
+            }
 
         # 🔓 DEKRIPSI SETIAP PESAN
         if messages:
-            for msg in messages:
-                msg['message_text'] = self._decrypt_message(msg['message_text'])
+            self.decrypt_many(messages)
 
-        # Ambil info user lawan bicara
-        other_user_query = "SELECT username, email FROM users WHERE id = %s"
-        other_user = self.db.execute_read_dict(other_user_query, (other_user_id,))
+        # Ambil info user lawan bicara (cache UserDirectory)
+        other_user = self.users.get_by_id(other_user_id)
 
         if not other_user:
             return {
@@ -376,20 +788,23 @@ class MessageService:
             'data': {
                 'other_user': {
                     'id': other_user_id,
-                    'username': other_user[0]['username'],
-                    'email': other_user[0]['email']
+                    'username': other_user['username'],
+                    'email': other_user['email']
                 },
                 'messages': messages if messages else [],
-                'total': len(messages) if messages else 0
+                'total': len(messages) if messages else 0,
+                'next_cursor': next_cursor
             }
         }
 
     def search_messages(self, user_id, keyword, limit=50):
         """
-        Cari pesan berdasarkan keyword (search pada plaintext setelah decrypt).
+        Cari pesan berdasarkan keyword.
         
-        Note: Karena pesan terenkripsi, search dilakukan setelah decrypt semua pesan.
-        Untuk database besar, ini bisa lambat. Consider indexing atau full-text search.
+        Jika blind search index aktif, kandidat pesan diambil dari index HMAC
+        (query SQL ber-index) dan hanya kandidat tersebut yang di-decrypt.
+        Keyword yang tidak bisa dicari lewat index (semua kata < 3 huruf)
+        atau service tanpa index memakai scan + decrypt semua pesan.
         
         Args:
             user_id: ID user yang mencari
@@ -399,6 +814,86 @@ class MessageService:
         Returns:
             Dictionary dengan status dan hasil pencarian
         """
+        results = None
+        if self.search_index:
+            results = self._search_indexed(user_id, keyword, limit)
+        if results is None:
+            results = self._search_scan(user_id, keyword, limit)
+        
+        return {
+            'success': True,
+            'data': {
+                'keyword': keyword,
+                'results': results,
+                'total': len(results)
+            }
+        }
+
+    def _search_indexed(self, user_id, keyword, limit):
+        """
+        Search lewat blind index: ambil kandidat, decrypt, lalu verifikasi.
+        
+        Returns:
+            List hasil, atau None jika keyword tidak bisa dicari lewat index
+        """
+        keyword_lower = keyword.lower()
+        batch_size = max(limit * 2, 50)
+        results = []
+        before_id = None
+        
+        while len(results) < limit:
+            candidate_ids = self.search_index.find_message_ids(user_id, keyword, batch_size, before_id)
+            if candidate_ids is None:
+                return None
+            if not candidate_ids:
+                break
+            
+            placeholders = ', '.join(['%s'] * len(candidate_ids))
+            query = f"""
+            SELECT 
+                m.id,
+                m.sender_id,
+                sender.username as sender_username,
+                m.receiver_id,
+                receiver.username as receiver_username,
+                COALESCE(m.message_ciphertext, m.message_text) AS message_text,
+                m.created_at,
+                CASE 
+                    WHEN m.sender_id = %s THEN 'sent'
+                    ELSE 'received'
+                END as type
+            FROM messages m
+            JOIN users sender ON m.sender_id = sender.id
+            JOIN users receiver ON m.receiver_id = receiver.id
+            WHERE 
+                m.id IN ({placeholders})
+                AND (m.sender_id = %s OR m.receiver_id = %s)
+            ORDER BY m.created_at DESC, m.id DESC
+            """
+            messages = self.db.execute_read_dict(query, (user_id, *candidate_ids, user_id, user_id))
+            
+            # 🔓 DEKRIPSI HANYA KANDIDAT, LALU COCOKKAN KEYWORD UTUH
+            for msg in self.decrypt_many(messages or []):
+                if keyword_lower in msg['message_text'].lower():
+                    results.append(msg)
+                    if len(results) >= limit:
+                        break
+            
+            if len(candidate_ids) < batch_size:
+                break
+            before_id = min(candidate_ids)
+        
+        return results
+
+    def _search_scan(self, user_id, keyword, limit):
+        """
+        Search tanpa index: decrypt semua pesan user lalu substring match.
+        
+        Note: Biaya naik linear dengan jumlah pesan. Dipakai sebagai fallback.
+        
+        Returns:
+            List hasil
+        """
         # Ambil semua pesan user (encrypted)
         query = """
         SELECT 
@@ -407,7 +902,7 @@ class MessageService:
             sender.username as sender_username,
             m.receiver_id,
             receiver.username as receiver_username,
-            m.message_text,
+            COALESCE(m.message_ciphertext, m.message_text) AS message_text,
             m.created_at,
             CASE 
                 WHEN m.sender_id = %s THEN 'sent'
@@ -423,31 +918,66 @@ class MessageService:
 
         all_messages = self.db.execute_read_dict(query, (user_id, user_id, user_id))
 
-        # 🔓 DEKRIPSI DAN FILTER BERDASARKAN KEYWORD
+        # 🔓 DEKRIPSI (PER BATCH) DAN FILTER BERDASARKAN KEYWORD
         results = []
         keyword_lower = keyword.lower()
+        all_messages = all_messages or []
+        batch_size = max(self.decrypt_threshold, self.decrypt_chunk_size * self.decrypt_workers)
         
-        if all_messages:
-            for msg in all_messages:
-                decrypted_text = self._decrypt_message(msg['message_text'])
-                msg['message_text'] = decrypted_text
-                
+        for start in range(0, len(all_messages), batch_size):
+            for msg in self.decrypt_many(all_messages[start:start + batch_size]):
                 # Cek apakah keyword ada di pesan
-                if keyword_lower in decrypted_text.lower():
+                if keyword_lower in msg['message_text'].lower():
                     results.append(msg)
                     
                     # Stop jika sudah mencapai limit
                     if len(results) >= limit:
-                        break
+                        return results
 
-        return {
-            'success': True,
-            'data': {
-                'keyword': keyword,
-                'results': results,
-                'total': len(results)
-            }
-        }
+        return results
+
+    def backfill_search_index(self, batch_size=500):
+        """
+        Bangun blind search index untuk pesan yang sudah ada.
+        Aman dijalankan ulang (token yang sudah ada di-skip oleh INSERT IGNORE).
+        
+        Args:
+            batch_size: Jumlah pesan per batch (default: 500)
+        
+        Returns:
+            Jumlah pesan yang diindex
+        """
+        if not self.search_index:
+            raise ValueError("Search index tidak aktif (search_index_key kosong)")
+        
+        query = """
+        SELECT id, sender_id, receiver_id,
+            COALESCE(message_ciphertext, message_text) AS message_text
+        FROM messages
+        WHERE id > %s
+        ORDER BY id
+        LIMIT %s
+        """
+        
+        processed = 0
+        last_id = 0
+        while True:
+            batch = self.db.execute_read_dict(query, (last_id, batch_size))
+            if not batch:
+                break
+            
+            self.decrypt_many(batch)
+            with self.db.transaction():
+                for row in batch:
+                    self.search_index.index_message(
+                        row['id'], row['sender_id'], row['receiver_id'], row['message_text']
+                    )
+            
+            processed += len(batch)
+            last_id = batch[-1]['id']
+            print(f"✓ {processed} pesan diindex")
+        
+        return processed
 
     def add_attachment(self, message_id, filename, file_path, file_type, file_size):
         """
@@ -461,7 +991,7 @@ class MessageService:
             file_size: Ukuran file (bytes)
         
         Returns:
-            ID attachment yang baru dibuat
+            ID attachment yang baru dibuat (None jika gagal)
         """
         query = """
         INSERT INTO message_attachments 
@@ -469,29 +999,335 @@ class MessageService:
         VALUES (%s, %s, %s, %s, %s, NOW())
         """
         
-        result = self.db.execute_query(
+        return self.db.execute_insert(
             query, 
             (message_id, filename, file_path, file_type, file_size)
         )
+
+    def add_attachments(self, message_id, attachments):
+        """
+        Simpan metadata banyak attachment sekaligus (satu transaksi, satu commit).
         
-        # Get last insert ID
-        last_id_query = "SELECT LAST_INSERT_ID() as id"
-        last_id = self.db.execute_read_dict(last_id_query)
+        Args:
+            message_id: ID pesan
+            attachments: List dictionary (filename, file_type, file_size, dan
+                         sha256 + temp_path dari AttachmentStore.stage() atau
+                         file_path untuk file yang sudah ada di disk)
         
-        if last_id:
-            return last_id[0]['id']
-        return None
+        Returns:
+            List attachment yang sama ditambah key 'id', urutan sesuai input
+        
+        Raises:
+            RuntimeError: Jika INSERT gagal (di luar transaksi)
+        """
+        if not attachments:
+            return []
+        return self._insert_attachments([message_id], attachments)[message_id]
+
+    def _insert_attachments(self, message_ids, attachments):
+        """
+        Simpan attachment yang sama untuk satu atau banyak pesan.
+        Blob yang sama (hash sama) dirujuk oleh semua baris, file hanya ada sekali di disk.
+        
+        Args:
+            message_ids: List ID pesan
+            attachments: List dictionary attachment (lihat add_attachments)
+        
+        Returns:
+            Dictionary message_id -> list attachment ditambah key 'id'
+        
+        Raises:
+            RuntimeError: Jika INSERT gagal (di luar transaksi)
+        """
+        query = """
+        INSERT INTO message_attachments 
+        (message_id, filename, file_path, file_type, file_size, blob_sha256, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s, NOW())
+        """
+        
+        with self.db.transaction():
+            # Referensi blob dulu: file staged dipindah ke path final (file_path)
+            staged = [(a, len(message_ids)) for a in attachments if a.get('sha256')]
+            if staged:
+                self.attachment_store.add_references(staged)
+            
+            # Satu INSERT per baris: ID langsung dari cursor.lastrowid, tanpa
+            # SELECT ulang dan tanpa asumsi ID multi-row INSERT berurutan
+            result = {}
+            for message_id in message_ids:
+                saved = []
+                for a in attachments:
+                    attachment_id = self.db.execute_insert(query, (
+                        message_id, a['filename'], a['file_path'], a['file_type'],
+                        a['file_size'], a.get('sha256')
+                    ))
+                    if attachment_id is None:
+                        raise RuntimeError("Gagal menyimpan attachment")
+                    saved.append({'id': attachment_id, **a})
+                result[message_id] = saved
+        return result
+
+    def _seed_message_stats(self, user_ids):
+        """
+        Buat baris user_message_stats yang belum ada dari COUNT(*) pesan.
+        
+        Dipanggil di dalam transaksi SEBELUM INSERT/DELETE pesan, supaya
+        user yang sudah punya pesan sebelum migration 002 tidak mulai dari 0
+        dan hitungan awal belum termasuk pesan yang sedang ditambah/dihapus
+        (delta diterapkan sesudahnya). User yang sudah punya baris hanya
+        dicek lewat primary key; COUNT(*) tidak dijalankan.
+        
+        Args:
+            user_ids: List ID user
+        """
+        user_ids = list(set(user_ids))
+        if not user_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(user_ids))
+        query = f"""
+        INSERT IGNORE INTO user_message_stats (user_id, inbox_count, sent_count)
+        SELECT
+            u.id,
+            (SELECT COUNT(*) FROM messages WHERE receiver_id = u.id),
+            (SELECT COUNT(*) FROM messages WHERE sender_id = u.id)
+        FROM users u
+        LEFT JOIN user_message_stats s ON s.user_id = u.id
+        WHERE u.id IN ({placeholders}) AND s.user_id IS NULL
+        """
+        self.db.execute_query(query, tuple(user_ids))
+
+    def _update_broadcast_stats(self, sender_id, receiver_ids):
+        """
+        Update counter user_message_stats untuk satu broadcast:
+        sent_count pengirim + jumlah penerima, inbox_count setiap penerima + 1.
+        Dipanggil di dalam transaksi yang sama dengan INSERT pesan.
+        """
+        query = """
+        INSERT INTO user_message_stats (user_id, {column})
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE {column} = {column} + VALUES({column})
+        """
+        self.db.execute_query(query.format(column='sent_count'), (sender_id, len(receiver_ids)))
+        self.db.execute_many(
+            query.format(column='inbox_count'),
+            [(receiver_id, 1) for receiver_id in receiver_ids]
+        )
+
+    def _update_message_stats(self, sender_id, receiver_id, delta):
+        """
+        Update counter user_message_stats untuk satu pesan.
+        Dipanggil di dalam transaksi yang sama dengan INSERT/DELETE pesan,
+        setelah _seed_message_stats().
+        
+        Args:
+            sender_id: ID pengirim (sent_count)
+            receiver_id: ID penerima (inbox_count)
+            delta: +1 saat kirim, -1 saat hapus
+        """
+        if delta > 0:
+            query = """
+            INSERT INTO user_message_stats (user_id, {column})
+            VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE {column} = {column} + VALUES({column})
+            """
+            params_sender = (sender_id, delta)
+            params_receiver = (receiver_id, delta)
+        else:
+            query = """
+            UPDATE user_message_stats
+            SET {column} = GREATEST({column} + %s, 0)
+            WHERE user_id = %s
+            """
+            params_sender = (delta, sender_id)
+            params_receiver = (delta, receiver_id)
+        
+        self.db.execute_query(query.format(column='sent_count'), params_sender)
+        self.db.execute_query(query.format(column='inbox_count'), params_receiver)
+
+    def _get_message_count(self, user_id, column):
+        """
+        Ambil jumlah pesan user dari user_message_stats.
+        Jika user belum punya baris counter, fallback ke COUNT(*).
+        
+        Args:
+            user_id: ID user
+            column: 'inbox_count' atau 'sent_count'
+        
+        Returns:
+            Jumlah pesan (int)
+        """
+        query = f"SELECT {column} AS total FROM user_message_stats WHERE user_id = %s"
+        result = self.db.execute_read_dict(query, (user_id,))
+        if result:
+            return result[0]['total']
+        
+        filter_column = 'receiver_id' if column == 'inbox_count' else 'sender_id'
+        count_query = f"SELECT COUNT(*) as total FROM messages WHERE {filter_column} = %s"
+        count_result = self.db.execute_read_dict(count_query, (user_id,))
+        return count_result[0]['total'] if count_result else 0
+
+    def rebuild_message_stats(self, batch_size=1000):
+        """
+        Rekonsiliasi: hitung ulang user_message_stats dari tabel messages.
+        Diproses per batch ID user agar lock tidak ditahan terlalu lama.
+        
+        Counter ditimpa dengan snapshot COUNT(*): pesan yang dikirim/dihapus
+        saat batch berjalan bisa hilang dari hitungan. Jalankan saat
+        penulisan pesan dihentikan (maintenance window). Tidak perlu lagi
+        untuk data lama setelah migration 002: baris counter yang belum ada
+        diisi otomatis dari COUNT(*) saat pesan pertama dikirim/dihapus.
+        
+        Args:
+            batch_size: Jumlah user per batch (default: 1000)
+        
+        Returns:
+            Jumlah user yang counter-nya dihitung ulang
+        """
+        query = """
+        INSERT INTO user_message_stats (user_id, inbox_count, sent_count)
+        SELECT
+            u.id,
+            (SELECT COUNT(*) FROM messages WHERE receiver_id = u.id),
+            (SELECT COUNT(*) FROM messages WHERE sender_id = u.id)
+        FROM users u
+        WHERE u.id > %s AND u.id <= %s
+        ON DUPLICATE KEY UPDATE
+            inbox_count = VALUES(inbox_count),
+            sent_count = VALUES(sent_count)
+        """
+        
+        processed = 0
+        last_id = 0
+        while True:
+            batch = self.db.execute_read_dict(
+                "SELECT id FROM users WHERE id > %s ORDER BY id LIMIT %s",
+                (last_id, batch_size)
+            )
+            if not batch:
+                break
+            
+            batch_last_id = batch[-1]['id']
+            self.db.execute_query(query, (last_id, batch_last_id))
+            processed += len(batch)
+            last_id = batch_last_id
+            print(f"✓ Counter dihitung ulang untuk {processed} user")
+        
+        return processed
+
+    def migrate_message_format(self, batch_size=500, pause=0.0):
+        """
+        Migrasi online: konversi pesan format JSON (message_text) ke envelope
+        binary (message_ciphertext) per batch, tanpa decrypt dan tanpa downtime.
+        
+        Setiap batch di-commit sendiri. UPDATE hanya mengenai baris yang
+        message_text-nya belum berubah sejak dibaca, sehingga aman berjalan
+        bersamaan dengan traffic normal dan aman dijalankan ulang.
+        
+        Args:
+            batch_size: Jumlah pesan per batch (default: 500)
+            pause: Jeda antar batch dalam detik untuk mengurangi beban (default: 0)
+        
+        Returns:
+            Dictionary jumlah pesan yang dikonversi dan dilewati
+        """
+        select_query = """
+        SELECT id, message_text
+        FROM messages
+        WHERE id > %s AND message_ciphertext IS NULL AND message_text IS NOT NULL
+        ORDER BY id
+        LIMIT %s
+        """
+        update_query = """
+        UPDATE messages
+        SET message_ciphertext = %s, message_text = NULL
+        WHERE id = %s AND message_ciphertext IS NULL AND message_text = %s
+        """
+        
+        converted = 0
+        skipped = 0
+        last_id = 0
+        while True:
+            batch = self.db.execute_read_dict(select_query, (last_id, batch_size))
+            if not batch:
+                break
+            
+            with self.db.transaction():
+                for row in batch:
+                    try:
+                        envelope = json_to_envelope(row['message_text'])
+                    except (ValueError, KeyError, TypeError):
+                        # Data lama yang bukan JSON terenkripsi dibiarkan apa adanya
+                        skipped += 1
+                        continue
+                    self.db.execute_query(update_query, (envelope, row['id'], row['message_text']))
+                    converted += 1
+            
+            last_id = batch[-1]['id']
+            print(f"✓ {converted} pesan dikonversi, {skipped} dilewati (id <= {last_id})")
+            if pause:
+                time.sleep(pause)
+        
+        return {
+            'converted': converted,
+            'skipped': skipped
+        }
+
+    def _load_attachments(self, message_ids):
+        """
+        Ambil attachment untuk banyak pesan sekaligus dengan satu query IN (...).
+        
+        Args:
+            message_ids: List ID pesan
+        
+        Returns:
+            Dictionary {message_id: [attachment, ...]}
+        """
+        attachments_by_message = {message_id: [] for message_id in message_ids}
+        if not attachments_by_message:
+            return attachments_by_message
+        
+        ids = list(attachments_by_message)
+        placeholders = ', '.join(['%s'] * len(ids))
+        query = f"""
+        SELECT id, message_id, filename, file_type, file_size
+        FROM message_attachments
+        WHERE message_id IN ({placeholders})
+        ORDER BY id
+        """
+        attachments = self.db.execute_read_dict(query, tuple(ids))
+        
+        if attachments:
+            for att in attachments:
+                message_id = att.pop('message_id')
+                att['download_url'] = f"/api/messages/attachments/{att['id']}"
+                attachments_by_message.setdefault(message_id, []).append(att)
+        
+        return attachments_by_message
+
+    def _attach_attachments(self, messages):
+        """
+        Isi field 'attachments' pada setiap pesan (batched, tanpa N+1 query).
+        
+        Args:
+            messages: List dictionary pesan (harus punya key 'id')
+        """
+        attachments_by_message = self._load_attachments([msg['id'] for msg in messages])
+        for msg in messages:
+            msg['attachments'] = attachments_by_message.get(msg['id'], [])
 
     def get_attachment(self, attachment_id, user_id):
         """
         Ambil info attachment dengan validasi akses (hanya sender/receiver).
+        Satu query lewat primary key (attachment, message, blob), dipakai
+        route download untuk ETag (blob_sha256) dan mode baca file.
         
         Args:
             attachment_id: ID attachment
             user_id: ID user yang akses
         
         Returns:
-            Dictionary attachment info atau None jika tidak ada akses
+            Dictionary attachment info (encrypted = blob terenkripsi at-rest)
+            atau None jika tidak ada akses
         """
         query = """
         SELECT 
@@ -502,10 +1338,13 @@ class MessageService:
             a.file_type,
             a.file_size,
             a.created_at,
+            a.blob_sha256,
+            COALESCE(b.encrypted, 0) AS encrypted,
             m.sender_id,
             m.receiver_id
         FROM message_attachments a
         JOIN messages m ON a.message_id = m.id
+        LEFT JOIN attachment_blobs b ON b.sha256 = a.blob_sha256
         WHERE 
             a.id = %s
             AND (m.sender_id = %s OR m.receiver_id = %s)
@@ -519,55 +1358,188 @@ class MessageService:
 
     def delete_attachments(self, message_id):
         """
-        Hapus semua attachment dari pesan (file + database).
+        Hapus semua attachment dari pesan (database + file).
+        
+        Blob di AttachmentStore hanya dihapus saat referensi terakhirnya hilang.
+        File lama (sebelum blob store) dihapus jika tidak ada baris attachment
+        lain yang masih memakainya. File baru dihapus setelah commit.
         
         Args:
             message_id: ID pesan
         """
-        import os
-        
-        # Get all attachments
-        query = "SELECT file_path FROM message_attachments WHERE message_id = %s"
-        attachments = self.db.execute_read_dict(query, (message_id,))
+        with self.db.transaction():
+            attachments = self._delete_attachment_rows(message_id)
+        self._remove_attachment_files(attachments)
+
+    def _delete_attachment_rows(self, message_id):
+        """
+        Hapus baris attachment pesan dan kurangi ref_count blob-nya.
+        Panggil di dalam transaksi; file di disk tidak disentuh.
         
-        # Delete files from disk
-        if attachments:
-            for att in attachments:
-                file_path = att['file_path']
-                if os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                        print(f"🗑️ Deleted file: {file_path}")
-                    except Exception as e:
-                        print(f"⚠️ Failed to delete file {file_path}: {e}")
+        Returns:
+            List attachment yang dihapus (file_path, blob_sha256) untuk
+            _remove_attachment_files() setelah commit
+        """
+        query = "SELECT file_path, blob_sha256 FROM message_attachments WHERE message_id = %s FOR UPDATE"
+        attachments = self.db.execute_read_dict(query, (message_id,)) or []
+        if not attachments:
+            return []
         
-        # Delete from database
         delete_query = "DELETE FROM message_attachments WHERE message_id = %s"
         self.db.execute_query(delete_query, (message_id,))
+        
+        blobs = [att['blob_sha256'] for att in attachments if att.get('blob_sha256')]
+        self.attachment_store.decrement_references(blobs)
+        return attachments
+
+    def _remove_attachment_files(self, attachments):
+        """
+        Hapus file yang sudah tidak dirujuk (dipanggil setelah commit).
+        
+        Args:
+            attachments: Hasil _delete_attachment_rows()
+        """
+        
+        # Blob store: hapus blob yang ref_count-nya sudah 0
+        blobs = [att['blob_sha256'] for att in attachments if att.get('blob_sha256')]
+        if blobs:
+            self.attachment_store.purge_orphans(blobs)
+        
+        # File lama: cek referensi, file yang masih dipakai pesan lain tidak dihapus
+        paths = list({att['file_path'] for att in attachments if not att.get('blob_sha256')})
+        if not paths:
+            return
+        placeholders = ', '.join(['%s'] * len(paths))
+        ref_query = f"""
+        SELECT DISTINCT file_path FROM message_attachments
+        WHERE file_path IN ({placeholders})
+        """
+        in_use = {row['file_path'] for row in self.db.execute_read_dict(ref_query, tuple(paths)) or []}
+        
+        # Delete files from disk
+        for file_path in paths:
+            if file_path in in_use:
+                continue
+            if os.path.exists(file_path):
+                try:
+                    os.remove(file_path)
+                    print(f"🗑️ Deleted file: {file_path}")
+                except Exception as e:
+                    print(f"⚠️ Failed to delete file {file_path}: {e}")
+
+    def _get_decrypt_executor(self):
+        """Buat pool decrypt secara lazy (dipakai bersama oleh semua request)."""
+        if self._decrypt_executor is None:
+            with self._executor_lock:
+                if self._decrypt_executor is None:
+                    if self.decrypt_mode == 'process':
+                        # spawn: aman dipakai dari server multi-thread (tanpa fork lock)
+                        self._decrypt_executor = ProcessPoolExecutor(
+                            max_workers=self.decrypt_workers,
+                            mp_context=multiprocessing.get_context('spawn')
+                        )
+                    else:
+                        self._decrypt_executor = ThreadPoolExecutor(
+                            max_workers=self.decrypt_workers,
+                            thread_name_prefix='decrypt'
+                        )
+        return self._decrypt_executor
+
+    def decrypt_many(self, rows, field='message_text'):
+        """
+        Decrypt banyak pesan sekaligus (in-place).
+        
+        Di bawah decrypt_threshold, atau jika decrypt_mode='serial', pesan
+        di-decrypt serial. Di atasnya, pesan dibagi per chunk dan dikerjakan
+        paralel oleh thread/process pool.
+        
+        Args:
+            rows: List dictionary pesan dari database
+            field: Nama field berisi data terenkripsi (default: 'message_text')
+        
+        Returns:
+            List rows yang sama dengan field sudah berisi plaintext
+        """
+        if not rows:
+            return rows
+        
+        # Cek cache plaintext dulu, hanya pesan yang miss yang di-decrypt
+        pending = []
+        for row in rows:
+            payload = row[field]
+            digest = None
+            if self.plaintext_cache is not None and 'id' in row:
+                digest = self._payload_digest(payload)
+                cached = self.plaintext_cache.get(row['id'])
+                if cached is not None and cached[0] == digest:
+                    row[field] = cached[1]
+                    continue
+            pending.append((row, payload, digest))
+        
+        if not pending:
+            return rows
+        
+        payloads = [payload for _, payload, _ in pending]
+        
+        if self.decrypt_mode == 'serial' or len(payloads) < self.decrypt_threshold:
+            plaintexts = [_decrypt_with(self.des, payload) for payload in payloads]
+        else:
+            size = self.decrypt_chunk_size
+            chunks = [payloads[i:i + size] for i in range(0, len(payloads), size)]
+            executor = self._get_decrypt_executor()
+            plaintexts = [
+                plaintext
+                for chunk_result in executor.map(_decrypt_chunk, repeat(self.des.key), chunks)
+                for plaintext in chunk_result
+            ]
+        
+        for (row, payload, digest), plaintext in zip(pending, plaintexts):
+            row[field] = plaintext
+            # Jangan cache data yang gagal di-decrypt (dikembalikan apa adanya)
+            if digest is not None and plaintext != payload:
+                self.plaintext_cache.set(row['id'], (digest, plaintext))
+        return rows
 
-    def _decrypt_message(self, encrypted_data):
+    @staticmethod
+    def _payload_digest(payload):
+        """Digest ciphertext untuk memastikan entry cache masih sesuai isi database."""
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        return hashlib.blake2b(payload, digest_size=16).digest()
+
+    def get_plaintext_cache_stats(self):
+        """
+        Statistik cache plaintext (hit/miss/eviction).
+        
+        Returns:
+            Dictionary statistik, atau None jika cache mati
+        """
+        if self.plaintext_cache is None:
+            return None
+        return self.plaintext_cache.stats()
+
+    def close(self):
+        """Hentikan pool decrypt (dipanggil saat aplikasi shutdown)."""
+        if self._decrypt_executor is not None:
+            self._decrypt_executor.shutdown(wait=True)
+            self._decrypt_executor = None
+
+    def _decrypt_message(self, encrypted_data, message_id=None):
         """
         Helper function untuk decrypt pesan dari database.
         
         Args:
             encrypted_data: JSON string dengan ciphertext dan IV
+            message_id: ID pesan (opsional, agar bisa memakai cache plaintext)
         
         Returns:
             Plaintext message (string)
         """
-        try:
-            # Parse JSON
-            data = json.loads(encrypted_data)
-            ciphertext = data['ciphertext']
-            iv = data['iv']
-            
-            # Decrypt dengan DES
-            plaintext = self.des.decrypt(ciphertext, iv)
-            return plaintext
-        except Exception as e:
-            # Jika gagal decrypt (misal: data lama yang belum terenkripsi)
-            print(f"⚠️ Decrypt error: {e}")
-            return encrypted_data  # Return as-is
+        if message_id is None or self.plaintext_cache is None:
+            return _decrypt_with(self.des, encrypted_data)
+        
+        row = {'id': message_id, 'message_text': encrypted_data}
+        return self.decrypt_many([row])[0]['message_text']
 
 
 # Testing
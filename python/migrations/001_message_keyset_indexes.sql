@@ -0,0 +1,8 @@
+-- Index untuk keyset (cursor) pagination pada inbox, sent dan conversation.
+-- Query memakai ORDER BY created_at, id dengan filter receiver/sender,
+-- sehingga MySQL bisa langsung "seek" ke posisi cursor tanpa OFFSET scan.
+
+ALTER TABLE messages
+    ADD INDEX idx_messages_receiver_created (receiver_id, created_at, id),
+    ADD INDEX idx_messages_sender_created (sender_id, created_at, id),
+    ADD INDEX idx_messages_pair_created (sender_id, receiver_id, created_at, id);
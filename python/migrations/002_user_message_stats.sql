@@ -0,0 +1,14 @@
+-- Counter jumlah pesan per user (inbox/sent) agar field "total" pada
+-- inbox dan sent tidak perlu COUNT(*) setiap halaman.
+-- Counter di-update oleh MessageService.send_message/delete_message
+-- dalam transaksi yang sama dengan INSERT/DELETE pesan.
+--
+-- Setelah tabel dibuat, isi counter untuk data lama:
+--   python manage.py rebuild-message-stats
+
+CREATE TABLE IF NOT EXISTS user_message_stats (
+    user_id INT NOT NULL PRIMARY KEY,
+    inbox_count INT NOT NULL DEFAULT 0,
+    sent_count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
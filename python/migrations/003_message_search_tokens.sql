@@ -0,0 +1,14 @@
+-- Blind search index untuk pesan terenkripsi.
+-- Setiap baris = HMAC-SHA256(key, "user_id:term") untuk satu term pesan,
+-- disimpan untuk sender dan receiver. Tidak ada plaintext di tabel ini.
+--
+-- Setelah tabel dibuat, index pesan lama:
+--   python manage.py backfill-search-index
+
+CREATE TABLE IF NOT EXISTS message_search_tokens (
+    user_id INT NOT NULL,
+    token BINARY(32) NOT NULL,
+    message_id INT NOT NULL,
+    PRIMARY KEY (user_id, token, message_id),
+    INDEX idx_search_tokens_message (message_id)
+);
@@ -0,0 +1,16 @@
+-- Format penyimpanan pesan binary (envelope versi 1):
+--   [version 1 byte = 0x01][IV DES 8 byte][raw ciphertext]
+-- Pesan baru ditulis ke message_ciphertext; message_text (JSON base64 lama)
+-- tetap dibaca sampai semua baris dimigrasi.
+--
+-- Kedua ALTER bisa berjalan online (tanpa lock tulis) di MySQL 8.
+-- Setelah itu konversi baris lama per batch:
+--   python manage.py migrate-message-format
+
+ALTER TABLE messages
+    ADD COLUMN message_ciphertext MEDIUMBLOB NULL,
+    ALGORITHM=INSTANT;
+
+ALTER TABLE messages
+    MODIFY message_text TEXT NULL,
+    ALGORITHM=INPLACE, LOCK=NONE;
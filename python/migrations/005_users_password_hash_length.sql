@@ -0,0 +1,9 @@
+-- Hash password baru (scrypt/argon2id/bcrypt) berbentuk string self-describing
+-- seperti "$scrypt$ln=15,r=8,p=1$<salt>$<hash>" (~90 karakter), lebih panjang
+-- dari hash MD5 hex (32 karakter).
+--
+-- Hash MD5 lama tetap valid dan otomatis di-upgrade saat user login berhasil.
+-- Jalankan sebelum deploy AuthService dengan hashing baru.
+
+ALTER TABLE users
+    MODIFY password_hash VARCHAR(255) NOT NULL;
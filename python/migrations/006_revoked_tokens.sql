@@ -0,0 +1,12 @@
+-- Daftar token sesi yang dicabut (logout) sebelum kedaluwarsa.
+--
+-- Token sesi diverifikasi tanpa query database (signature HMAC). Setiap
+-- worker memuat jti yang belum kedaluwarsa dari tabel ini ke memory secara
+-- berkala (AUTH_REVOCATION_REFRESH detik). Baris yang sudah lewat
+-- expires_at boleh dihapus kapan saja (SessionTokenService.purge_expired()).
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti CHAR(32) NOT NULL PRIMARY KEY,
+    expires_at DATETIME NOT NULL,
+    INDEX idx_revoked_tokens_expires (expires_at)
+);
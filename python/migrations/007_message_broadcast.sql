@@ -0,0 +1,19 @@
+-- Broadcast: satu pesan ke banyak penerima (POST /api/messages/broadcast).
+-- Semua baris pesan satu broadcast berbagi broadcast_id, sehingga ID pesan
+-- hasil INSERT multi-row bisa diambil dengan satu query ber-index.
+--
+-- File attachment broadcast disimpan sekali dan dirujuk oleh banyak baris
+-- message_attachments. Index file_path dipakai untuk cek referensi sebelum
+-- file dihapus dari disk.
+
+ALTER TABLE messages
+    ADD COLUMN broadcast_id CHAR(32) NULL,
+    ALGORITHM=INSTANT;
+
+ALTER TABLE messages
+    ADD INDEX idx_messages_broadcast (broadcast_id),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE message_attachments
+    ADD INDEX idx_message_attachments_file_path (file_path(191)),
+    ALGORITHM=INPLACE, LOCK=NONE;
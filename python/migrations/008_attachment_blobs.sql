@@ -0,0 +1,25 @@
+-- Blob store attachment content-addressed (SHA-256).
+-- Isi file yang sama disimpan sekali di uploads/attachment_blobs/ab/cd/<hash>
+-- dan dirujuk oleh banyak baris message_attachments (blob_sha256).
+-- ref_count = jumlah baris message_attachments yang merujuk blob; blob
+-- dan file-nya dihapus saat referensi terakhir hilang.
+--
+-- Setelah migration ini, pindahkan file lama (folder flat
+-- uploads/message_attachments) ke blob store:
+--   python manage.py migrate-attachments
+
+CREATE TABLE IF NOT EXISTS attachment_blobs (
+    sha256 CHAR(64) NOT NULL PRIMARY KEY,
+    file_path VARCHAR(255) NOT NULL,
+    file_size BIGINT NOT NULL,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE message_attachments
+    ADD COLUMN blob_sha256 CHAR(64) NULL,
+    ALGORITHM=INSTANT;
+
+ALTER TABLE message_attachments
+    ADD INDEX idx_message_attachments_blob (blob_sha256),
+    ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,11 @@
+-- Enkripsi at-rest blob attachment (AES-256-GCM chunked, utils/aes_file_encryption.py).
+-- encrypted = 1: file blob berisi container AES chunked dan sha256 berisi
+-- HMAC-SHA256 isi asli (alamat blob, bukan hash plaintext biasa).
+-- Blob lama tetap encrypted = 0 dan tetap bisa di-download.
+--
+-- Setelah migration ini, enkripsi blob plaintext yang sudah ada:
+--   python manage.py encrypt-attachments
+
+ALTER TABLE attachment_blobs
+    ADD COLUMN encrypted TINYINT(1) NOT NULL DEFAULT 0,
+    ALGORITHM=INSTANT;
@@ -0,0 +1,8 @@
+-- Blind search index berganti dari token prefix kata ke token n-gram
+-- (3 karakter di semua posisi kata), agar keyword di tengah kata ("port"
+-- di "report") tetap ditemukan seperti scan lama. Token lama tidak cocok
+-- lagi dengan query, jadi dikosongkan lalu dibangun ulang:
+--   python manage.py backfill-search-index
+-- Selama backfill berjalan hasil search untuk pesan lama belum lengkap.
+
+TRUNCATE TABLE message_search_tokens;
@@ -0,0 +1,191 @@
+"""
+Search Index Module
+Blind index (HMAC token) untuk pencarian pesan terenkripsi tanpa decrypt semua pesan
+"""
+
+import hashlib
+import hmac
+import re
+
+
+class SearchIndex:
+    """
+    Inverted index berbasis keyed-HMAC untuk pesan terenkripsi.
+
+    Setiap n-gram kata (potongan NGRAM_LENGTH karakter di semua posisi) di-hash
+    dengan HMAC-SHA256 memakai key rahasia + user_id, lalu disimpan di tabel
+    message_search_tokens. Database hanya melihat token acak, bukan kata aslinya.
+    Token per user berbeda, sehingga kata yang sama tidak bisa dikorelasikan antar user.
+
+    Karena n-gram diambil dari semua posisi, keyword di tengah kata ("port"
+    di "report") tetap ditemukan, sama seperti substring match scan lama.
+    """
+
+    NGRAM_LENGTH = 3
+
+    def __init__(self, db_connection, key):
+        """
+        Inisialisasi SearchIndex.
+        
+        Args:
+            db_connection: Database connection object dari connection.py
+            key: Key rahasia untuk HMAC (string atau bytes)
+        """
+        self.db = db_connection
+        self.key = key.encode('utf-8') if isinstance(key, str) else key
+
+    @staticmethod
+    def _words(text):
+        """Pecah teks menjadi kata lowercase (unicode-aware)."""
+        return re.findall(r'\w+', text.lower())
+
+    def _ngrams(self, word):
+        n = self.NGRAM_LENGTH
+        return {word[i:i + n] for i in range(len(word) - n + 1)}
+
+    def tokenize(self, text):
+        """
+        Ambil semua term yang diindex dari sebuah teks.
+        
+        Args:
+            text: Plaintext pesan
+        
+        Returns:
+            Set term (n-gram NGRAM_LENGTH karakter dari setiap kata)
+        
+        Example:
+            >>> sorted(SearchIndex(None, 'k').tokenize("Meeting"))
+            ['eet', 'eti', 'ing', 'mee', 'tin']
+        """
+        terms = set()
+        for word in self._words(text):
+            terms |= self._ngrams(word)
+        return terms
+
+    def query_terms(self, keyword):
+        """
+        Term yang harus ada di pesan agar cocok dengan keyword.
+        
+        Args:
+            keyword: Kata kunci pencarian
+        
+        Returns:
+            Set term, atau set kosong jika keyword tidak bisa dicari lewat index
+            (misal semua kata lebih pendek dari NGRAM_LENGTH)
+        """
+        terms = set()
+        for word in self._words(keyword):
+            terms |= self._ngrams(word)
+        return terms
+
+    def _token(self, user_id, term):
+        """HMAC-SHA256(key, "user_id:term") sebagai 32 byte."""
+        message = f"{user_id}:{term}".encode('utf-8')
+        return hmac.new(self.key, message, hashlib.sha256).digest()
+
+    def index_message(self, message_id, sender_id, receiver_id, plaintext):
+        """
+        Simpan token pesan untuk sender dan receiver.
+        Panggil di dalam transaksi yang sama dengan INSERT pesan.
+        
+        Args:
+            message_id: ID pesan
+            sender_id: ID pengirim
+            receiver_id: ID penerima
+            plaintext: Isi pesan sebelum dienkripsi
+        
+        Returns:
+            Jumlah token yang disimpan
+        """
+        return self.index_messages([(message_id, sender_id, receiver_id)], plaintext)
+
+    def index_messages(self, messages, plaintext):
+        """
+        Simpan token untuk banyak pesan dengan isi sama (misal broadcast).
+        Teks di-tokenize sekali, token HMAC dihitung sekali per user, dan
+        semua baris disimpan dengan satu execute_many.
+        Panggil di dalam transaksi yang sama dengan INSERT pesan.
+        
+        Args:
+            messages: List tuple (message_id, sender_id, receiver_id)
+            plaintext: Isi pesan sebelum dienkripsi
+        
+        Returns:
+            Jumlah token yang disimpan
+        """
+        terms = self.tokenize(plaintext)
+        if not terms or not messages:
+            return 0
+        
+        tokens_by_user = {}
+        rows = []
+        for message_id, sender_id, receiver_id in messages:
+            for user_id in {sender_id, receiver_id}:
+                tokens = tokens_by_user.get(user_id)
+                if tokens is None:
+                    tokens = tokens_by_user[user_id] = [self._token(user_id, term) for term in terms]
+                rows.extend((user_id, token, message_id) for token in tokens)
+        
+        # Pesan panjang / broadcast bisa menghasilkan ribuan token: execute_many
+        # memecah menjadi beberapa INSERT multi-row dengan ukuran batch terbatas
+        query = """
+        INSERT IGNORE INTO message_search_tokens (user_id, token, message_id)
+        VALUES (%s, %s, %s)
+        """
+        self.db.execute_many(query, rows)
+        return len(rows)
+
+    def remove_message(self, message_id):
+        """
+        Hapus semua token milik sebuah pesan.
+        
+        Args:
+            message_id: ID pesan
+        """
+        query = "DELETE FROM message_search_tokens WHERE message_id = %s"
+        self.db.execute_query(query, (message_id,))
+
+    def find_message_ids(self, user_id, keyword, limit=100, before_id=None):
+        """
+        Cari ID pesan milik user yang mengandung semua term keyword.
+        
+        Hasil adalah kandidat: pemanggil tetap perlu decrypt dan mencocokkan
+        keyword secara utuh (n-gram yang sama bisa muncul di urutan berbeda).
+        
+        Args:
+            user_id: ID user yang mencari
+            keyword: Kata kunci
+            limit: Jumlah maksimal kandidat (default: 100)
+            before_id: Hanya ambil ID lebih kecil dari ini (untuk batch berikutnya)
+        
+        Returns:
+            List ID pesan (terbaru dulu), atau None jika keyword tidak bisa
+            dicari lewat index
+        """
+        terms = self.query_terms(keyword)
+        if not terms:
+            return None
+        
+        tokens = [self._token(user_id, term) for term in terms]
+        placeholders = ', '.join(['%s'] * len(tokens))
+        query = f"""
+        SELECT message_id
+        FROM message_search_tokens
+        WHERE user_id = %s AND token IN ({placeholders})
+        """
+        params = [user_id, *tokens]
+        
+        if before_id is not None:
+            query += " AND message_id < %s"
+            params.append(before_id)
+        
+        query += """
+        GROUP BY message_id
+        HAVING COUNT(*) = %s
+        ORDER BY message_id DESC
+        LIMIT %s
+        """
+        params.extend([len(tokens), limit])
+        
+        result = self.db.execute_read_dict(query, tuple(params))
+        return [row['message_id'] for row in result] if result else []
@@ -0,0 +1,78 @@
+"""
+Production Server
+Menjalankan Kripto App API di gunicorn (pre-fork, worker gthread)
+
+Setiap worker memanggil create_app() setelah fork, sehingga connection pool
+MySQL dan pool decrypt tidak pernah dibagi antar proses. Jumlah worker,
+thread, keep-alive dan timeout diambil dari Config (.env):
+
+    SERVER_WORKERS, SERVER_THREADS, SERVER_KEEPALIVE,
+    SERVER_TIMEOUT, SERVER_GRACEFUL_TIMEOUT, FLASK_HOST, FLASK_PORT
+
+Usage (dari folder python/):
+    python serve.py
+"""
+
+from gunicorn.app.base import BaseApplication
+
+from config import config
+
+
+def _worker_exit(server, worker):
+    """Hook gunicorn: tutup pool DB/decrypt milik worker saat berhenti."""
+    from main import shutdown_app
+    
+    app = getattr(worker, 'wsgi', None)
+    if app is not None:
+        shutdown_app(app)
+
+
+class KriptoServer(BaseApplication):
+    """Aplikasi gunicorn yang membuat Flask app per worker."""
+
+    def __init__(self, options=None):
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+
+    def load(self):
+        # Dipanggil di dalam worker (preload_app=False)
+        from main import create_app
+        return create_app()
+
+
+def get_server_options(cfg=None):
+    """
+    Opsi gunicorn dari Config.
+    
+    Args:
+        cfg: Objek Config (default: config dari .env)
+    
+    Returns:
+        Dictionary opsi gunicorn
+    """
+    cfg = cfg or config
+    return {
+        **cfg.get_server_config(),
+        'worker_class': 'gthread',
+        'preload_app': False,
+        'worker_exit': _worker_exit,
+        'accesslog': '-',
+        'errorlog': '-'
+    }
+
+
+if __name__ == "__main__":
+    options = get_server_options()
+
+    if config.db_pool_max_size < config.server_threads:
+        print(f"⚠️ DB_POOL_MAX_SIZE ({config.db_pool_max_size}) lebih kecil dari "
+              f"SERVER_THREADS ({config.server_threads}), request bisa menunggu koneksi")
+
+    print(f"🚀 Kripto App API (gunicorn) di {options['bind']} "
+          f"- {options['workers']} worker x {options['threads']} thread")
+    KriptoServer(options).run()
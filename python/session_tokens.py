@@ -0,0 +1,219 @@
+"""
+Session Token Module
+Token sesi stateless (HMAC-SHA256) untuk autentikasi request tanpa query database
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class InvalidTokenError(Exception):
+    """Token tidak valid, kedaluwarsa, atau sudah dicabut."""
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class SessionTokenService:
+    """
+    Penerbit dan verifikator token sesi.
+
+    Format token: base64url(payload JSON) + "." + base64url(HMAC-SHA256(secret, payload)).
+    Payload berisi user id (uid), token id (jti), waktu terbit (iat),
+    kedaluwarsa (exp) dan claim tambahan. Verifikasi hanya butuh secret key,
+    tanpa query database.
+
+    Token yang dicabut (logout) disimpan di tabel revoked_tokens sampai
+    kedaluwarsa, dan di-cache sebagai set jti di memory. Set di-refresh dari
+    database paling sering setiap `refresh_interval` detik, sehingga
+    pencabutan di worker lain ikut terlihat tanpa query per request.
+    """
+
+    JTI_SIZE = 16
+
+    def __init__(self, db_connection, secret_key, ttl=86400, refresh_interval=30):
+        """
+        Inisialisasi SessionTokenService.
+        
+        Args:
+            db_connection: Database connection object dari connection.py
+            secret_key: Secret HMAC (config.secret_key)
+            ttl: Umur token dalam detik (default: 24 jam)
+            refresh_interval: Interval refresh daftar token dicabut (detik, default: 30)
+        """
+        self.db = db_connection
+        self.key = secret_key.encode('utf-8') if isinstance(secret_key, str) else secret_key
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        
+        self._revoked = {}  # jti -> exp (unix time)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._last_refresh = None  # belum pernah refresh
+
+    def _sign(self, payload_b64):
+        return _b64encode(hmac.new(self.key, payload_b64.encode('ascii'), hashlib.sha256).digest())
+
+    def issue(self, user_id, **claims):
+        """
+        Terbitkan token untuk user.
+        
+        Args:
+            user_id: ID user
+            **claims: Claim tambahan (misal username, email)
+        
+        Returns:
+            Dictionary token, token_type dan expires_at (ISO)
+        """
+        now = int(time.time())
+        payload = {
+            **claims,
+            'uid': int(user_id),
+            'jti': os.urandom(self.JTI_SIZE).hex(),
+            'iat': now,
+            'exp': now + self.ttl
+        }
+        payload_b64 = _b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+        return {
+            'token': f"{payload_b64}.{self._sign(payload_b64)}",
+            'token_type': 'Bearer',
+            'expires_at': datetime.fromtimestamp(payload['exp']).isoformat()
+        }
+
+    def decode(self, token):
+        """
+        Verifikasi signature dan masa berlaku token (tanpa cek pencabutan).
+        
+        Returns:
+            Dictionary claims
+        
+        Raises:
+            InvalidTokenError: Jika format/signature salah atau kedaluwarsa
+        """
+        try:
+            payload_b64, signature = token.split('.')
+        except (AttributeError, ValueError):
+            raise InvalidTokenError("Format token tidak valid")
+        
+        if not hmac.compare_digest(signature, self._sign(payload_b64)):
+            raise InvalidTokenError("Signature token tidak valid")
+        
+        try:
+            claims = json.loads(_b64decode(payload_b64))
+        except ValueError:
+            raise InvalidTokenError("Payload token tidak valid")
+        
+        if claims.get('exp', 0) <= time.time():
+            raise InvalidTokenError("Token sudah kedaluwarsa")
+        return claims
+
+    def verify(self, token):
+        """
+        Verifikasi token lengkap (signature, kedaluwarsa, pencabutan).
+        
+        Args:
+            token: String token dari header Authorization
+        
+        Returns:
+            Dictionary claims (uid = ID user)
+        
+        Raises:
+            InvalidTokenError: Jika token tidak bisa dipakai
+        """
+        claims = self.decode(token)
+        if self.is_revoked(claims['jti']):
+            raise InvalidTokenError("Token sudah dicabut (logout)")
+        return claims
+
+    def revoke(self, token):
+        """
+        Cabut token (logout). Token tetap ditolak sampai waktu exp-nya lewat.
+        
+        Args:
+            token: String token
+        
+        Returns:
+            True jika berhasil dicabut
+        
+        Raises:
+            InvalidTokenError: Jika token memang sudah tidak valid
+        """
+        claims = self.decode(token)
+        query = """
+        INSERT IGNORE INTO revoked_tokens (jti, expires_at)
+        VALUES (%s, FROM_UNIXTIME(%s))
+        """
+        success = self.db.execute_query(query, (claims['jti'], claims['exp']))
+        with self._lock:
+            self._revoked[claims['jti']] = claims['exp']
+        return bool(success)
+
+    def is_revoked(self, jti):
+        """Cek jti di cache pencabutan (refresh dari database jika sudah lewat interval)."""
+        if self._refresh_due():
+            # Single-flight: hanya satu thread yang refresh, thread lain
+            # langsung memakai daftar lama. Sebelum refresh pertama belum ada
+            # daftar sama sekali, jadi semua thread menunggu hasilnya.
+            if self._refresh_lock.acquire(blocking=self._last_refresh is None):
+                try:
+                    if self._refresh_due():
+                        self.refresh_revocations()
+                finally:
+                    self._refresh_lock.release()
+        with self._lock:
+            return jti in self._revoked
+
+    def _refresh_due(self):
+        last = self._last_refresh
+        return last is None or time.monotonic() - last >= self.refresh_interval
+
+    def refresh_revocations(self):
+        """
+        Muat ulang daftar token dicabut yang belum kedaluwarsa dari database.
+        Entry yang sudah kedaluwarsa dibuang dari cache.
+        """
+        started = time.monotonic()
+        query = """
+        SELECT jti, UNIX_TIMESTAMP(expires_at) AS exp
+        FROM revoked_tokens
+        WHERE expires_at > NOW()
+        """
+        result = self.db.execute_read_dict(query)
+        now = time.time()
+        with self._lock:
+            revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            if result:
+                revoked.update({row['jti']: int(row['exp']) for row in result})
+            self._revoked = revoked
+        # Diset setelah daftar terisi, agar thread lain tidak memakai daftar kosong
+        self._last_refresh = started
+
+    def purge_expired(self):
+        """
+        Hapus baris revoked_tokens yang sudah kedaluwarsa.
+        
+        Returns:
+            True jika query berhasil
+        """
+        return self.db.execute_query("DELETE FROM revoked_tokens WHERE expires_at <= NOW()")
+
+    def get_stats(self):
+        """Statistik cache pencabutan."""
+        with self._lock:
+            revoked = len(self._revoked)
+        return {
+            'ttl': self.ttl,
+            'revoked_cached': revoked,
+            'refresh_interval': self.refresh_interval
+        }
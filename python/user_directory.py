@@ -0,0 +1,240 @@
+"""
+User Directory Module
+Cache in-process untuk lookup user (email -> id, id -> profil) yang dipakai
+bersama oleh AuthService, MessageService dan route /api/users/<id>
+"""
+
+import threading
+
+from utils.ttl_cache import TTLCache
+
+
+class InvalidationBus:
+    """
+    Pub/sub lokal (in-process) untuk pesan invalidasi cache.
+
+    Pengganti sederhana Redis pub/sub: publish() langsung memanggil semua
+    subscriber di proses yang sama. Implementasi lintas proses cukup
+    menyediakan subscribe()/publish() dengan bentuk pesan yang sama.
+    """
+
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """
+        Daftarkan callback(message) yang dipanggil setiap publish.
+        
+        Returns:
+            Fungsi untuk berhenti berlangganan
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+        
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def publish(self, message):
+        """
+        Kirim pesan ke semua subscriber.
+        
+        Args:
+            message: Dictionary pesan (misal {'user_id': 1, 'email': 'a@b.c'})
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(message)
+            except Exception as e:
+                print(f"⚠️ Error subscriber invalidasi: {e}")
+
+
+# Bus default: semua UserDirectory di proses yang sama saling invalidasi
+default_bus = InvalidationBus()
+
+
+class UserDirectory:
+    """
+    Cache profil user (id, username, email, created_at) dengan batas ukuran dan TTL.
+
+    Dua cache dipakai bersama:
+    - email (lowercase) -> user id
+    - user id -> profil
+
+    Hanya user yang ditemukan yang di-cache (tidak ada negative cache), jadi
+    user yang baru register langsung bisa ditemukan di semua worker.
+    Perubahan data user diumumkan lewat InvalidationBus agar instance lain
+    membuang entry lama sebelum TTL habis.
+
+    Bus default hanya menjangkau proses yang sama: dengan beberapa worker
+    gunicorn (serve.py), worker lain tetap memakai entry lama sampai TTL
+    habis. Karena itu cache hanya berisi profil publik (PROFILE_QUERY, tanpa
+    password_hash); lookup kredensial di AuthService.login_user dan
+    change_password selalu query database langsung.
+    """
+
+    PROFILE_QUERY = "SELECT id, username, email, created_at FROM users WHERE {column} = %s"
+
+    def __init__(self, db_connection, cache_size=4096, cache_ttl=300, bus=None):
+        """
+        Inisialisasi UserDirectory.
+        
+        Args:
+            db_connection: Database connection object dari connection.py
+            cache_size: Jumlah user maksimal di cache (default: 4096)
+            cache_ttl: Umur entry cache dalam detik (default: 300)
+            bus: InvalidationBus untuk invalidasi antar instance (default: default_bus)
+        """
+        self.db = db_connection
+        self.by_email = TTLCache(max_size=cache_size, ttl=cache_ttl)
+        self.by_id = TTLCache(max_size=cache_size, ttl=cache_ttl)
+        self.bus = bus or default_bus
+        self._unsubscribe = self.bus.subscribe(self._on_invalidate)
+
+    @staticmethod
+    def _email_key(email):
+        return email.strip().lower()
+
+    def _remember(self, profile):
+        self.by_id.set(profile['id'], profile)
+        self.by_email.set(self._email_key(profile['email']), profile['id'])
+
+    def _load(self, column, value):
+        result = self.db.execute_read_dict(self.PROFILE_QUERY.format(column=column), (value,))
+        if not result:
+            return None
+        profile = result[0]
+        self._remember(profile)
+        return profile
+
+    def get_by_id(self, user_id):
+        """
+        Ambil profil user berdasarkan ID.
+        
+        Args:
+            user_id: ID user
+        
+        Returns:
+            Dictionary profil (copy) atau None jika user tidak ada
+        """
+        user_id = int(user_id)
+        profile = self.by_id.get(user_id)
+        if profile is None:
+            profile = self._load('id', user_id)
+        return dict(profile) if profile else None
+
+    def get_by_email(self, email):
+        """
+        Ambil profil user berdasarkan email.
+        
+        Args:
+            email: Email user
+        
+        Returns:
+            Dictionary profil (copy) atau None jika user tidak ada
+        """
+        user_id = self.by_email.get(self._email_key(email))
+        if user_id is not None:
+            profile = self.by_id.get(user_id)
+            if profile is not None:
+                return dict(profile)
+        profile = self._load('email', email)
+        return dict(profile) if profile else None
+
+    def get_many_by_email(self, emails):
+        """
+        Ambil profil banyak user sekaligus: dari cache, sisanya satu query IN (...).
+        
+        Args:
+            emails: List email
+        
+        Returns:
+            Dictionary email (lowercase) -> profil (copy), hanya user yang ditemukan
+        """
+        found = {}
+        missing = []
+        for email in emails:
+            key = self._email_key(email)
+            if key in found:
+                continue
+            user_id = self.by_email.get(key)
+            profile = self.by_id.get(user_id) if user_id is not None else None
+            if profile is not None:
+                found[key] = dict(profile)
+            elif key not in missing:
+                missing.append(key)
+        
+        if missing:
+            placeholders = ', '.join(['%s'] * len(missing))
+            query = self.PROFILE_QUERY.replace('{column} = %s', f'email IN ({placeholders})')
+            for profile in self.db.execute_read_dict(query, tuple(missing)) or []:
+                self._remember(profile)
+                found[self._email_key(profile['email'])] = dict(profile)
+        return found
+
+    def invalidate(self, user_id=None, email=None):
+        """
+        Buang user dari cache di semua instance yang berlangganan bus.
+        Panggil setelah register atau perubahan profil.
+        
+        Args:
+            user_id: ID user (opsional)
+            email: Email user (opsional)
+        """
+        self.bus.publish({'user_id': user_id, 'email': email})
+
+    def _on_invalidate(self, message):
+        user_id = message.get('user_id')
+        email = message.get('email')
+        
+        if user_id is not None:
+            profile = self.by_id.get(int(user_id))
+            self.by_id.delete(int(user_id))
+            if profile is not None:
+                self.by_email.delete(self._email_key(profile['email']))
+        if email:
+            self.by_email.delete(self._email_key(email))
+
+    def get_stats(self):
+        """Statistik cache untuk monitoring."""
+        return {
+            'by_email': self.by_email.stats(),
+            'by_id': self.by_id.stats()
+        }
+
+    def close(self):
+        """Berhenti berlangganan bus invalidasi."""
+        self._unsubscribe()
+
+
+if __name__ == "__main__":
+    print("=== Test User Directory ===\n")
+
+    class FakeDB:
+        def __init__(self):
+            self.queries = 0
+
+        def execute_read_dict(self, query, params=None):
+            self.queries += 1
+            if str(params[0]).lower() in ('alice@example.com', '1'):
+                return [{'id': 1, 'username': 'alice', 'email': 'alice@example.com', 'created_at': None}]
+            return []
+
+    db = FakeDB()
+    directory = UserDirectory(db)
+    other = UserDirectory(db)
+
+    for _ in range(100):
+        directory.get_by_email('Alice@Example.com')
+    print(f"✓ 100 lookup email, query ke database: {db.queries}")
+
+    other.get_by_id(1)
+    directory.invalidate(user_id=1)
+    other.get_by_id(1)
+    print(f"✓ Setelah invalidasi lewat bus, query ke database: {db.queries}")
+    print(f"✓ Stats: {directory.get_stats()['by_email']}")
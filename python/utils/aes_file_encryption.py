@@ -2,16 +2,57 @@
 AES File Encryption Module
 Modul untuk enkripsi dan dekripsi file menggunakan algoritma AES (Advanced Encryption Standard)
 AES lebih aman dan lebih cepat dari DES/Blowfish
+
+Format file:
+    AES-CBC (lama)   : IV (16 bytes) + ciphertext CBC
+    AES-GCM chunked  : header 16 bytes + chunk terenkripsi yang masing-masing
+                       diautentikasi (lihat AESChunkedEncryption)
 """
 
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
 from Crypto.Random import get_random_bytes
+from concurrent.futures import ThreadPoolExecutor
+from utils.key_derivation import get_key_derivation
 import os
+import threading
+
+
+# Ukuran blok baca/tulis untuk enkripsi streaming (64 KB)
+CHUNK_SIZE = 64 * 1024
+
+
+def read_chunks(fileobj, chunk_size=CHUNK_SIZE):
+    """
+    Generator pembaca file per chunk.
+    
+    Args:
+        fileobj: File-like object yang dibuka mode binary
+        chunk_size: Ukuran chunk dalam bytes
+    
+    Yields:
+        bytes (maksimal chunk_size)
+    """
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
 
 
 class AESFileEncryption:
-    """Class untuk enkripsi dan dekripsi file dengan AES."""
+    """
+    Class untuk enkripsi dan dekripsi file dengan AES.
+    
+    Format file .enc: IV (16 bytes) + ciphertext AES-CBC (PKCS7 padding).
+    Enkripsi/dekripsi dilakukan streaming per chunk, sehingga memori tetap
+    kecil berapapun ukuran file.
+    
+    Note:
+        Format ini tidak punya salt/KDF (password hanya di-pad ke 32 bytes),
+        dipertahankan agar file lama tetap bisa dibuka. File baru sebaiknya
+        memakai AESChunkedEncryption.
+    """
     
     def __init__(self, key=None):
         """
@@ -23,11 +64,14 @@ class AESFileEncryption:
         Note:
             AES mendukung key size: 16 bytes (AES-128), 24 bytes (AES-192), 32 bytes (AES-256)
         """
+        # Password asli (untuk KDF di AESChunkedEncryption), None jika key bytes
+        self.password = key if isinstance(key, str) else None
+        
         if key is None:
             # Generate random 32-byte key (AES-256)
             self.key = get_random_bytes(32)
         elif isinstance(key, str):
-            # Convert string ke bytes, pastikan 32 bytes
+            # Format CBC lama: string di-pad/truncate ke 32 bytes (tanpa KDF)
             key_bytes = key.encode('utf-8')
             if len(key_bytes) < 32:
                 # Pad dengan nul bytes jika kurang
@@ -44,9 +88,134 @@ class AESFileEncryption:
         else:
             raise TypeError("Key must be string or bytes!")
     
+    @property
+    def algorithm(self):
+        """Nama algoritma untuk info hasil (misal 'AES-256-CBC')."""
+        return f"AES-{len(self.key) * 8}-CBC"
+    
+    def iter_encrypt(self, chunks):
+        """
+        Enkripsi streaming: terima iterable bytes, hasilkan bytes terenkripsi.
+        
+        Args:
+            chunks: Iterable bytes plaintext (ukuran chunk bebas)
+        
+        Yields:
+            IV (16 bytes) lalu potongan ciphertext AES-CBC
+        """
+        cipher = AES.new(self.key, AES.MODE_CBC)
+        yield cipher.iv
+        
+        pending = b''
+        for chunk in chunks:
+            pending += chunk
+            # Enkripsi hanya kelipatan block size, sisanya ditahan
+            usable = len(pending) - len(pending) % AES.block_size
+            if usable:
+                yield cipher.encrypt(pending[:usable])
+                pending = pending[usable:]
+        
+        yield cipher.encrypt(pad(pending, AES.block_size))
+    
+    def iter_decrypt(self, chunks):
+        """
+        Dekripsi streaming: kebalikan dari iter_encrypt().
+        
+        Args:
+            chunks: Iterable bytes dari file .enc (IV + ciphertext)
+        
+        Yields:
+            Potongan plaintext
+        
+        Raises:
+            ValueError: Jika ciphertext tidak valid atau password salah
+        """
+        cipher = None
+        pending = b''
+        for chunk in chunks:
+            pending += chunk
+            if cipher is None:
+                if len(pending) < 16:
+                    continue
+                # IV di 16 bytes pertama
+                cipher = AES.new(self.key, AES.MODE_CBC, pending[:16])
+                pending = pending[16:]
+            
+            # Tahan block terakhir (berisi padding) sampai input habis
+            usable = (len(pending) - 1) // AES.block_size * AES.block_size
+            if usable > 0:
+                yield cipher.decrypt(pending[:usable])
+                pending = pending[usable:]
+        
+        if cipher is None or len(pending) != AES.block_size:
+            raise ValueError("Ciphertext tidak valid (ukuran bukan kelipatan block AES)")
+        
+        yield unpad(cipher.decrypt(pending), AES.block_size)
+    
+    def encrypt_stream(self, reader, writer, chunk_size=CHUNK_SIZE):
+        """
+        Enkripsi dari file-like object ke file-like object secara streaming.
+        
+        Args:
+            reader: File-like sumber (mode binary)
+            writer: File-like tujuan (mode binary)
+            chunk_size: Ukuran chunk baca (default: 64 KB)
+        
+        Returns:
+            Tuple (jumlah bytes dibaca, jumlah bytes ditulis)
+        """
+        return self._pipe(self.iter_encrypt, reader, writer, chunk_size)
+    
+    def decrypt_stream(self, reader, writer, chunk_size=CHUNK_SIZE):
+        """
+        Dekripsi dari file-like object ke file-like object secara streaming.
+        
+        Args:
+            reader: File-like sumber berisi IV + ciphertext (mode binary)
+            writer: File-like tujuan (mode binary)
+            chunk_size: Ukuran chunk baca (default: 64 KB)
+        
+        Returns:
+            Tuple (jumlah bytes dibaca, jumlah bytes ditulis)
+        """
+        return self._pipe(self.iter_decrypt, reader, writer, chunk_size)
+    
+    @staticmethod
+    def _pipe(transform, reader, writer, chunk_size):
+        """Jalankan transform generator dari reader ke writer sambil menghitung ukuran."""
+        counter = {'read': 0, 'written': 0}
+        
+        def counted(chunks):
+            for chunk in chunks:
+                counter['read'] += len(chunk)
+                yield chunk
+        
+        for piece in transform(counted(read_chunks(reader, chunk_size))):
+            writer.write(piece)
+            counter['written'] += len(piece)
+        
+        return counter['read'], counter['written']
+    
+    @staticmethod
+    def _transform_file(stream_func, input_file, output_file):
+        """
+        Jalankan encrypt/decrypt stream ke file sementara, lalu rename.
+        File output tidak dibuat sama sekali jika proses gagal di tengah.
+        """
+        temp_file = output_file + ".part"
+        try:
+            with open(input_file, 'rb') as reader, open(temp_file, 'wb') as writer:
+                sizes = stream_func(reader, writer)
+            os.replace(temp_file, output_file)
+            return sizes
+        except Exception:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+    
     def encrypt_file(self, input_file, output_file=None):
         """
-        Enkripsi file.
+        Enkripsi file (streaming, memori konstan).
         
         Args:
             input_file: Path file yang akan dienkripsi
@@ -64,33 +233,21 @@ class AESFileEncryption:
         if output_file is None:
             output_file = input_file + ".enc"
         
-        # Baca file
-        with open(input_file, 'rb') as f:
-            data = f.read()
-        
-        # Create AES cipher
-        cipher = AES.new(self.key, AES.MODE_CBC)
-        
-        # Encrypt
-        ciphertext = cipher.encrypt(pad(data, AES.block_size))
-        
         # Simpan: IV (16 bytes) + ciphertext
-        with open(output_file, 'wb') as f:
-            f.write(cipher.iv)  # Save IV di awal file
-            f.write(ciphertext)
+        original_size, encrypted_size = self._transform_file(self.encrypt_stream, input_file, output_file)
         
         return {
             'success': True,
             'original_file': input_file,
             'encrypted_file': output_file,
-            'original_size': len(data),
-            'encrypted_size': len(ciphertext) + 16,  # +16 untuk IV
-            'algorithm': 'AES-256-CBC'
+            'original_size': original_size,
+            'encrypted_size': encrypted_size,  # Termasuk 16 bytes IV
+            'algorithm': self.algorithm
         }
     
     def decrypt_file(self, input_file, output_file=None):
         """
-        Dekripsi file.
+        Dekripsi file (streaming, memori konstan).
         
         Args:
             input_file: Path file terenkripsi
@@ -112,27 +269,14 @@ class AESFileEncryption:
             else:
                 output_file = input_file + ".dec"
         
-        # Baca file terenkripsi
-        with open(input_file, 'rb') as f:
-            iv = f.read(16)  # Baca IV (16 bytes pertama)
-            ciphertext = f.read()  # Sisanya adalah ciphertext
-        
-        # Create AES cipher dengan IV yang sama
-        cipher = AES.new(self.key, AES.MODE_CBC, iv)
-        
-        # Decrypt
-        data = unpad(cipher.decrypt(ciphertext), AES.block_size)
-        
-        # Simpan file hasil dekripsi
-        with open(output_file, 'wb') as f:
-            f.write(data)
+        _, decrypted_size = self._transform_file(self.decrypt_stream, input_file, output_file)
         
         return {
             'success': True,
             'encrypted_file': input_file,
             'decrypted_file': output_file,
-            'decrypted_size': len(data),
-            'algorithm': 'AES-256-CBC'
+            'decrypted_size': decrypted_size,
+            'algorithm': self.algorithm
         }
     
     def get_key_hex(self):
@@ -140,9 +284,415 @@ class AESFileEncryption:
         return self.key.hex()
 
 
+# Thread pool bersama untuk enkripsi chunk paralel (dibuat saat pertama dipakai,
+# sehingga aman dipakai setelah fork worker)
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                thread_name_prefix='aes-chunk'
+            )
+        return _executor
+
+
+def _rechunk(chunks, size):
+    """
+    Potong ulang iterable bytes menjadi potongan berukuran tepat `size`
+    (potongan terakhir boleh lebih pendek), ditandai apakah potongan terakhir.
+    
+    Yields:
+        Tuple (bytes, is_final). Input kosong menghasilkan satu (b'', True).
+    """
+    buffer = bytearray()
+    previous = None
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= size:
+            if previous is not None:
+                yield previous, False
+            previous = bytes(buffer[:size])
+            del buffer[:size]
+    
+    if buffer:
+        if previous is not None:
+            yield previous, False
+        yield bytes(buffer), True
+    else:
+        yield (previous if previous is not None else b''), True
+
+
+class AESChunkedEncryption(AESFileEncryption):
+    """
+    Enkripsi file AES-GCM per chunk (format kontainer chunked).
+    
+    Layout file:
+        header v3 : MAGIC "KAES" (4) | versi 0x03 (1) | chunk_size (4, big-endian) | file nonce (7)
+                    | kdf_id (1) | parameter KDF (4) | salt (16)
+        header v2 : 16 bytes pertama v3 saja (key dari password lama, tanpa KDF)
+        chunk     : ciphertext (chunk_size bytes, chunk terakhir boleh lebih pendek) + tag GCM (16)
+    
+    Nonce tiap chunk = file nonce (7) | index chunk (4) | flag chunk terakhir (1),
+    dan header ikut diautentikasi (AAD). Chunk yang ditukar, dipotong atau
+    diubah akan gagal verifikasi. Karena ukuran chunk tetap, posisi chunk ke-i
+    bisa dihitung langsung (index implisit), sehingga range byte manapun bisa
+    didekripsi tanpa memproses seluruh file. Chunk dienkripsi/didekripsi
+    paralel di thread pool (pycryptodome melepas GIL).
+    
+    Jika dibuat dengan password (string), key diturunkan dengan KDF
+    (utils.key_derivation) dari password + salt di header. Satu instance
+    memakai satu salt untuk semua file yang dienkripsinya, sehingga enkripsi
+    banyak file dengan password yang sama hanya menjalankan KDF sekali.
+    """
+    
+    MAGIC = b'KAES'
+    VERSION = 0x03
+    SUPPORTED_VERSIONS = (0x02, 0x03)
+    HEADER_SIZE = 16  # Bagian header yang sama di semua versi (cukup untuk deteksi format)
+    KDF_HEADER_SIZE = 21  # kdf_id (1) + parameter (4) + salt (16), hanya v3
+    TAG_SIZE = 16
+    NONCE_PREFIX_SIZE = 7
+    KDF_RAW = 0  # Key dipakai langsung (instance dibuat dengan key bytes)
+    
+    def __init__(self, key=None, chunk_size=CHUNK_SIZE, workers=None, kdf=None):
+        """
+        Args:
+            key: Password (string) atau key AES bytes (sama seperti AESFileEncryption)
+            chunk_size: Ukuran plaintext per chunk (default: 64 KB)
+            workers: Jumlah chunk yang diproses paralel per batch (default: jumlah CPU)
+            kdf: Instance KeyDerivation (default: instance default dari utils.key_derivation)
+        """
+        super().__init__(key)
+        if chunk_size < 1:
+            raise ValueError("chunk_size minimal 1")
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        self.kdf = kdf or get_key_derivation()
+        self._salt = None
+    
+    @property
+    def algorithm(self):
+        return f"AES-{len(self.key) * 8}-GCM-CHUNKED"
+    
+    @classmethod
+    def is_chunked(cls, head):
+        """
+        Cek apakah bytes awal file memakai format chunked ini.
+        
+        Args:
+            head: Minimal 5 bytes pertama file
+        """
+        return head[:4] == cls.MAGIC and len(head) > 4 and head[4] in cls.SUPPORTED_VERSIONS
+    
+    @classmethod
+    def _header_size(cls, version):
+        return cls.HEADER_SIZE + (cls.KDF_HEADER_SIZE if version >= 0x03 else 0)
+    
+    def _build_header(self):
+        """
+        Buat header file baru.
+        
+        Returns:
+            Tuple (header, key AES untuk file ini)
+        """
+        prefix = (self.MAGIC + bytes([self.VERSION]) + self.chunk_size.to_bytes(4, 'big')
+                  + get_random_bytes(self.NONCE_PREFIX_SIZE))
+        
+        if self.password is None:
+            return prefix + bytes([self.KDF_RAW]) + bytes(self.KDF_HEADER_SIZE - 1), self.key
+        
+        if self._salt is None:
+            self._salt = self.kdf.new_salt()
+        kdf_id, params = self.kdf.get_params()
+        key = self.kdf.derive(self.password, self._salt, kdf_id, params)
+        return prefix + bytes([kdf_id]) + params + self._salt, key
+    
+    def _parse_header(self, header):
+        """
+        Validasi header dan ambil key untuk file tersebut.
+        
+        Returns:
+            Tuple (chunk_size, key AES)
+        """
+        if len(header) < self.HEADER_SIZE or not self.is_chunked(header):
+            raise ValueError("Bukan file AES chunked (header tidak valid)")
+        if len(header) < self._header_size(header[4]):
+            raise ValueError("Header file AES chunked terpotong")
+        chunk_size = int.from_bytes(header[5:9], 'big')
+        if chunk_size < 1:
+            raise ValueError("Bukan file AES chunked (chunk_size tidak valid)")
+        
+        kdf_id = header[16] if header[4] >= 0x03 else self.KDF_RAW
+        if kdf_id == self.KDF_RAW:
+            return chunk_size, self.key
+        
+        if self.password is None:
+            raise ValueError("File ini dienkripsi dengan password, bukan key bytes")
+        params, salt = header[17:21], header[21:37]
+        return chunk_size, self.kdf.derive(self.password, salt, kdf_id, params)
+    
+    def _cipher(self, context, index, final):
+        header, key = context
+        nonce = header[9:16] + index.to_bytes(4, 'big') + (b'\x01' if final else b'\x00')
+        cipher = AES.new(key, AES.MODE_GCM, nonce=nonce, mac_len=self.TAG_SIZE)
+        cipher.update(header)
+        return cipher
+    
+    def _seal(self, context, item):
+        index, plaintext, final = item
+        ciphertext, tag = self._cipher(context, index, final).encrypt_and_digest(plaintext)
+        return ciphertext + tag
+    
+    def _open(self, context, item):
+        index, record, final = item
+        if len(record) < self.TAG_SIZE:
+            raise ValueError("Chunk terpotong")
+        try:
+            return self._cipher(context, index, final).decrypt_and_verify(
+                record[:-self.TAG_SIZE], record[-self.TAG_SIZE:]
+            )
+        except ValueError:
+            raise ValueError(f"Chunk {index} gagal verifikasi (password salah atau file rusak)")
+    
+    def _process(self, func, context, items):
+        """Jalankan func untuk setiap chunk, paralel jika lebih dari satu chunk."""
+        if self.workers > 1 and len(items) > 1:
+            return _get_executor().map(lambda item: func(context, item), items)
+        return [func(context, item) for item in items]
+    
+    def _run_batches(self, func, context, pieces):
+        """Kumpulkan chunk per batch lalu proses paralel, urutan output tetap."""
+        batch_size = self.workers * 4
+        batch = []
+        for index, (piece, final) in enumerate(pieces):
+            batch.append((index, piece, final))
+            if len(batch) >= batch_size or final:
+                yield from self._process(func, context, batch)
+                batch = []
+    
+    def iter_encrypt(self, chunks):
+        """
+        Enkripsi streaming ke format chunked.
+        
+        Args:
+            chunks: Iterable bytes plaintext (ukuran chunk bebas)
+        
+        Yields:
+            Header lalu chunk terenkripsi (ciphertext + tag)
+        """
+        header, key = self._build_header()
+        yield header
+        yield from self._run_batches(self._seal, (header, key), _rechunk(chunks, self.chunk_size))
+    
+    def encryptor(self):
+        """
+        Enkriptor push-style untuk data yang datang bertahap (misal upload),
+        menghasilkan output yang sama formatnya dengan iter_encrypt().
+        
+        Returns:
+            ChunkedEncryptor dengan update(data) -> bytes dan finalize() -> bytes
+        """
+        return ChunkedEncryptor(self)
+    
+    def iter_decrypt(self, chunks):
+        """
+        Dekripsi streaming dari format chunked.
+        
+        Args:
+            chunks: Iterable bytes file terenkripsi (header + chunk)
+        
+        Yields:
+            Potongan plaintext
+        
+        Raises:
+            ValueError: Jika header tidak valid atau chunk gagal verifikasi
+        """
+        chunks = iter(chunks)
+        head = bytearray()
+        header_size = self.HEADER_SIZE
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= self.HEADER_SIZE:
+                header_size = self._header_size(head[4])
+                if len(head) >= header_size:
+                    break
+        
+        header = bytes(head[:header_size])
+        chunk_size, key = self._parse_header(header)
+        
+        def records():
+            yield bytes(head[header_size:])
+            yield from chunks
+        
+        yield from self._run_batches(
+            self._open, (header, key), _rechunk(records(), chunk_size + self.TAG_SIZE)
+        )
+    
+    def get_plaintext_size(self, fileobj):
+        """
+        Hitung ukuran plaintext dari file terenkripsi (tanpa dekripsi).
+        
+        Args:
+            fileobj: File-like yang bisa di-seek (mode binary)
+        
+        Returns:
+            Ukuran plaintext dalam bytes
+        """
+        header, total_size = self._read_header(fileobj)
+        chunk_size = int.from_bytes(header[5:9], 'big')
+        return self._plaintext_size(len(header), chunk_size, total_size)
+    
+    def _read_header(self, fileobj):
+        """Baca header lengkap dan ukuran total file."""
+        fileobj.seek(0)
+        header = fileobj.read(self.HEADER_SIZE)
+        if not self.is_chunked(header):
+            raise ValueError("Bukan file AES chunked (header tidak valid)")
+        header += fileobj.read(self._header_size(header[4]) - len(header))
+        total_size = fileobj.seek(0, os.SEEK_END)
+        return header, total_size
+    
+    def _plaintext_size(self, header_size, chunk_size, total_size):
+        record_size = chunk_size + self.TAG_SIZE
+        body = total_size - header_size
+        record_count = max(1, -(-body // record_size))
+        return body - record_count * self.TAG_SIZE
+    
+    def iter_decrypt_range(self, fileobj, start=0, end=None):
+        """
+        Dekripsi sebagian file (random access): hanya chunk yang mencakup
+        range [start, end) yang dibaca dan diverifikasi.
+        
+        Args:
+            fileobj: File-like yang bisa di-seek (mode binary)
+            start: Offset plaintext awal (inklusif)
+            end: Offset plaintext akhir (eksklusif), None = sampai akhir
+        
+        Yields:
+            Potongan plaintext dalam range
+        """
+        header, total_size = self._read_header(fileobj)
+        chunk_size, key = self._parse_header(header)
+        plaintext_size = self._plaintext_size(len(header), chunk_size, total_size)
+        end = plaintext_size if end is None else min(end, plaintext_size)
+        if start >= end:
+            return
+        
+        record_size = chunk_size + self.TAG_SIZE
+        last_index = max(0, -(-plaintext_size // chunk_size) - 1)
+        first, last = start // chunk_size, (end - 1) // chunk_size
+        
+        batch_size = self.workers * 4
+        for batch_start in range(first, last + 1, batch_size):
+            batch = []
+            for index in range(batch_start, min(batch_start + batch_size, last + 1)):
+                fileobj.seek(len(header) + index * record_size)
+                batch.append((index, fileobj.read(record_size), index == last_index))
+            
+            for (index, _, _), plaintext in zip(batch, self._process(self._open, (header, key), batch)):
+                offset = index * chunk_size
+                yield plaintext[max(start - offset, 0):end - offset]
+    
+    def decrypt_range(self, input_file, start=0, end=None):
+        """
+        Dekripsi range byte dari file terenkripsi.
+        
+        Args:
+            input_file: Path file chunked
+            start: Offset plaintext awal (inklusif)
+            end: Offset plaintext akhir (eksklusif), None = sampai akhir
+        
+        Returns:
+            bytes plaintext dalam range
+        """
+        with open(input_file, 'rb') as f:
+            return b''.join(self.iter_decrypt_range(f, start, end))
+
+
+class ChunkedEncryptor:
+    """
+    Enkripsi chunked berbasis push (update/finalize), mirip cipher context.
+    
+    Data dikumpulkan sampai lebih dari satu chunk; chunk penuh terakhir
+    ditahan karena baru diketahui sebagai chunk final saat finalize().
+    Memori maksimal sekitar dua chunk, berapapun ukuran input.
+    """
+    
+    def __init__(self, engine):
+        self.engine = engine
+        self.header, self.key = engine._build_header()
+        self._buffer = bytearray()
+        self._index = 0
+        self._header_sent = False
+        self._finalized = False
+    
+    def _seal(self, plaintext, final):
+        record = self.engine._seal((self.header, self.key), (self._index, plaintext, final))
+        self._index += 1
+        return record
+    
+    def _take_header(self):
+        if self._header_sent:
+            return b''
+        self._header_sent = True
+        return self.header
+    
+    def update(self, data):
+        """
+        Tambah plaintext.
+        
+        Returns:
+            Bytes terenkripsi yang sudah siap ditulis (bisa kosong)
+        """
+        if self._finalized:
+            raise ValueError("Encryptor sudah di-finalize")
+        self._buffer += data
+        out = [self._take_header()]
+        chunk_size = self.engine.chunk_size
+        while len(self._buffer) > chunk_size:
+            out.append(self._seal(bytes(self._buffer[:chunk_size]), False))
+            del self._buffer[:chunk_size]
+        return b''.join(out)
+    
+    def finalize(self):
+        """
+        Enkripsi sisa data sebagai chunk terakhir.
+        
+        Returns:
+            Bytes terenkripsi terakhir (header juga jika input kosong)
+        """
+        if self._finalized:
+            return b''
+        self._finalized = True
+        out = self._take_header() + self._seal(bytes(self._buffer), True)
+        self._buffer.clear()
+        return out
+
+
+def open_file_encryption(key, head):
+    """
+    Pilih engine yang cocok untuk file terenkripsi berdasarkan bytes awalnya.
+    
+    Args:
+        key: Key/password AES
+        head: Bytes awal file (minimal 5 bytes)
+    
+    Returns:
+        AESChunkedEncryption untuk format chunked, AESFileEncryption untuk format CBC lama
+    """
+    if AESChunkedEncryption.is_chunked(head):
+        return AESChunkedEncryption(key)
+    return AESFileEncryption(key)
+
+
 # Helper functions
 
-def encrypt_file(input_file, password, output_file=None):
+def encrypt_file(input_file, password, output_file=None, chunked=False):
     """
     Enkripsi file dengan password (helper function).
     
@@ -150,17 +700,19 @@ def encrypt_file(input_file, password, output_file=None):
         input_file: File yang akan dienkripsi
         password: Password (string)
         output_file: File output (optional)
+        chunked: True = format AES-GCM chunked, False = AES-CBC lama (default)
     
     Returns:
         Info enkripsi
     """
-    aes = AESFileEncryption(password)
+    aes = AESChunkedEncryption(password) if chunked else AESFileEncryption(password)
     return aes.encrypt_file(input_file, output_file)
 
 
 def decrypt_file(input_file, password, output_file=None):
     """
     Dekripsi file dengan password (helper function).
+    Format (CBC lama atau chunked) dideteksi otomatis dari header.
     
     Args:
         input_file: File terenkripsi
@@ -170,5 +722,7 @@ def decrypt_file(input_file, password, output_file=None):
     Returns:
         Info dekripsi
     """
-    aes = AESFileEncryption(password)
+    with open(input_file, 'rb') as f:
+        head = f.read(AESChunkedEncryption.HEADER_SIZE)
+    aes = open_file_encryption(password, head)
     return aes.decrypt_file(input_file, output_file)
@@ -117,6 +117,39 @@ class DESEncryption:
         # Convert ke string
         return plaintext_bytes.decode('utf-8')
     
+    def encrypt_bytes(self, plaintext):
+        """
+        Enkripsi plaintext dan return ciphertext + IV sebagai raw bytes
+        (tanpa base64, untuk disimpan di kolom binary).
+        
+        Args:
+            plaintext: Text yang akan dienkripsi (string atau bytes)
+        
+        Returns:
+            Tuple (iv: bytes 8, ciphertext: bytes)
+        """
+        if isinstance(plaintext, str):
+            plaintext = plaintext.encode('utf-8')
+        
+        cipher = DES.new(self.key, DES.MODE_CBC)
+        ciphertext = cipher.encrypt(pad(plaintext, DES.block_size))
+        return cipher.iv, ciphertext
+    
+    def decrypt_bytes(self, ciphertext, iv):
+        """
+        Dekripsi ciphertext raw bytes (pasangan dari encrypt_bytes).
+        
+        Args:
+            ciphertext: Ciphertext (bytes)
+            iv: Initialization Vector (bytes 8)
+        
+        Returns:
+            Plaintext (string)
+        """
+        cipher = DES.new(self.key, DES.MODE_CBC, bytes(iv))
+        plaintext_bytes = unpad(cipher.decrypt(bytes(ciphertext)), DES.block_size)
+        return plaintext_bytes.decode('utf-8')
+    
     def encrypt_to_hex(self, plaintext):
         """
         Enkripsi plaintext dan return dalam format hexadecimal.
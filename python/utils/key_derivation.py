@@ -0,0 +1,208 @@
+"""
+Key Derivation Module
+Turunkan key AES dari password dengan scrypt/PBKDF2 + salt, dengan cache
+in-memory untuk key yang sudah diturunkan
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+
+from .ttl_cache import TTLCache
+
+
+class KeyDerivation:
+    """
+    Key derivation function (KDF) untuk password file encryption.
+
+    KDF sengaja mahal (puluhan-ratusan ms), jadi key hasil derive disimpan di
+    TTLCache dengan key (digest password, salt, algoritma, parameter).
+    Enkripsi/dekripsi banyak file dengan password + salt yang sama hanya
+    membayar biaya KDF sekali. Digest password memakai HMAC dengan secret
+    acak per proses, sehingga cache tidak menyimpan password atau hash
+    yang bisa dipakai di luar proses ini.
+    """
+
+    # ID algoritma (disimpan 1 byte di header file)
+    SCRYPT = 1
+    PBKDF2 = 2
+
+    SALT_SIZE = 16
+    PARAMS_SIZE = 4
+
+    # Batas mutlak parameter dari header file. Header dikirim client tanpa
+    # login (/api/file/decrypt), jadi batas efektifnya lebih ketat lagi:
+    # max_cost_factor x parameter yang dikonfigurasi (lihat _check_params)
+    MAX_SCRYPT_LOG_N = 20
+    MAX_SCRYPT_R = 16
+    MAX_SCRYPT_P = 4
+    MAX_SCRYPT_MEMORY = 64 * 1024 * 1024  # 128 * r * n
+    MAX_PBKDF2_ITERATIONS = 10_000_000
+
+    def __init__(self, algorithm='scrypt', scrypt_n=2 ** 15, scrypt_r=8, scrypt_p=1,
+                 pbkdf2_iterations=600_000, cache_size=128, cache_ttl=300, max_cost_factor=4):
+        """
+        Inisialisasi KDF.
+        
+        Args:
+            algorithm: 'scrypt' (default) atau 'pbkdf2'
+            scrypt_n: Cost CPU/memory scrypt, harus pangkat 2 (default: 2^15)
+            scrypt_r: Block size scrypt (default: 8)
+            scrypt_p: Parallelization scrypt (default: 1)
+            pbkdf2_iterations: Iterasi PBKDF2-HMAC-SHA256 (default: 600000)
+            cache_size: Jumlah key di cache, 0 = cache mati (default: 128)
+            cache_ttl: Umur key di cache dalam detik (default: 300)
+            max_cost_factor: Parameter dari header file maksimal sekian kali
+                             parameter di atas (default: 4)
+        """
+        if algorithm not in ('scrypt', 'pbkdf2'):
+            raise ValueError("algorithm harus 'scrypt' atau 'pbkdf2'")
+        if scrypt_n < 2 or scrypt_n & (scrypt_n - 1):
+            raise ValueError("scrypt_n harus pangkat 2")
+        
+        self.algorithm = algorithm
+        self.scrypt_n = scrypt_n
+        self.scrypt_r = scrypt_r
+        self.scrypt_p = scrypt_p
+        self.pbkdf2_iterations = pbkdf2_iterations
+        self.max_cost_factor = max(1, max_cost_factor)
+        
+        self.cache = TTLCache(max_size=cache_size, ttl=cache_ttl) if cache_size > 0 else None
+        self._cache_secret = os.urandom(32)
+        self._derive_count = 0
+        self._lock = threading.Lock()
+
+    def get_params(self):
+        """
+        Parameter KDF saat ini untuk ditulis ke header file.
+        
+        Returns:
+            Tuple (kdf_id, params 4 bytes)
+        """
+        if self.algorithm == 'scrypt':
+            log_n = self.scrypt_n.bit_length() - 1
+            return self.SCRYPT, bytes([log_n, self.scrypt_r, self.scrypt_p, 0])
+        return self.PBKDF2, self.pbkdf2_iterations.to_bytes(4, 'big')
+
+    def new_salt(self):
+        """Salt acak baru (16 bytes)."""
+        return os.urandom(self.SALT_SIZE)
+
+    def derive(self, password, salt, kdf_id=None, params=None, key_length=32):
+        """
+        Turunkan key dari password (memakai cache jika ada).
+        
+        Args:
+            password: Password (string atau bytes)
+            salt: Salt (bytes)
+            kdf_id: ID algoritma dari header file (default: algoritma saat ini)
+            params: Parameter 4 bytes dari header file (default: parameter saat ini)
+            key_length: Panjang key dalam bytes (default: 32 untuk AES-256)
+        
+        Returns:
+            Key (bytes)
+        
+        Raises:
+            ValueError: Jika algoritma/parameter tidak dikenal atau melebihi batas
+        """
+        if kdf_id is None:
+            kdf_id, params = self.get_params()
+        self._check_params(kdf_id, params)
+        
+        password_bytes = password.encode('utf-8') if isinstance(password, str) else password
+        cache_key = None
+        if self.cache is not None:
+            digest = hmac.new(self._cache_secret, password_bytes, hashlib.sha256).digest()
+            cache_key = (digest, bytes(salt), kdf_id, bytes(params), key_length)
+            key = self.cache.get(cache_key)
+            if key is not None:
+                return key
+        
+        key = self._derive(password_bytes, salt, kdf_id, params, key_length)
+        with self._lock:
+            self._derive_count += 1
+        
+        if cache_key is not None:
+            self.cache.set(cache_key, key)
+        return key
+
+    def _check_params(self, kdf_id, params):
+        """
+        Tolak parameter KDF yang terlalu mahal sebelum derive (dan sebelum
+        cache), agar header palsu tidak bisa memaksa alokasi memory/CPU besar.
+        
+        Raises:
+            ValueError: Jika algoritma tidak dikenal atau parameter di luar batas
+        """
+        factor = self.max_cost_factor
+        if kdf_id == self.SCRYPT:
+            log_n, r, p = params[0], params[1], params[2]
+            if not (1 <= log_n <= self.MAX_SCRYPT_LOG_N and 1 <= r <= self.MAX_SCRYPT_R
+                    and 1 <= p <= self.MAX_SCRYPT_P):
+                raise ValueError("Parameter scrypt di luar batas")
+            n = 1 << log_n
+            # Memory cap tidak lebih kecil dari konfigurasi sendiri
+            max_memory = max(self.MAX_SCRYPT_MEMORY, 128 * self.scrypt_r * self.scrypt_n)
+            if (n > self.scrypt_n * factor or r > self.scrypt_r * factor
+                    or p > self.scrypt_p * factor or 128 * r * n > max_memory):
+                raise ValueError("Parameter scrypt di luar batas")
+        elif kdf_id == self.PBKDF2:
+            iterations = int.from_bytes(params, 'big')
+            if not 1 <= iterations <= min(self.MAX_PBKDF2_ITERATIONS, self.pbkdf2_iterations * factor):
+                raise ValueError("Iterasi PBKDF2 di luar batas")
+        else:
+            raise ValueError(f"Algoritma KDF tidak dikenal: {kdf_id}")
+
+    def _derive(self, password_bytes, salt, kdf_id, params, key_length):
+        if kdf_id == self.SCRYPT:
+            log_n, r, p = params[0], params[1], params[2]
+            n = 1 << log_n
+            # Memory scrypt ~ 128 * r * n (+ 128 * r * p), beri ruang lebih
+            maxmem = 128 * r * (n + p) + 1024 * 1024
+            return hashlib.scrypt(password_bytes, salt=salt, n=n, r=r, p=p,
+                                  maxmem=maxmem, dklen=key_length)
+        
+        iterations = int.from_bytes(params, 'big')
+        return hashlib.pbkdf2_hmac('sha256', password_bytes, salt, iterations, dklen=key_length)
+
+    def get_stats(self):
+        """
+        Statistik KDF untuk monitoring.
+        
+        Returns:
+            Dictionary algoritma, jumlah derive dan statistik cache
+        """
+        with self._lock:
+            derive_count = self._derive_count
+        return {
+            'algorithm': self.algorithm,
+            'derive_count': derive_count,
+            'cache': self.cache.stats() if self.cache is not None else None
+        }
+
+
+# Instance default yang dipakai AESChunkedEncryption (diatur ulang oleh app factory)
+_default = KeyDerivation()
+_default_lock = threading.Lock()
+
+
+def get_key_derivation():
+    """Instance KeyDerivation default."""
+    return _default
+
+
+def configure_key_derivation(**options):
+    """
+    Ganti instance KeyDerivation default (misal dari Config.get_kdf_config()).
+    
+    Args:
+        **options: Argumen untuk KeyDerivation()
+    
+    Returns:
+        Instance KeyDerivation yang baru
+    """
+    global _default
+    with _default_lock:
+        _default = KeyDerivation(**options)
+        return _default
@@ -0,0 +1,441 @@
+"""
+Password Hashing Module
+Hashing password adaptif (scrypt/argon2id/bcrypt) dengan format hash yang
+self-describing, verifikasi hash MD5 lama, dan worker pool terbatas
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+try:
+    import argon2
+except ImportError:  # Opsional: pip install argon2-cffi
+    argon2 = None
+
+try:
+    import bcrypt
+except ImportError:  # Opsional: pip install bcrypt
+    bcrypt = None
+
+
+class HashingBusyError(Exception):
+    """Antrian hashing penuh (terlalu banyak login/register bersamaan)."""
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+class PasswordHasher:
+    """
+    Interface hasher password.
+
+    Setiap hasher menghasilkan string hash yang menyimpan algoritma dan
+    parameternya sendiri (misal "$scrypt$ln=15,r=8,p=1$salt$hash"), sehingga
+    hash lama tetap bisa diverifikasi setelah parameter dinaikkan.
+    """
+
+    name = None
+
+    def hash(self, password):
+        """Hash password, return string hash."""
+        raise NotImplementedError
+
+    def verify(self, password, encoded):
+        """Cek password terhadap string hash."""
+        raise NotImplementedError
+
+    def identify(self, encoded):
+        """True jika string hash dibuat oleh hasher ini."""
+        raise NotImplementedError
+
+    def needs_rehash(self, encoded):
+        """True jika hash memakai parameter yang lebih lemah dari saat ini."""
+        return False
+
+
+class ScryptHasher(PasswordHasher):
+    """scrypt dari hashlib (tanpa dependency tambahan)."""
+
+    name = 'scrypt'
+    PATTERN = re.compile(r'^\$scrypt\$ln=(\d+),r=(\d+),p=(\d+)\$([A-Za-z0-9+/]+)\$([A-Za-z0-9+/]+)$')
+    SALT_SIZE = 16
+    HASH_SIZE = 32
+
+    def __init__(self, n=2 ** 15, r=8, p=1):
+        if n < 2 or n & (n - 1):
+            raise ValueError("n harus pangkat 2")
+        self.log_n = n.bit_length() - 1
+        self.r = r
+        self.p = p
+
+    @staticmethod
+    def _scrypt(password, salt, log_n, r, p):
+        n = 1 << log_n
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                              maxmem=128 * r * (n + p) + 1024 * 1024, dklen=ScryptHasher.HASH_SIZE)
+
+    def hash(self, password):
+        salt = os.urandom(self.SALT_SIZE)
+        digest = self._scrypt(password, salt, self.log_n, self.r, self.p)
+        return f"$scrypt$ln={self.log_n},r={self.r},p={self.p}${_b64encode(salt)}${_b64encode(digest)}"
+
+    def verify(self, password, encoded):
+        match = self.PATTERN.match(encoded)
+        if not match:
+            return False
+        log_n, r, p = (int(value) for value in match.group(1, 2, 3))
+        digest = self._scrypt(password, _b64decode(match.group(4)), log_n, r, p)
+        return hmac.compare_digest(digest, _b64decode(match.group(5)))
+
+    def identify(self, encoded):
+        return encoded.startswith('$scrypt$')
+
+    def needs_rehash(self, encoded):
+        match = self.PATTERN.match(encoded)
+        if not match:
+            return True
+        return tuple(int(value) for value in match.group(1, 2, 3)) != (self.log_n, self.r, self.p)
+
+
+class Argon2Hasher(PasswordHasher):
+    """argon2id (butuh package argon2-cffi)."""
+
+    name = 'argon2id'
+
+    def __init__(self, time_cost=3, memory_cost=65536, parallelism=1):
+        if argon2 is None:
+            raise ImportError("argon2-cffi belum terinstall (pip install argon2-cffi)")
+        self._hasher = argon2.PasswordHasher(
+            time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism,
+            type=argon2.Type.ID
+        )
+
+    def hash(self, password):
+        return self._hasher.hash(password)
+
+    def verify(self, password, encoded):
+        try:
+            return self._hasher.verify(encoded, password)
+        except argon2.exceptions.VerificationError:
+            return False
+        except argon2.exceptions.InvalidHashError:
+            return False
+
+    def identify(self, encoded):
+        return encoded.startswith('$argon2id$')
+
+    def needs_rehash(self, encoded):
+        return self._hasher.check_needs_rehash(encoded)
+
+
+class BcryptHasher(PasswordHasher):
+    """
+    bcrypt (butuh package bcrypt).
+
+    Note:
+        bcrypt hanya memakai 72 bytes pertama password.
+    """
+
+    name = 'bcrypt'
+    MAX_PASSWORD_BYTES = 72
+
+    def __init__(self, rounds=12):
+        if bcrypt is None:
+            raise ImportError("bcrypt belum terinstall (pip install bcrypt)")
+        self.rounds = rounds
+
+    def _password_bytes(self, password):
+        return password.encode('utf-8')[:self.MAX_PASSWORD_BYTES]
+
+    def hash(self, password):
+        return bcrypt.hashpw(self._password_bytes(password), bcrypt.gensalt(self.rounds)).decode('ascii')
+
+    def verify(self, password, encoded):
+        try:
+            return bcrypt.checkpw(self._password_bytes(password), encoded.encode('ascii'))
+        except ValueError:
+            return False
+
+    def identify(self, encoded):
+        return encoded.startswith(('$2b$', '$2a$', '$2y$'))
+
+    def needs_rehash(self, encoded):
+        try:
+            return int(encoded.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+
+class MD5Hasher(PasswordHasher):
+    """Hash MD5 hex lama (hanya untuk verifikasi, selalu perlu rehash)."""
+
+    name = 'md5'
+    PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+    def hash(self, password):
+        raise ValueError("MD5 hanya untuk verifikasi hash lama")
+
+    def verify(self, password, encoded):
+        digest = hashlib.md5(password.encode('utf-8')).hexdigest()
+        return hmac.compare_digest(digest, encoded.lower())
+
+    def identify(self, encoded):
+        return bool(self.PATTERN.match(encoded.lower()))
+
+    def needs_rehash(self, encoded):
+        return True
+
+
+def create_hasher(scheme='scrypt', scrypt_n=2 ** 15, scrypt_r=8, scrypt_p=1,
+                  argon2_time_cost=3, argon2_memory_cost=65536, argon2_parallelism=1,
+                  bcrypt_rounds=12):
+    """
+    Buat hasher sesuai nama scheme.
+    
+    Args:
+        scheme: 'scrypt' (default), 'argon2id' atau 'bcrypt'
+    
+    Returns:
+        Instance PasswordHasher
+    """
+    if scheme == 'scrypt':
+        return ScryptHasher(scrypt_n, scrypt_r, scrypt_p)
+    if scheme == 'argon2id':
+        return Argon2Hasher(argon2_time_cost, argon2_memory_cost, argon2_parallelism)
+    if scheme == 'bcrypt':
+        return BcryptHasher(bcrypt_rounds)
+    raise ValueError(f"Scheme password hash tidak dikenal: {scheme}")
+
+
+class PasswordHashing:
+    """
+    Hash dan verifikasi password di worker pool terbatas.
+
+    Hash baru selalu memakai hasher utama. Verifikasi memilih hasher dari
+    format string hash (scrypt/argon2id/bcrypt/MD5 lama), dan mengembalikan
+    hash baru jika hash lama perlu di-upgrade (rehash saat login).
+
+    Jumlah hashing bersamaan dibatasi `workers`, dan jumlah request yang
+    menunggu dibatasi `max_queue`. Jika antrian penuh, HashingBusyError
+    dilempar agar request lain (yang bukan login) tidak ikut kehabisan CPU.
+    """
+
+    LATENCY_SAMPLES = 256
+
+    def __init__(self, hasher=None, workers=None, max_queue=64, timeout=30):
+        """
+        Args:
+            hasher: PasswordHasher utama (default: ScryptHasher())
+            workers: Jumlah thread hashing (default: jumlah CPU)
+            max_queue: Maksimal job yang menunggu di antrian (default: 64)
+            timeout: Batas waktu menunggu hasil dalam detik (default: 30)
+        """
+        self.hasher = hasher or ScryptHasher()
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        
+        self._verifiers = [self.hasher, MD5Hasher()]
+        for hasher_class in (ScryptHasher, Argon2Hasher, BcryptHasher):
+            if not isinstance(self.hasher, hasher_class):
+                try:
+                    self._verifiers.append(hasher_class())
+                except ImportError:
+                    pass
+        
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._stats = {'completed': 0, 'rejected': 0, 'rehashed': 0}
+        self._latencies = deque(maxlen=self.LATENCY_SAMPLES)
+
+    def _submit(self, func, *args):
+        """Jalankan func di worker pool, tunggu hasilnya."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HashingBusyError("Antrian hashing password penuh")
+        
+        with self._lock:
+            self._queued += 1
+        
+        def run():
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._running -= 1
+                    self._stats['completed'] += 1
+                    self._latencies.append(elapsed)
+                self._slots.release()
+        
+        future = self._executor.submit(run)
+        try:
+            return future.result(timeout=self.timeout)
+        except FuturesTimeoutError:
+            # Job yang sudah jalan tidak bisa dihentikan: slot baru dilepas
+            # saat job selesai, jadi selama itu kapasitas antrian berkurang.
+            # Job yang belum mulai dibatalkan dan slotnya dilepas di sini.
+            if future.cancel():
+                with self._lock:
+                    self._queued -= 1
+                self._slots.release()
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HashingBusyError(f"Hashing password melebihi batas waktu {self.timeout} detik")
+
+    def _find_verifier(self, encoded):
+        for hasher in self._verifiers:
+            if hasher.identify(encoded):
+                return hasher
+        return None
+
+    def hash(self, password):
+        """
+        Hash password dengan hasher utama.
+        
+        Raises:
+            HashingBusyError: Jika antrian penuh atau menunggu melebihi timeout
+        """
+        return self._submit(self.hasher.hash, password)
+
+    def verify(self, password, encoded):
+        """
+        Verifikasi password, sekaligus buat hash baru jika hash lama perlu upgrade.
+        
+        Args:
+            password: Password plaintext
+            encoded: String hash dari database
+        
+        Returns:
+            Tuple (cocok, hash_baru). hash_baru None jika tidak perlu rehash.
+        
+        Raises:
+            HashingBusyError: Jika antrian penuh atau menunggu melebihi timeout
+        """
+        if not encoded:
+            return False, None
+        
+        verifier = self._find_verifier(encoded)
+        if verifier is None:
+            return False, None
+        
+        def verify_and_upgrade():
+            if not verifier.verify(password, encoded):
+                return False, None
+            if verifier is self.hasher and not self.hasher.needs_rehash(encoded):
+                return True, None
+            return True, self.hasher.hash(password)
+        
+        matched, new_hash = self._submit(verify_and_upgrade)
+        if new_hash:
+            with self._lock:
+                self._stats['rehashed'] += 1
+        return matched, new_hash
+
+    def get_stats(self):
+        """
+        Metrik worker pool hashing.
+        
+        Returns:
+            Dictionary scheme, queue depth, job berjalan, counter dan latency (ms)
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'scheme': self.hasher.name,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'queue_depth': self._queued,
+                'running': self._running,
+                **self._stats
+            }
+        
+        if latencies:
+            stats['latency_ms'] = {
+                'avg': round(sum(latencies) / len(latencies) * 1000, 2),
+                'p50': round(latencies[len(latencies) // 2] * 1000, 2),
+                'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2),
+                'max': round(latencies[-1] * 1000, 2)
+            }
+        else:
+            stats['latency_ms'] = None
+        return stats
+
+    def close(self):
+        """Hentikan worker pool."""
+        self._executor.shutdown(wait=False)
+
+
+def create_password_hashing(scheme='scrypt', workers=None, max_queue=64, **hasher_options):
+    """
+    Buat PasswordHashing dari opsi konfigurasi (Config.get_password_hashing_config()).
+    
+    Args:
+        scheme: Scheme hash utama
+        workers: Jumlah thread hashing
+        max_queue: Maksimal job menunggu
+        **hasher_options: Parameter cost untuk create_hasher()
+    
+    Returns:
+        Instance PasswordHashing
+    """
+    return PasswordHashing(create_hasher(scheme, **hasher_options), workers=workers, max_queue=max_queue)
+
+
+def calibrate(scheme='scrypt', target_ms=250, max_steps=8):
+    """
+    Cari parameter cost yang paling mendekati target latency di host ini
+    (tanpa melebihi target, kecuali cost minimum pun sudah lebih lambat).
+    
+    Args:
+        scheme: 'scrypt', 'argon2id' atau 'bcrypt'
+        target_ms: Target waktu satu hash dalam milidetik (default: 250)
+        max_steps: Maksimal langkah kenaikan cost (default: 8)
+    
+    Returns:
+        Dictionary parameter terpilih dan hasil pengukuran per langkah
+    """
+    if scheme == 'scrypt':
+        candidates = [{'scrypt_n': 2 ** log_n} for log_n in range(12, 12 + max_steps)]
+    elif scheme == 'argon2id':
+        candidates = [{'argon2_time_cost': cost} for cost in range(1, 1 + max_steps)]
+    elif scheme == 'bcrypt':
+        candidates = [{'bcrypt_rounds': rounds} for rounds in range(10, 10 + max_steps)]
+    else:
+        raise ValueError(f"Scheme password hash tidak dikenal: {scheme}")
+    
+    measurements = []
+    chosen = candidates[0]
+    for params in candidates:
+        hasher = create_hasher(scheme, **params)
+        start = time.perf_counter()
+        hasher.hash("calibration-password")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        measurements.append({'params': params, 'ms': round(elapsed_ms, 1)})
+        
+        if elapsed_ms > target_ms:
+            break
+        chosen = params
+    
+    return {'scheme': scheme, 'target_ms': target_ms, 'params': chosen, 'measurements': measurements}
@@ -4,6 +4,7 @@ Menyembunyikan dan mengekstrak pesan rahasia dalam gambar
 """
 
 from PIL import Image
+import numpy as np
 import io
 import base64
 
@@ -11,10 +12,26 @@ import base64
 class Steganography:
     """
     Class untuk encode dan decode pesan rahasia dalam gambar menggunakan LSB
+    
+    Format payload:
+        v2 (default): MAGIC "KS" | versi 0x02 | panjang 4 byte (big-endian) | pesan UTF-8
+        v1 (legacy) : pesan + "###END###" (bit per karakter dari format(ord(c), '08b'))
     """
     
-    def __init__(self):
-        self.delimiter = "###END###"  # Penanda akhir pesan
+    MAGIC = b'KS'
+    PAYLOAD_VERSION = 0x02
+    HEADER_SIZE = 7  # MAGIC (2) + versi (1) + panjang (4)
+    LEGACY_MAX_CHARS = 10000  # Batas scan format lama (sama dengan decoder lama)
+    LEGACY_SCAN_CHARS = 4096  # Jumlah karakter per langkah scan format lama
+    
+    def __init__(self, payload_version=PAYLOAD_VERSION):
+        """
+        Args:
+            payload_version (int): 2 = format dengan header panjang (default),
+                1 = format lama dengan delimiter
+        """
+        self.delimiter = "###END###"  # Penanda akhir pesan (format lama)
+        self.payload_version = payload_version
     
     def encode_message(self, image_base64, secret_message):
         """
@@ -38,51 +55,29 @@ class Steganography:
             if img.mode != 'RGB':
                 img = img.convert('RGB')
             
-            # Tambahkan delimiter di akhir pesan
-            message_with_delimiter = secret_message + self.delimiter
-            
-            # Convert pesan ke binary
-            binary_message = ''.join(format(ord(char), '08b') for char in message_with_delimiter)
+            if self.payload_version == 1:
+                # Format lama: tambahkan delimiter di akhir pesan
+                bits = self._message_bits(secret_message + self.delimiter)
+            else:
+                # Format v2: header (magic + versi + panjang) + pesan UTF-8
+                payload = secret_message.encode('utf-8')
+                header = self.MAGIC + bytes([self.PAYLOAD_VERSION]) + len(payload).to_bytes(4, 'big')
+                bits = np.unpackbits(np.frombuffer(header + payload, dtype=np.uint8))
             
             # Cek apakah gambar cukup besar untuk menampung pesan
             max_bytes = img.width * img.height * 3  # RGB = 3 bytes per pixel
-            if len(binary_message) > max_bytes:
-                raise ValueError(f"Pesan terlalu panjang! Maksimal {max_bytes // 8} karakter, tapi pesan {len(binary_message) // 8} karakter")
-            
-            # Load pixel data
-            pixels = list(img.getdata())
-            new_pixels = []
+            if len(bits) > max_bytes:
+                raise ValueError(f"Pesan terlalu panjang! Maksimal {max_bytes // 8} karakter, tapi pesan {len(bits) // 8} karakter")
             
-            binary_index = 0
+            # Load pixel data sebagai buffer uint8 (R, G, B berurutan per pixel)
+            pixels = np.array(img, dtype=np.uint8)
+            flat = pixels.reshape(-1)
             
-            for pixel in pixels:
-                # Pixel RGB tuple (r, g, b)
-                r, g, b = pixel
-                
-                # Modify LSB dari setiap komponen RGB
-                if binary_index < len(binary_message):
-                    r = self._modify_lsb(r, binary_message[binary_index])
-                    binary_index += 1
-                
-                if binary_index < len(binary_message):
-                    g = self._modify_lsb(g, binary_message[binary_index])
-                    binary_index += 1
-                
-                if binary_index < len(binary_message):
-                    b = self._modify_lsb(b, binary_message[binary_index])
-                    binary_index += 1
-                
-                new_pixels.append((r, g, b))
-                
-                # Jika sudah selesai encode semua bit, break
-                if binary_index >= len(binary_message):
-                    # Tambahkan sisa pixel yang tidak dimodifikasi
-                    new_pixels.extend(pixels[len(new_pixels):])
-                    break
+            # Modify LSB dari komponen RGB sebanyak jumlah bit (satu operasi vektor)
+            flat[:len(bits)] = (flat[:len(bits)] & 0xFE) | bits
             
             # Buat gambar baru dengan pixel yang sudah dimodifikasi
-            encoded_img = Image.new(img.mode, img.size)
-            encoded_img.putdata(new_pixels)
+            encoded_img = Image.fromarray(pixels, 'RGB')
             
             # Convert kembali ke base64
             buffered = io.BytesIO()
@@ -115,45 +110,18 @@ class Steganography:
             if img.mode != 'RGB':
                 img = img.convert('RGB')
             
-            # Load pixel data
-            pixels = list(img.getdata())
-            
-            # Extract binary message dari LSB
-            binary_message = ""
+            # Load pixel data sebagai buffer uint8 (R, G, B berurutan per pixel)
+            flat = np.asarray(img, dtype=np.uint8).reshape(-1)
             
-            for pixel in pixels:
-                r, g, b = pixel
-                
-                # Extract LSB dari setiap komponen RGB
-                binary_message += str(r & 1)
-                binary_message += str(g & 1)
-                binary_message += str(b & 1)
+            # Format v2: baca header, lalu hanya bit sebanyak panjang pesan
+            message = self._decode_v2(flat)
+            if message is not None:
+                return message
             
-            # Convert binary ke text
-            message = ""
-            char_count = 0
-            max_chars = 10000  # Limit untuk mencegah infinite loop
-            
-            for i in range(0, len(binary_message), 8):
-                byte = binary_message[i:i+8]
-                if len(byte) == 8:
-                    try:
-                        char = chr(int(byte, 2))
-                        message += char
-                        char_count += 1
-                        
-                        # Cek apakah sudah mencapai delimiter
-                        if message.endswith(self.delimiter):
-                            # Hapus delimiter dari pesan
-                            message = message[:-len(self.delimiter)]
-                            return message
-                        
-                        # Safety limit
-                        if char_count > max_chars:
-                            break
-                    except ValueError:
-                        # Invalid character, skip
-                        continue
+            # Format lama: scan bertahap sampai delimiter ditemukan
+            message = self._decode_legacy(flat)
+            if message is not None:
+                return message
             
             # Jika sampai sini berarti tidak ketemu delimiter
             # Kemungkinan gambar tidak ada pesan steganografi
@@ -164,6 +132,91 @@ class Steganography:
                 raise e
             raise Exception(f"Error decoding message: {str(e)}")
     
+    @staticmethod
+    def _read_bytes(flat, start_byte, count):
+        """
+        Ambil `count` byte payload mulai dari byte ke-`start_byte`
+        (8 LSB berurutan = 1 byte).
+        
+        Args:
+            flat (numpy.ndarray): Komponen RGB gambar (uint8, 1 dimensi)
+            start_byte (int): Offset byte payload
+            count (int): Jumlah byte
+            
+        Returns:
+            bytes: Byte payload (bisa lebih pendek jika gambar habis)
+        """
+        lsb = flat[start_byte * 8:(start_byte + count) * 8] & 1
+        usable = len(lsb) - len(lsb) % 8
+        return np.packbits(lsb[:usable]).tobytes()
+    
+    def _decode_v2(self, flat):
+        """
+        Decode payload format v2 (header panjang).
+        
+        Returns:
+            str: Pesan, atau None jika gambar tidak memakai format v2
+        """
+        header = self._read_bytes(flat, 0, self.HEADER_SIZE)
+        if len(header) < self.HEADER_SIZE or header[:2] != self.MAGIC or header[2] != self.PAYLOAD_VERSION:
+            return None
+        
+        length = int.from_bytes(header[3:7], 'big')
+        if self.HEADER_SIZE + length > len(flat) // 8:
+            return None
+        
+        payload = self._read_bytes(flat, self.HEADER_SIZE, length)
+        try:
+            return payload.decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+    
+    def _decode_legacy(self, flat):
+        """
+        Decode payload format lama (delimiter), membaca per blok
+        LEGACY_SCAN_CHARS karakter dan berhenti begitu delimiter ditemukan.
+        
+        Returns:
+            str: Pesan, atau None jika delimiter tidak ditemukan
+        """
+        delimiter = self.delimiter.encode('latin-1')
+        # Decoder lama berhenti setelah LEGACY_MAX_CHARS + 1 karakter
+        max_bytes = min(self.LEGACY_MAX_CHARS + 1, len(flat) // 8)
+        
+        data = b''
+        while len(data) < max_bytes:
+            chunk = self._read_bytes(flat, len(data), min(self.LEGACY_SCAN_CHARS, max_bytes - len(data)))
+            search_from = max(0, len(data) - len(delimiter) + 1)
+            data += chunk
+            
+            position = data.find(delimiter, search_from)
+            if position != -1:
+                # 1 byte = 1 karakter (chr(0..255)), sama dengan decoder lama
+                return data[:position].decode('latin-1')
+        
+        return None
+    
+    @staticmethod
+    def _message_bits(text):
+        """
+        Convert teks ke array bit uint8, sama persis dengan
+        ''.join(format(ord(char), '08b') for char in text)
+        
+        Args:
+            text (str): Pesan (sudah termasuk delimiter)
+            
+        Returns:
+            numpy.ndarray: Array bit 0/1 (dtype uint8)
+        """
+        try:
+            # Jalur cepat: semua karakter < 256 -> tepat 8 bit per karakter
+            data = np.frombuffer(text.encode('latin-1'), dtype=np.uint8)
+            return np.unpackbits(data)
+        except UnicodeEncodeError:
+            # Karakter > 255 menghasilkan lebih dari 8 bit (format lama), ikuti apa adanya
+            binary = ''.join(format(ord(char), '08b') for char in text)
+            return np.frombuffer(binary.encode('ascii'), dtype=np.uint8) - ord('0')
+    
     def _modify_lsb(self, value, bit):
         """
         Modify Least Significant Bit dari sebuah nilai
@@ -206,8 +259,11 @@ class Steganography:
             max_bits = total_pixels * 3  # RGB = 3 bits per pixel (LSB dari R, G, B)
             max_chars = max_bits // 8  # 8 bits = 1 character
             
-            # Kurangi dengan delimiter
-            usable_chars = max_chars - len(self.delimiter)
+            # Kurangi dengan header (format v2) atau delimiter (format lama)
+            if self.payload_version == 1:
+                usable_chars = max_chars - len(self.delimiter)
+            else:
+                usable_chars = max_chars - self.HEADER_SIZE
             
             return {
                 'width': img.width,
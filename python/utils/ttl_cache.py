@@ -0,0 +1,127 @@
+"""
+TTL Cache Module
+Cache LRU in-memory yang thread-safe dengan batas ukuran dan TTL
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Cache LRU (Least Recently Used) dengan batas jumlah entry dan umur (TTL).
+
+    Entry yang paling lama tidak dipakai dibuang saat cache penuh,
+    dan entry yang lebih tua dari TTL dianggap tidak ada.
+    Menyimpan counter hit/miss/eviction untuk monitoring.
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        """
+        Inisialisasi cache.
+        
+        Args:
+            max_size: Jumlah entry maksimal (default: 1024)
+            ttl: Umur entry dalam detik, None = tanpa batas (default: 300)
+        """
+        if max_size < 1:
+            raise ValueError("max_size minimal 1")
+        
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    def get(self, key, default=None):
+        """
+        Ambil nilai dari cache.
+        
+        Args:
+            key: Key cache
+            default: Nilai jika key tidak ada/kedaluwarsa
+        
+        Returns:
+            Nilai yang tersimpan atau default
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return default
+            
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._data[key]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return default
+            
+            self._data.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def set(self, key, value):
+        """
+        Simpan nilai ke cache (membuang entry LRU jika penuh).
+        
+        Args:
+            key: Key cache
+            value: Nilai yang disimpan
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def delete(self, key):
+        """
+        Hapus (invalidate) satu key.
+        
+        Returns:
+            True jika key ada dan dihapus
+        """
+        with self._lock:
+            if self._data.pop(key, None) is None:
+                return False
+            self._stats['invalidations'] += 1
+            return True
+
+    def clear(self):
+        """Kosongkan cache."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        Statistik cache.
+        
+        Returns:
+            Dictionary dengan ukuran, hit rate dan counter
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            size = len(self._data)
+        
+        lookups = stats['hits'] + stats['misses']
+        return {
+            'size': size,
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hit_rate': round(stats['hits'] / lookups, 4) if lookups else 0.0,
+            **stats
+        }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)